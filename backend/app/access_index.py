@@ -0,0 +1,217 @@
+"""
+Índice materializado de acesso às automações: setor/usuário -> ids de automações ativas visíveis.
+
+Substitui o UNION de joins em GET /automations para usuários comuns por uma consulta ao índice
+seguida de um único SELECT ... WHERE id IN (...). Os handlers de escrita atualizam o índice de
+forma incremental após o commit; a reconstrução periódica (lifespan) cobre escritas feitas em
+outros workers.
+"""
+import threading
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Automation, automation_permissions, user_automation_permissions
+
+
+class AutomationAccessIndex:
+    def __init__(self, session_factory=SessionLocal) -> None:
+        self.session_factory = session_factory
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._generation = 0
+        # Estado por automação (fonte para as atualizações incrementais)
+        self._active: dict[int, bool] = {}
+        self._sectors_of: dict[int, set[int]] = {}
+        self._users_of: dict[int, set[int]] = {}
+        # Visões invertidas, apenas com automações ativas
+        self._by_sector: dict[int, set[int]] = {}
+        self._by_user: dict[int, set[int]] = {}
+
+    # --- Carga -------------------------------------------------------------
+
+    def rebuild(self, db: Optional[Session] = None) -> None:
+        """Recarrega o índice inteiro com três SELECTs simples (sem joins)"""
+        own_session = db is None
+        db = db or self.session_factory()
+        try:
+            for _ in range(3):
+                generation = self._generation
+                snapshot = self._load_snapshot(db)
+                with self._lock:
+                    # Uma escrita incremental durante a leitura tornaria o snapshot mais velho que o índice
+                    if generation == self._generation or not self._loaded:
+                        self._active, self._sectors_of, self._users_of = snapshot
+                        self._rebuild_inverted()
+                        self._loaded = True
+                        return
+                db.rollback()
+        finally:
+            if own_session:
+                db.close()
+
+    @staticmethod
+    def _load_snapshot(db: Session) -> tuple[dict[int, bool], dict[int, set[int]], dict[int, set[int]]]:
+        active = dict(db.execute(select(Automation.id, Automation.is_active)).all())
+        sector_rows = db.execute(
+            select(automation_permissions.c.automation_id, automation_permissions.c.sector_id)
+        ).all()
+        user_rows = db.execute(
+            select(user_automation_permissions.c.automation_id, user_automation_permissions.c.user_id)
+        ).all()
+
+        sectors_of: dict[int, set[int]] = {automation_id: set() for automation_id in active}
+        users_of: dict[int, set[int]] = {automation_id: set() for automation_id in active}
+        for automation_id, sector_id in sector_rows:
+            sectors_of.setdefault(automation_id, set()).add(sector_id)
+        for automation_id, user_id in user_rows:
+            users_of.setdefault(automation_id, set()).add(user_id)
+
+        return {automation_id: bool(is_active) for automation_id, is_active in active.items()}, sectors_of, users_of
+
+    def _rebuild_inverted(self) -> None:
+        self._by_sector = {}
+        self._by_user = {}
+        for automation_id, is_active in self._active.items():
+            if is_active:
+                self._link(automation_id)
+
+    def _ensure_loaded(self, db: Optional[Session]) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.rebuild(db)
+
+    def invalidate(self) -> None:
+        """Força a reconstrução no próximo acesso"""
+        with self._lock:
+            self._loaded = False
+
+    # --- Consulta ----------------------------------------------------------
+
+    def visible_ids(self, user_id: Optional[int], sector_id: Optional[int], db: Optional[Session] = None) -> set[int]:
+        self._ensure_loaded(db)
+        with self._lock:
+            ids = set(self._by_sector.get(sector_id, ())) if sector_id is not None else set()
+            if user_id is not None:
+                ids.update(self._by_user.get(user_id, ()))
+            return ids
+
+    def direct_ids(self, user_id: Optional[int], db: Optional[Session] = None) -> frozenset[int]:
+        """Automações ativas liberadas diretamente ao usuário (sem contar o setor)"""
+        if user_id is None:
+            return frozenset()
+        self._ensure_loaded(db)
+        with self._lock:
+            return frozenset(self._by_user.get(user_id, ()))
+
+    def audience(self, automation_id: int) -> tuple[frozenset[int], frozenset[int]]:
+        """Setores e usuários com permissão na automação (ativa ou não), para os eventos SSE"""
+        with self._lock:
+            return (
+                frozenset(self._sectors_of.get(automation_id, ())),
+                frozenset(self._users_of.get(automation_id, ())),
+            )
+
+    # --- Atualizações incrementais ----------------------------------------
+
+    def _link(self, automation_id: int) -> None:
+        for sector_id in self._sectors_of.get(automation_id, ()):
+            self._by_sector.setdefault(sector_id, set()).add(automation_id)
+        for user_id in self._users_of.get(automation_id, ()):
+            self._by_user.setdefault(user_id, set()).add(automation_id)
+
+    def _unlink(self, automation_id: int) -> None:
+        for sector_id in self._sectors_of.get(automation_id, ()):
+            self._by_sector.get(sector_id, set()).discard(automation_id)
+        for user_id in self._users_of.get(automation_id, ()):
+            self._by_user.get(user_id, set()).discard(automation_id)
+
+    def set_automation(
+        self,
+        automation_id: int,
+        is_active: bool,
+        sector_ids: Iterable[int],
+        user_ids: Iterable[int],
+    ) -> None:
+        with self._lock:
+            self._generation += 1
+            if not self._loaded:
+                return  # a primeira consulta carrega o estado já commitado
+            self._unlink(automation_id)
+            self._active[automation_id] = bool(is_active)
+            self._sectors_of[automation_id] = set(sector_ids)
+            self._users_of[automation_id] = set(user_ids)
+            if is_active:
+                self._link(automation_id)
+
+    def index_automation(self, automation: Automation, user_ids: Iterable[int]) -> None:
+        """user_ids vem de direct_user_ids: só os ids, sem carregar users_with_access"""
+        self.set_automation(
+            automation.id,
+            automation.is_active,
+            (sector.id for sector in automation.sectors),
+            user_ids,
+        )
+
+    def remove_automation(self, automation_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            if not self._loaded:
+                return
+            self._unlink(automation_id)
+            self._active.pop(automation_id, None)
+            self._sectors_of.pop(automation_id, None)
+            self._users_of.pop(automation_id, None)
+
+    def set_user_grants(self, user_id: int, automation_ids: Iterable[int]) -> None:
+        """Substitui as permissões diretas de um usuário"""
+        with self._lock:
+            self._generation += 1
+            if not self._loaded:
+                return
+            granted = set(automation_ids)
+            for automation_id, users in self._users_of.items():
+                if automation_id in granted:
+                    users.add(user_id)
+                else:
+                    users.discard(user_id)
+            self._by_user[user_id] = {
+                automation_id for automation_id in granted if self._active.get(automation_id)
+            }
+
+    def remove_user(self, user_id: int) -> None:
+        self.set_user_grants(user_id, ())
+        with self._lock:
+            self._by_user.pop(user_id, None)
+
+    def remove_sector(self, sector_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            if not self._loaded:
+                return
+            for sectors in self._sectors_of.values():
+                sectors.discard(sector_id)
+            self._by_sector.pop(sector_id, None)
+
+
+def direct_user_ids(db: Session, automation_ids: Iterable[int]) -> dict[int, set[int]]:
+    """
+    Usuários com permissão direta em cada automação, lidos só da tabela de associação (uma query
+    para o lote todo). Automações compartilhadas com milhares de usuários não carregam os User.
+    """
+    automation_ids = list(automation_ids)
+    users_of: dict[int, set[int]] = {automation_id: set() for automation_id in automation_ids}
+    if automation_ids:
+        rows = db.execute(
+            select(user_automation_permissions.c.automation_id, user_automation_permissions.c.user_id)
+            .where(user_automation_permissions.c.automation_id.in_(automation_ids))
+        ).all()
+        for automation_id, user_id in rows:
+            users_of[automation_id].add(user_id)
+    return users_of
+
+
+automation_access_index = AutomationAccessIndex()
@@ -0,0 +1,137 @@
+"""
+Rollups de uso do portal (cliques do launch) para o dashboard.
+
+Os eventos brutos ficam em automation_clicks. Ao gravar cada lote, o ClickBuffer agrega os
+eventos em memória e soma os contadores por hora e por dia (total, por automação e por setor)
+na mesma transação, com INSERT ... ON CONFLICT DO UPDATE. As consultas do dashboard leem só os
+rollups: o custo depende da janela e do tamanho do catálogo, não do volume de cliques.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import ANALYTICS_TIMEZONE
+from app.models import UsageRollupDaily, UsageRollupHourly
+
+TOTAL, AUTOMATION, SECTOR = "total", "automation", "sector"
+
+_TZ = ZoneInfo(ANALYTICS_TIMEZONE)
+# Linhas por INSERT dos rollups (4 parâmetros cada)
+_ROWS_PER_STATEMENT = 1000
+
+
+def _hour_bucket(clicked_at: datetime) -> datetime:
+    return clicked_at.replace(minute=0, second=0, microsecond=0)
+
+
+def _local(clicked_at: datetime) -> datetime:
+    """Horários são gravados em UTC sem tzinfo (datetime.utcnow)"""
+    return clicked_at.replace(tzinfo=timezone.utc).astimezone(_TZ)
+
+
+def local_today(now: Optional[datetime] = None) -> date:
+    return _local(now or datetime.utcnow()).date()
+
+
+# --- Escrita -----------------------------------------------------------------
+
+
+def rollup_counts(events: Iterable) -> tuple[Counter, Counter]:
+    """Contagens (bucket, dimensão, chave) de um lote de ClickEvent"""
+    hourly: Counter = Counter()
+    daily: Counter = Counter()
+    for event in events:
+        hour, day = _hour_bucket(event.clicked_at), _local(event.clicked_at).date()
+        keys = [(TOTAL, 0), (AUTOMATION, event.automation_id)]
+        if event.sector_id is not None:
+            keys.append((SECTOR, event.sector_id))
+        for dimension, key in keys:
+            hourly[(hour, dimension, key)] += 1
+            daily[(day, dimension, key)] += 1
+    return hourly, daily
+
+
+def _increment_statement(db: Session, model, items: list[tuple[tuple, int]]):
+    table = model.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table).values([
+        {"bucket": bucket, "dimension": dimension, "key": key, "clicks": clicks}
+        for (bucket, dimension, key), clicks in items
+    ])
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.bucket, table.c.dimension, table.c.key],
+        set_={"clicks": table.c.clicks + statement.excluded.clicks},
+    )
+
+
+def apply_rollups(db: Session, events: Iterable) -> None:
+    """
+    Soma o lote aos rollups na transação do chamador. As chaves vão sempre na mesma ordem, então
+    dois workers gravando ao mesmo tempo não travam um ao outro (deadlock) nas mesmas linhas.
+    """
+    hourly, daily = rollup_counts(events)
+    for model, counts in ((UsageRollupHourly, hourly), (UsageRollupDaily, daily)):
+        items = sorted(counts.items())
+        for start in range(0, len(items), _ROWS_PER_STATEMENT):
+            db.execute(_increment_statement(db, model, items[start:start + _ROWS_PER_STATEMENT]))
+
+
+# --- Consulta ----------------------------------------------------------------
+
+
+def _first_day(days: int, today: date) -> date:
+    return today - timedelta(days=days - 1)
+
+
+def clicks_since(db: Session, first_day: date) -> int:
+    total = db.execute(
+        select(func.coalesce(func.sum(UsageRollupDaily.clicks), 0))
+        .where(UsageRollupDaily.dimension == TOTAL, UsageRollupDaily.bucket >= first_day)
+    ).scalar()
+    return int(total)
+
+
+def clicks_per_day(db: Session, days: int, today: Optional[date] = None) -> list[tuple[date, int]]:
+    """Série diária da janela, com zero nos dias sem cliques"""
+    today = today or local_today()
+    first_day = _first_day(days, today)
+    rows = db.execute(
+        select(UsageRollupDaily.bucket, UsageRollupDaily.clicks)
+        .where(UsageRollupDaily.dimension == TOTAL, UsageRollupDaily.bucket >= first_day)
+    ).all()
+    by_day = dict(rows)
+    return [(first_day + timedelta(days=offset), by_day.get(first_day + timedelta(days=offset), 0))
+            for offset in range(days)]
+
+
+def top_keys(db: Session, dimension: str, days: int, limit: int, today: Optional[date] = None) -> list[tuple[int, int]]:
+    """(chave, cliques) mais usados da dimensão na janela"""
+    first_day = _first_day(days, today or local_today())
+    clicks = func.sum(UsageRollupDaily.clicks)
+    rows = db.execute(
+        select(UsageRollupDaily.key, clicks)
+        .where(UsageRollupDaily.dimension == dimension, UsageRollupDaily.bucket >= first_day)
+        .group_by(UsageRollupDaily.key)
+        .order_by(clicks.desc(), UsageRollupDaily.key)
+        .limit(limit)
+    ).all()
+    return [(key, int(total)) for key, total in rows]
+
+
+def clicks_by_hour_of_day(db: Session, days: int, now: Optional[datetime] = None) -> list[int]:
+    """Cliques por hora local (0-23) na janela: no máximo 24 * days linhas de rollup"""
+    now = now or datetime.utcnow()
+    since = _hour_bucket(now) - timedelta(days=days)
+    rows = db.execute(
+        select(UsageRollupHourly.bucket, UsageRollupHourly.clicks)
+        .where(UsageRollupHourly.dimension == TOTAL, UsageRollupHourly.bucket > since)
+    ).all()
+    hours = [0] * 24
+    for bucket, clicks in rows:
+        hours[_local(bucket).hour] += clicks
+    return hours
@@ -0,0 +1,126 @@
+"""
+Audit log append-only: quem alterou (ou entrou/saiu) o quê e quando.
+
+Os handlers chamam audit_log.emit() depois do commit; o registro só entra numa fila limitada em
+memória e uma task de background grava em INSERTs multi-row (WriteBehindBuffer), então a latência
+da request não depende da escrita do log. No Postgres a tabela é particionada por mês em
+created_at: consultas por período só leem as partições da janela e meses antigos podem ser
+descartados com DROP TABLE da partição.
+"""
+from datetime import date, datetime
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import (
+    AUDIT_BUFFER_MAX_EVENTS,
+    AUDIT_FLUSH_BATCH_SIZE,
+    AUDIT_FLUSH_INTERVAL_SECONDS,
+    AUDIT_PARTITION_MONTHS_AHEAD,
+)
+from app.database import SessionLocal, engine as default_engine
+from app.models import AuditLogEntry
+from app.write_behind import WriteBehindBuffer
+
+# Linhas por INSERT (8 parâmetros cada)
+_ROWS_PER_STATEMENT = 500
+
+_PARTITIONED_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS audit_log (
+        id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+        created_at TIMESTAMP NOT NULL,
+        actor_id INTEGER,
+        actor_email VARCHAR(255),
+        action VARCHAR(64) NOT NULL,
+        resource_type VARCHAR(32) NOT NULL,
+        resource_id VARCHAR(64),
+        details JSONB,
+        PRIMARY KEY (created_at, id)
+    ) PARTITION BY RANGE (created_at)
+"""
+
+
+class AuditRecord(NamedTuple):
+    created_at: datetime
+    actor_id: Optional[int]
+    actor_email: Optional[str]
+    action: str
+    resource_type: str
+    resource_id: Optional[str]
+    details: Optional[dict]
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def ensure_audit_schema(engine: Engine) -> None:
+    """
+    Cria a tabela particionada no Postgres (idempotente). Precisa rodar antes do create_all, que
+    senão criaria uma tabela comum; nos outros bancos o create_all cria a tabela normalmente.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        conn.execute(text(_PARTITIONED_TABLE_SQL))
+        # Rede de segurança: nenhum INSERT falha se a manutenção das partições atrasar
+        conn.execute(text("CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_log_actor_id ON audit_log (actor_id, created_at)"))
+    ensure_audit_partitions(engine)
+
+
+def ensure_audit_partitions(engine: Engine = default_engine, today: Optional[date] = None) -> None:
+    """Partições do mês corrente e dos próximos AUDIT_PARTITION_MONTHS_AHEAD meses (roda diariamente)"""
+    if engine.dialect.name != "postgresql":
+        return
+    first = (today or datetime.utcnow().date()).replace(day=1)
+    with engine.begin() as conn:
+        for offset in range(AUDIT_PARTITION_MONTHS_AHEAD + 1):
+            start, end = _add_months(first, offset), _add_months(first, offset + 1)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS audit_log_{start:%Y_%m} PARTITION OF audit_log "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+
+
+class AuditLog(WriteBehindBuffer[AuditRecord]):
+    name = "Audit log"
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_size: int = AUDIT_FLUSH_BATCH_SIZE,
+        interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+        max_events: int = AUDIT_BUFFER_MAX_EVENTS,
+    ) -> None:
+        super().__init__(session_factory, batch_size, interval, max_events)
+
+    def emit(
+        self,
+        actor: Any,
+        action: str,
+        resource_type: str,
+        resource_id: Any = None,
+        details: Optional[dict] = None,
+    ) -> None:
+        """Enfileira um registro (sem I/O). `actor` é o AuthenticatedUser da request (ou None)"""
+        self._append(AuditRecord(
+            created_at=datetime.utcnow(),
+            actor_id=getattr(actor, "id", None),
+            actor_email=getattr(actor, "email", None),
+            action=action,
+            resource_type=resource_type,
+            resource_id=str(resource_id) if resource_id is not None else None,
+            details=details,
+        ))
+
+    def _write(self, db: Session, records: list[AuditRecord]) -> None:
+        for start in range(0, len(records), _ROWS_PER_STATEMENT):
+            chunk = records[start:start + _ROWS_PER_STATEMENT]
+            db.execute(insert(AuditLogEntry.__table__).values([record._asdict() for record in chunk]))
+
+
+audit_log = AuditLog()
@@ -1,22 +1,28 @@
+import asyncio
 import base64
 import hashlib
 import secrets
 import threading
 import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Any, Callable, Optional
+from typing import Any, NamedTuple, Optional
 from urllib.parse import urlencode
 
 import httpx
 from fastapi import Depends, HTTPException, Request, status
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+from jose.exceptions import JWKError
 from pydantic import BaseModel, Field
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.config import (
+    AUTH_BYPASS_PREFIXES,
     KEYCLOAK_AUDIENCE,
     KEYCLOAK_AUTHORIZATION_URL,
     KEYCLOAK_CLIENT_ID,
@@ -25,20 +31,33 @@ from app.config import (
     KEYCLOAK_JWKS_URL,
     KEYCLOAK_SCOPE,
     KEYCLOAK_TOKEN_URL,
+    SESSION_MODE,
 )
+from app.database import SessionLocal
 from app.models import User
-
-# Contexto de senha mantido para compatibilidade com usuários locais legados, se houver
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+from app.oidc import oidc_client
+from app.passwords import PasswordPoolBusy, password_pool
+from app.session_store import ServerSessionStore, build_session_backend
+from app.token_store import refresh_token_store
 
 # Cache para as chaves públicas (JWKS) do Keycloak para evitar requests a cada validação
-_jwks_cache: dict[str, Any] = {"value": None, "expires_at": 0.0}
-_jwks_lock = threading.Lock()
-_JWKS_TTL_SECONDS = 600  # 10 minutos de cache
+_JWKS_TTL_SECONDS = 600  # 10 minutos de cache quando o Keycloak não envia max-age
+_JWKS_MIN_TTL_SECONDS = 30
+_JWKS_MAX_TTL_SECONDS = 3600
+_JWKS_STALE_TTL_SECONDS = 60 * 60 * 24  # Janela em que a chave expirada ainda é servida enquanto revalida
+_JWKS_FAILURE_BACKOFF_SECONDS = 30
+
+# Tokens já validados (assinatura + claims) ficam em cache até o 'exp'
+_VERIFIED_TOKEN_CACHE_SIZE = 10_000
+
+# Usuários resolvidos a partir de Bearer tokens (bots/integrações): até o 'exp', limitado
+# a um teto para que mudanças de role/setor no banco local apareçam sem esperar o token expirar
+_BEARER_USER_CACHE_SIZE = 10_000
+_BEARER_USER_CACHE_MAX_TTL_SECONDS = 300
 
-# Store simples em memória para refresh tokens (em produção, usar Redis é recomendado)
-_refresh_token_store: dict[str, str] = {}
-_refresh_token_lock = threading.Lock()
+# Dados locais do usuário (id, role, setor) por e-mail, invalidados pelo router de usuários
+_LOCAL_USER_CACHE_SIZE = 10_000
+_LOCAL_USER_CACHE_TTL_SECONDS = 60
 
 
 class AuthenticatedUser(BaseModel):
@@ -54,12 +73,35 @@ class AuthenticatedUser(BaseModel):
     token_claims: dict[str, Any] = Field(default_factory=dict)
 
 
+# Senhas locais (legado) usam argon2 num pool de processos dedicado, ver app/passwords.py
+
+def _password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Password hashing queue is full, try again later",
+    )
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return password_pool.verify(plain_password, hashed_password)
+    except PasswordPoolBusy as exc:
+        raise _password_pool_busy() from exc
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    try:
+        return password_pool.hash(password)
+    except PasswordPoolBusy as exc:
+        raise _password_pool_busy() from exc
+
+
+def get_password_hashes(passwords: list[str]) -> list[str]:
+    """Hash em lote: os itens rodam em paralelo entre os workers do pool"""
+    try:
+        return password_pool.hash_many(passwords)
+    except PasswordPoolBusy as exc:
+        raise _password_pool_busy() from exc
 
 
 def generate_pkce_pair() -> tuple[str, str]:
@@ -98,30 +140,279 @@ def pick_primary_role(roles: list[str], fallback: str = "user") -> str:
     return fallback
 
 
-def _fetch_jwks() -> dict[str, Any]:
-    """Busca as chaves públicas do Keycloak com cache"""
-    now = time.time()
-    with _jwks_lock:
-        if _jwks_cache["value"] and _jwks_cache["expires_at"] > now:
-            return _jwks_cache["value"]
+def _parse_max_age(cache_control: Optional[str]) -> Optional[int]:
+    """Extrai o max-age do header Cache-Control (None se ausente ou no-cache/no-store)"""
+    if not cache_control:
+        return None
+    directives = [part.strip().lower() for part in cache_control.split(",")]
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    for directive in directives:
+        if directive.startswith("max-age="):
+            try:
+                return max(0, int(directive.split("=", 1)[1].strip('"')))
+            except ValueError:
+                return None
+    return None
 
-    try:
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(KEYCLOAK_JWKS_URL)
-            response.raise_for_status()
-            jwks = response.json()
-
-        with _jwks_lock:
-            _jwks_cache["value"] = jwks
-            _jwks_cache["expires_at"] = time.time() + _JWKS_TTL_SECONDS
+
+class JWKSManager:
+    """
+    Cache assíncrono das chaves públicas (JWKS) do Keycloak.
+
+    - Single-flight: requisições concorrentes com cache vazio/expirado aguardam um único fetch.
+    - Stale-while-revalidate: com o cache expirado (mas dentro da janela de stale), devolve a chave
+      antiga imediatamente e dispara o refresh em background.
+    - Respeita o max-age do Cache-Control do Keycloak (limitado entre min_ttl e max_ttl).
+    - Mantém a última versão válida (last-known-good) para que uma falha do Keycloak não vire indisponibilidade.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        default_ttl: float = _JWKS_TTL_SECONDS,
+        min_ttl: float = _JWKS_MIN_TTL_SECONDS,
+        max_ttl: float = _JWKS_MAX_TTL_SECONDS,
+        stale_ttl: float = _JWKS_STALE_TTL_SECONDS,
+        failure_backoff: float = _JWKS_FAILURE_BACKOFF_SECONDS,
+    ) -> None:
+        self.url = url
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.stale_ttl = stale_ttl
+        self.failure_backoff = failure_backoff
+        self._jwks: Optional[dict[str, Any]] = None
+        self._fresh_until = 0.0
+        self._stale_until = 0.0
+        self._last_forced_refresh = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+
+    @property
+    def last_known_good(self) -> Optional[dict[str, Any]]:
+        return self._jwks
+
+    def invalidate(self) -> None:
+        """Marca o cache como expirado, preservando a cópia last-known-good"""
+        self._fresh_until = 0.0
+
+    def reset(self) -> None:
+        self._jwks = None
+        self._fresh_until = 0.0
+        self._stale_until = 0.0
+        self._last_forced_refresh = 0.0
+        self._inflight = None
+
+    async def get(self, force_refresh: bool = False) -> dict[str, Any]:
+        now = time.monotonic()
+
+        if force_refresh:
+            # Kid desconhecido: força refresh, mas no máximo uma vez por min_ttl para
+            # que tokens com kid arbitrário não virem um flood contra o Keycloak.
+            if self._jwks is not None and now - self._last_forced_refresh < self.min_ttl:
+                return self._jwks
+            self._last_forced_refresh = now
+            return await self._refresh_or_fallback()
+
+        if self._jwks is not None and now < self._fresh_until:
+            return self._jwks
+
+        if self._jwks is not None and now < self._stale_until:
+            self._ensure_refresh_task()
+            return self._jwks
+
+        return await self._refresh_or_fallback()
+
+    async def _refresh_or_fallback(self) -> dict[str, Any]:
+        try:
+            return await asyncio.shield(self._ensure_refresh_task())
+        except Exception as exc:
+            if self._jwks is not None:
+                print(f"Erro ao buscar JWKS, usando última versão válida: {exc}")
+                return self._jwks
+            print(f"Erro ao buscar JWKS: {exc}")
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth service unavailable")
+
+    def _ensure_refresh_task(self) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        task = self._inflight
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._refresh())
+            task.add_done_callback(self._consume_task_result)
+            self._inflight = task
+        return task
+
+    @staticmethod
+    def _consume_task_result(task: asyncio.Task) -> None:
+        # Evita "Task exception was never retrieved" em refresh de background que falhou
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self) -> tuple[dict[str, Any], Optional[str]]:
+        """Faz o GET no endpoint de certs; retorna (jwks, header Cache-Control)"""
+        response = await oidc_client.get(self.url)
+        response.raise_for_status()
+        return response.json(), response.headers.get("cache-control")
+
+    async def _refresh(self) -> dict[str, Any]:
+        try:
+            jwks, cache_control = await self._fetch()
+            if not isinstance(jwks, dict) or not isinstance(jwks.get("keys"), list):
+                raise ValueError("Invalid JWKS document")
+        except Exception:
+            # Evita martelar o Keycloak enquanto ele está fora: tenta novamente após o backoff
+            self._fresh_until = time.monotonic() + self.failure_backoff
+            raise
+
+        ttl = _parse_max_age(cache_control)
+        ttl = self.default_ttl if ttl is None else min(max(ttl, self.min_ttl), self.max_ttl)
+        now = time.monotonic()
+        self._jwks = jwks
+        self._fresh_until = now + ttl
+        self._stale_until = now + ttl + self.stale_ttl
         return jwks
-    except Exception as e:
-        print(f"Erro ao buscar JWKS: {e}")
-        # Se falhar e tiver cache antigo, tenta usar (opcional, aqui falha direto)
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth service unavailable")
 
 
-def _find_signing_key(token: str) -> dict[str, Any]:
+_jwks_manager = JWKSManager(KEYCLOAK_JWKS_URL)
+
+
+async def _fetch_jwks(force_refresh: bool = False) -> dict[str, Any]:
+    """Busca as chaves públicas do Keycloak com cache"""
+    return await _jwks_manager.get(force_refresh=force_refresh)
+
+
+class SigningKeyRegistry:
+    """
+    Registro de chaves públicas já construídas (jose Key) indexadas por kid.
+
+    Cada JWK é convertido em objeto de chave uma única vez; o registro só é reconstruído
+    quando o documento JWKS muda (rotação), reaproveitando as chaves cujo JWK não mudou.
+    """
+
+    def __init__(self) -> None:
+        self._source: Optional[dict[str, Any]] = None
+        self._jwks_by_kid: dict[str, dict[str, Any]] = {}
+        self._keys: dict[str, Key] = {}
+        self._lock = threading.Lock()
+
+    def get(self, jwks: dict[str, Any], kid: str) -> Optional[Key]:
+        if jwks is not self._source:
+            self._rebuild(jwks)
+        return self._keys.get(kid)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._source = None
+            self._jwks_by_kid = {}
+            self._keys = {}
+
+    def _rebuild(self, jwks: dict[str, Any]) -> None:
+        with self._lock:
+            if jwks is self._source:
+                return
+            jwks_by_kid: dict[str, dict[str, Any]] = {}
+            keys: dict[str, Key] = {}
+            for jwk_data in jwks.get("keys", []):
+                kid = jwk_data.get("kid")
+                if not kid or jwk_data.get("use", "sig") != "sig":
+                    continue
+                jwks_by_kid[kid] = jwk_data
+                if self._jwks_by_kid.get(kid) == jwk_data:
+                    keys[kid] = self._keys[kid]
+                    continue
+                try:
+                    keys[kid] = jwk.construct(jwk_data, jwk_data.get("alg") or "RS256")
+                except JWKError as exc:
+                    print(f"Ignorando JWK inválido (kid={kid}): {exc}")
+
+            removed_kids = set(self._keys) - set(keys)
+            self._source = jwks
+            self._jwks_by_kid = jwks_by_kid
+            self._keys = keys
+
+        # Chave removida do Keycloak: tokens assinados por ela não devem mais sair do cache
+        if removed_kids:
+            _verified_token_cache.clear()
+
+
+class TokenCache:
+    """LRU limitado indexado pelo digest SHA-256 da chave (token, e-mail); cada entrada expira em expires_at"""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[Any]:
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+        return value
+
+    def put(self, token: str, value: Any, expires_at: Any) -> None:
+        if not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+            return
+        digest = self._digest(token)
+        with self._lock:
+            self._entries[digest] = (value, float(expires_at))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(self._digest(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class VerifiedTokenCache(TokenCache):
+    """Claims de tokens já validados, expirados no 'exp' do próprio token"""
+
+    def __init__(self, maxsize: int = _VERIFIED_TOKEN_CACHE_SIZE) -> None:
+        super().__init__(maxsize)
+
+    def get(self, token: str) -> Optional[dict[str, Any]]:
+        claims = super().get(token)
+        return dict(claims) if claims is not None else None
+
+    def put(self, token: str, claims: dict[str, Any]) -> None:
+        super().put(token, dict(claims), claims.get("exp"))
+
+
+_signing_key_registry = SigningKeyRegistry()
+_verified_token_cache = VerifiedTokenCache()
+_bearer_user_cache = TokenCache(maxsize=_BEARER_USER_CACHE_SIZE)
+_local_user_cache = TokenCache(maxsize=_LOCAL_USER_CACHE_SIZE)
+_NO_LOCAL_USER = object()
+
+
+def reset_auth_caches() -> None:
+    """Esvazia JWKS, chaves, tokens validados e usuários em cache (testes e troca de provedor)"""
+    _jwks_manager.reset()
+    _signing_key_registry.clear()
+    _verified_token_cache.clear()
+    _bearer_user_cache.clear()
+    _local_user_cache.clear()
+
+
+async def _find_signing_key(token: str) -> Key:
     """Encontra a chave pública correta para o token baseada no header 'kid'"""
     try:
         header = jwt.get_unverified_header(token)
@@ -132,33 +423,32 @@ def _find_signing_key(token: str) -> dict[str, Any]:
     if not kid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="JWT without kid header")
 
-    jwks = _fetch_jwks()
-    for key in jwks.get("keys", []):
-        if key.get("kid") == kid:
-            return key
+    key = _signing_key_registry.get(await _fetch_jwks(), kid)
+    if key:
+        return key
             
     # Se não achou, força refresh do cache e tenta de novo (caso a chave tenha rotacionado)
-    with _jwks_lock:
-        _jwks_cache["expires_at"] = 0
-    
-    jwks = _fetch_jwks()
-    for key in jwks.get("keys", []):
-        if key.get("kid") == kid:
-            return key
+    key = _signing_key_registry.get(await _fetch_jwks(force_refresh=True), kid)
+    if key:
+        return key
             
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Signing key not found")
 
 
-def validate_keycloak_jwt(token: str) -> dict[str, Any]:
+async def validate_keycloak_jwt(token: str) -> dict[str, Any]:
     """Valida assinatura, expiração, issuer e audience do JWT"""
-    signing_key = _find_signing_key(token)
+    cached_claims = _verified_token_cache.get(token)
+    if cached_claims is not None:
+        return cached_claims
+
+    signing_key = await _find_signing_key(token)
     
     # Se KEYCLOAK_AUDIENCE não estiver definido, usa o Client ID como padrão
     # Keycloak muitas vezes coloca o 'account' como audience também, então verify_aud=True requer cuidado
     audience = KEYCLOAK_AUDIENCE or KEYCLOAK_CLIENT_ID
     
     try:
-        return jwt.decode(
+        claims = jwt.decode(
             token,
             signing_key,
             algorithms=["RS256"],
@@ -177,6 +467,9 @@ def validate_keycloak_jwt(token: str) -> dict[str, Any]:
             headers={"WWW-Authenticate": "Bearer"},
         ) from exc
 
+    _verified_token_cache.put(token, claims)
+    return claims
+
 
 def build_authorization_url(state: str, code_challenge: str, redirect_uri: str) -> str:
     """Constrói a URL para redirecionar o usuário para o login do Keycloak"""
@@ -194,7 +487,7 @@ def build_authorization_url(state: str, code_challenge: str, redirect_uri: str)
     return f"{KEYCLOAK_AUTHORIZATION_URL}?{query}"
 
 
-def exchange_code_for_tokens(code: str, code_verifier: str, redirect_uri: str) -> dict[str, Any]:
+async def exchange_code_for_tokens(code: str, code_verifier: str, redirect_uri: str) -> dict[str, Any]:
     """Troca o authorization code por tokens (Access, ID, Refresh)"""
     payload = {
         "grant_type": "authorization_code",
@@ -208,17 +501,19 @@ def exchange_code_for_tokens(code: str, code_verifier: str, redirect_uri: str) -
     if KEYCLOAK_CLIENT_SECRET:
         payload["client_secret"] = KEYCLOAK_CLIENT_SECRET
 
-    with httpx.Client(timeout=10.0) as client:
-        response = client.post(KEYCLOAK_TOKEN_URL, data=payload)
-        if response.status_code >= 400:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=f"Token exchange failed: {response.text}",
-            )
-        return response.json()
+    try:
+        response = await oidc_client.post_form(KEYCLOAK_TOKEN_URL, data=payload)
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth service unavailable") from exc
+    if response.status_code >= 400:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Token exchange failed: {response.text}",
+        )
+    return response.json()
 
 
-def refresh_access_token(refresh_token: str) -> dict[str, Any]:
+async def refresh_access_token(refresh_token: str) -> dict[str, Any]:
     """Usa o refresh token para obter um novo access token"""
     payload = {
         "grant_type": "refresh_token",
@@ -228,14 +523,16 @@ def refresh_access_token(refresh_token: str) -> dict[str, Any]:
     if KEYCLOAK_CLIENT_SECRET:
         payload["client_secret"] = KEYCLOAK_CLIENT_SECRET
 
-    with httpx.Client(timeout=10.0) as client:
-        response = client.post(KEYCLOAK_TOKEN_URL, data=payload)
-        if response.status_code >= 400:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=f"Refresh token failed: {response.text}",
-            )
-        return response.json()
+    try:
+        response = await oidc_client.post_form(KEYCLOAK_TOKEN_URL, data=payload)
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth service unavailable") from exc
+    if response.status_code >= 400:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Refresh token failed: {response.text}",
+        )
+    return response.json()
 
 
 # --- Gerenciamento de Sessão ---
@@ -248,21 +545,119 @@ def get_or_create_session_id(request: Request) -> str:
     return sid
 
 
-def set_refresh_token_for_session(sid: str, refresh_token: str) -> None:
-    with _refresh_token_lock:
-        _refresh_token_store[sid] = refresh_token
+def set_refresh_token_for_session(sid: str, refresh_token: str, ttl: Optional[int] = None) -> None:
+    """Guarda o refresh token da sessão; ttl normalmente vem do refresh_expires_in do Keycloak"""
+    refresh_token_store.set(sid, refresh_token, ttl)
 
 
 def get_refresh_token_for_session(sid: str) -> Optional[str]:
-    with _refresh_token_lock:
-        return _refresh_token_store.get(sid)
+    return refresh_token_store.get(sid)
 
 
 def clear_refresh_token_for_session(sid: Optional[str]) -> None:
     if not sid:
         return
-    with _refresh_token_lock:
-        _refresh_token_store.pop(sid, None)
+    refresh_token_store.delete(sid)
+
+
+user_session_store: ServerSessionStore[AuthenticatedUser] = ServerSessionStore(
+    build_session_backend(),
+    factory=AuthenticatedUser.model_validate,
+)
+
+
+def start_user_session(request: Request, auth_user: AuthenticatedUser) -> str:
+    """
+    Persiste o usuário autenticado e devolve o sid da nova sessão.
+    O sid é sempre regenerado no login (evita session fixation).
+    """
+    old_sid = request.session.get("sid")
+    if old_sid:
+        user_session_store.delete(old_sid)
+        clear_refresh_token_for_session(old_sid)
+
+    sid = secrets.token_urlsafe(32)
+    request.session["sid"] = sid
+    if SESSION_MODE == "server":
+        user_session_store.save(sid, auth_user, auth_user.model_dump())
+        request.session.pop("user", None)
+    else:
+        request.session["user"] = auth_user.model_dump()
+    return sid
+
+
+def clear_user_session(request: Request) -> None:
+    """Remove o usuário da sessão mantendo o cookie (usado ao iniciar um novo login)"""
+    sid = request.session.get("sid")
+    if sid:
+        user_session_store.delete(sid)
+    request.session.pop("user", None)
+
+
+def end_user_session(request: Request) -> None:
+    """Logout local: remove usuário, refresh token e limpa o cookie"""
+    sid = request.session.get("sid")
+    if sid:
+        user_session_store.delete(sid)
+        clear_refresh_token_for_session(sid)
+    request.session.clear()
+
+
+async def load_session_user(request: Request) -> Optional[AuthenticatedUser]:
+    """Resolve o usuário da sessão: store server-side pelo sid, com fallback para cookies antigos"""
+    sid = request.session.get("sid")
+    if SESSION_MODE == "server" and sid:
+        user = user_session_store.peek(sid)
+        if user is None:
+            user = await run_in_threadpool(user_session_store.load, sid)
+        if user is not None:
+            return user
+
+    # Cookies emitidos no modo "cookie" (ou antes da migração) ainda carregam o usuário
+    session_user_data = request.session.get("user")
+    if session_user_data:
+        try:
+            return AuthenticatedUser(**session_user_data)
+        except Exception:
+            # Se o modelo mudar ou dados corrompidos, limpa a sessão
+            request.session.pop("user", None)
+    return None
+
+
+class LocalUserRecord(NamedTuple):
+    """Projeção enxuta do usuário local usada no login (sem carregar preferences/relacionamentos)"""
+    id: int
+    role: Optional[str]
+    is_admin: Optional[bool]
+    full_name: str
+    sector_id: Optional[int]
+
+
+def lookup_local_user(db: Session, email: str) -> Optional[LocalUserRecord]:
+    """Busca (com cache TTL por e-mail minúsculo) os campos do usuário local necessários ao login"""
+    cache_key = email.lower()
+    cached = _local_user_cache.get(cache_key)
+    if cached is not None:
+        return None if cached is _NO_LOCAL_USER else cached
+
+    row = (
+        db.query(User.id, User.role, User.is_admin, User.full_name, User.sector_id)
+        .filter(func.lower(User.email) == cache_key)
+        .first()
+    )
+    record = LocalUserRecord(*row) if row else None
+    # Também guarda a ausência, para que logins só-Keycloak não consultem o banco toda vez
+    _local_user_cache.put(cache_key, record or _NO_LOCAL_USER, time.time() + _LOCAL_USER_CACHE_TTL_SECONDS)
+    return record
+
+
+def invalidate_local_user(*emails: Optional[str]) -> None:
+    """Chamado pelo router de usuários após qualquer escrita que afete o usuário"""
+    for email in emails:
+        if email:
+            _local_user_cache.discard(email.lower())
+    # Usuários de Bearer token embutem os mesmos dados locais
+    _bearer_user_cache.clear()
 
 
 def _claims_to_authenticated_user(claims: dict[str, Any], db: Session) -> AuthenticatedUser:
@@ -275,7 +670,7 @@ def _claims_to_authenticated_user(claims: dict[str, Any], db: Session) -> Authen
     keycloak_roles = extract_roles(claims)
     
     # Tenta vincular com usuário local pelo email para pegar preferências/setor
-    local_user = db.query(User).filter(User.email == email).first() if email else None
+    local_user = lookup_local_user(db, email) if email else None
 
     # Define role principal (prioridade para Keycloak, fallback para local)
     primary_role = pick_primary_role(keycloak_roles, fallback=(local_user.role if local_user else "user"))
@@ -306,34 +701,101 @@ def claims_to_authenticated_user(claims: dict[str, Any], db: Session) -> Authent
     return _claims_to_authenticated_user(claims, db)
 
 
-class KeycloakJWTMiddleware(BaseHTTPMiddleware):
+class KeycloakJWTMiddleware:
     """
-    Middleware que popula request.state.auth_user baseado na sessão.
-    Não valida o JWT remotamente a cada request para performance, confia na sessão segura (cookie assinado).
+    Middleware ASGI puro de autenticação por sessão.
+
+    - Prefixos em bypass_prefixes (estáticos, /health) seguem direto para a aplicação,
+      sem parse do cookie de sessão.
+    - Com session_options, embute o SessionMiddleware só para as demais rotas.
+    - Não constrói o AuthenticatedUser aqui: ele é resolvido sob demanda por
+      require_session_user, apenas quando alguma dependência pede o usuário.
     """
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        session_user_data = request.session.get("user") if "session" in request.scope else None
-        if session_user_data:
-            try:
-                request.state.auth_user = AuthenticatedUser(**session_user_data)
-            except Exception:
-                # Se o modelo mudar ou dados corrompidos, limpa a sessão
-                request.session.pop("user", None)
-        
-        return await call_next(request)
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        bypass_prefixes: tuple[str, ...] = AUTH_BYPASS_PREFIXES,
+        session_options: Optional[dict[str, Any]] = None,
+    ) -> None:
+        self.app = app
+        self.bypass_prefixes = tuple(bypass_prefixes)
+        self.session_app: ASGIApp = SessionMiddleware(app, **session_options) if session_options else app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket") or (
+            self.bypass_prefixes and scope["path"].startswith(self.bypass_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+        await self.session_app(scope, receive, send)
 
 
 # --- Dependências para Rotas ---
 
-def require_session_user(request: Request) -> AuthenticatedUser:
-    """Dependência que exige usuário logado na sessão"""
-    if hasattr(request.state, "auth_user") and request.state.auth_user:
-        return request.state.auth_user
+def _extract_bearer_token(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+def _load_bearer_user(claims: dict[str, Any]) -> AuthenticatedUser:
+    db = SessionLocal()
+    try:
+        return _claims_to_authenticated_user(claims, db)
+    finally:
+        db.close()
+
+
+async def authenticate_bearer_token(token: str) -> AuthenticatedUser:
+    """
+    Autentica clientes de máquina (service accounts do Keycloak) via Authorization: Bearer.
+    O mapeamento token -> usuário fica em cache até o exp, evitando RSA verify + consulta ao banco a cada chamada.
+    """
+    auth_user = _bearer_user_cache.get(token)
+    if auth_user is not None:
+        return auth_user
+
+    claims = await validate_keycloak_jwt(token)
+    auth_user = await run_in_threadpool(_load_bearer_user, claims)
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        _bearer_user_cache.put(token, auth_user, min(exp, time.time() + _BEARER_USER_CACHE_MAX_TTL_SECONDS))
+    return auth_user
+
+
+async def get_request_user(request: Request) -> Optional[AuthenticatedUser]:
+    """Resolve (uma vez por request) o usuário autenticado; o resultado fica em request.state.auth_user"""
+    auth_user = getattr(request.state, "auth_user", None)
+    if auth_user is not None or getattr(request.state, "auth_resolved", False):
+        return auth_user
+
+    bearer_token = _extract_bearer_token(request)
+    if bearer_token:
+        # Credencial explícita tem precedência sobre a sessão; token inválido -> 401
+        auth_user = await authenticate_bearer_token(bearer_token)
+    elif "session" in request.scope:
+        auth_user = await load_session_user(request)
+    request.state.auth_user = auth_user
+    request.state.auth_resolved = True
+    return auth_user
+
+
+async def require_session_user(request: Request) -> AuthenticatedUser:
+    """Dependência que exige usuário logado (sessão do navegador ou Bearer token)"""
+    auth_user = await get_request_user(request)
+    if auth_user:
+        return auth_user
 
     # Se for API call, retorna 401. Se for navegação, o frontend deve redirecionar para login.
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
     )
 
 
@@ -0,0 +1,96 @@
+"""
+Cache dos corpos JSON de /automations e /sectors, com ETag forte e resposta 304.
+
+Cada entrada guarda o corpo já serializado para um escopo de acesso (admin, manager/analyst,
+setor + permissões diretas) na versão atual do catálogo. Qualquer escrita nos routers de
+automações, setores ou usuários chama invalidate(), que incrementa a versão e descarta tudo.
+O ETag é o digest do corpo: igual entre workers para o mesmo conteúdo, então um If-None-Match
+continua valendo mesmo quando o balanceador troca de worker.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+
+from app.config import CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL_SECONDS
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+    version: int
+    expires_at: float
+
+
+def serialize(adapter: TypeAdapter, rows: Any) -> bytes:
+    """Valida como o response_model faria (from_attributes + validators) e serializa direto para bytes"""
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def _etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparação fraca: ignora o prefixo W/
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class CatalogCache:
+    def __init__(self, maxsize: int = CATALOG_CACHE_SIZE, ttl: float = CATALOG_CACHE_TTL_SECONDS) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self._entries: OrderedDict[Hashable, CachedBody] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != self.version or entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, body: bytes, version: int) -> CachedBody:
+        """Guarda o corpo montado na versão `version`; se houve escrita no meio, só devolve sem cachear"""
+        entry = CachedBody(body, _etag_for(body), version, time.monotonic() + self.ttl)
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def serve(self, request: Request, key: Hashable, build_body: Callable[[], bytes]) -> Response:
+        """Responde do cache (ou 304) sem tocar no ORM; só chama build_body em cache miss"""
+        entry = self.get(key)
+        if entry is None:
+            version = self.version
+            entry = self.put(key, build_body(), version)
+
+        headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,101 @@
+"""
+Versão monotônica do catálogo de automações e tombstones para o delta-sync.
+
+Toda escrita no catálogo pega a próxima versão com UPDATE catalog_state SET version = version + 1
+na própria transação e grava em automations.version (ou num tombstone, para remoções). O lock da
+linha do contador vale até o commit, então as versões ficam visíveis na ordem em que foram
+geradas: quem leu a versão N já enxerga todas as escritas <= N. Por isso a sincronização usa a
+versão e não updated_at (relógios de workers diferentes e commits fora de ordem perderiam linhas).
+"""
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import CATALOG_TOMBSTONE_RETENTION_DAYS
+from app.database import SessionLocal
+from app.models import Automation, CatalogState, CatalogTombstone, automation_permissions
+
+_STATE_ID = 1
+
+
+def next_version(db: Session) -> int:
+    """Reserva a próxima versão (bloqueia outras escritas no catálogo até o commit)"""
+    bump = (
+        update(CatalogState)
+        .where(CatalogState.id == _STATE_ID)
+        .values(version=CatalogState.version + 1)
+        .returning(CatalogState.version)
+    )
+    version = db.execute(bump).scalar_one_or_none()
+    if version is None:
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        db.execute(
+            dialect.insert(CatalogState)
+            .values(id=_STATE_ID, version=0, purged_through=0)
+            .on_conflict_do_nothing(index_elements=[CatalogState.id])
+        )
+        version = db.execute(bump).scalar_one()
+    return version
+
+
+def current_state(db: Session) -> tuple[int, int]:
+    """(versão atual, versão até a qual os tombstones já foram expurgados)"""
+    row = db.execute(
+        select(CatalogState.version, CatalogState.purged_through).where(CatalogState.id == _STATE_ID)
+    ).first()
+    return (row.version, row.purged_through) if row else (0, 0)
+
+
+def touch_sector_automations(db: Session, sector_id: int) -> None:
+    """Nova versão para as automações do setor (o nome do setor vai junto de cada automação)"""
+    automation_ids = select(automation_permissions.c.automation_id).where(
+        automation_permissions.c.sector_id == sector_id
+    )
+    if db.execute(automation_ids.limit(1)).first() is None:
+        return
+    db.execute(
+        update(Automation)
+        .where(Automation.id.in_(automation_ids))
+        .values(version=next_version(db))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_deletions(db: Session, version: int, automation_ids: Iterable[int]) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {"version": version, "automation_id": automation_id, "created_at": now}
+        for automation_id in automation_ids
+    ]
+    if rows:
+        db.execute(insert(CatalogTombstone.__table__).values(rows))
+
+
+def record_access_change(db: Session, user_id: int) -> None:
+    """Acesso do usuário mudou (setor, perfil, permissões diretas): o próximo sync dele é completo"""
+    db.add(CatalogTombstone(version=next_version(db), user_id=user_id))
+
+
+def purge_tombstones(session_factory=SessionLocal, retention_days: int = CATALOG_TOMBSTONE_RETENTION_DAYS) -> int:
+    """Remove tombstones antigos e avança purged_through (roda periodicamente)"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    db = session_factory()
+    try:
+        newest = db.execute(
+            select(func.max(CatalogTombstone.version)).where(CatalogTombstone.created_at < cutoff)
+        ).scalar()
+        if newest is None:
+            return 0
+        removed = db.execute(delete(CatalogTombstone).where(CatalogTombstone.version <= newest)).rowcount
+        db.execute(
+            update(CatalogState)
+            .where(CatalogState.id == _STATE_ID, CatalogState.purged_through < newest)
+            .values(purged_through=newest)
+        )
+        db.commit()
+        return removed
+    finally:
+        db.close()
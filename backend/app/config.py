@@ -38,3 +38,98 @@ KEYCLOAK_AUTHORIZATION_URL = f"{_KEYCLOAK_ISSUER_BASE}/protocol/openid-connect/a
 KEYCLOAK_TOKEN_URL = f"{_KEYCLOAK_ISSUER_BASE}/protocol/openid-connect/token"
 KEYCLOAK_JWKS_URL = f"{_KEYCLOAK_ISSUER_BASE}/protocol/openid-connect/certs"
 KEYCLOAK_LOGOUT_URL = f"{_KEYCLOAK_ISSUER_BASE}/protocol/openid-connect/logout"
+
+# Cliente HTTP compartilhado com o Keycloak (token, refresh, JWKS)
+OIDC_HTTP_MAX_CONNECTIONS = int(os.getenv("OIDC_HTTP_MAX_CONNECTIONS", "20"))
+OIDC_HTTP_MAX_KEEPALIVE = int(os.getenv("OIDC_HTTP_MAX_KEEPALIVE", "10"))
+OIDC_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("OIDC_HTTP_KEEPALIVE_EXPIRY", "60"))
+OIDC_HTTP_TIMEOUT = float(os.getenv("OIDC_HTTP_TIMEOUT", "10"))
+OIDC_HTTP_CONNECT_TIMEOUT = float(os.getenv("OIDC_HTTP_CONNECT_TIMEOUT", "3"))
+OIDC_HTTP_RETRIES = int(os.getenv("OIDC_HTTP_RETRIES", "2"))
+OIDC_HTTP_BACKOFF_BASE = float(os.getenv("OIDC_HTTP_BACKOFF_BASE", "0.1"))
+OIDC_HTTP_BACKOFF_MAX = float(os.getenv("OIDC_HTTP_BACKOFF_MAX", "2"))
+
+# Refresh tokens por sessão: "memory" (processo atual) ou "sql" (tabela compartilhada entre workers)
+REFRESH_TOKEN_STORE = os.getenv("REFRESH_TOKEN_STORE", "memory").lower()
+# TTL padrão quando o Keycloak não informa refresh_expires_in (alinhado ao max_age do cookie de sessão)
+REFRESH_TOKEN_TTL_SECONDS = int(os.getenv("REFRESH_TOKEN_TTL_SECONDS", str(60 * 60 * 8)))
+REFRESH_TOKEN_PURGE_INTERVAL_SECONDS = int(os.getenv("REFRESH_TOKEN_PURGE_INTERVAL_SECONDS", "300"))
+# Chave (qualquer texto) para cifrar os refresh tokens gravados no store "sql"; vazia deriva do SECRET_KEY.
+# Trocar a chave invalida os tokens gravados: os usuários afetados fazem login de novo
+REFRESH_TOKEN_ENCRYPTION_KEY = os.getenv("REFRESH_TOKEN_ENCRYPTION_KEY", "")
+
+# Sessão de login: "server" guarda o usuário no servidor e o cookie leva só o id opaco;
+# "cookie" mantém o comportamento antigo (usuário serializado no cookie assinado)
+SESSION_MODE = os.getenv("SESSION_MODE", "server").lower()
+# Store compartilhado das sessões server-side: "sql" (entre workers, sobrevive a deploys e reinícios)
+# ou "memory" (só o processo atual: cada reinício desloga todo mundo; use apenas em desenvolvimento)
+SESSION_STORE = os.getenv("SESSION_STORE", "sql").lower()
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(60 * 60 * 8)))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+# Por quanto tempo um worker confia na cópia local antes de reler o store compartilhado
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "30"))
+
+# Prefixos servidos sem sessão/autenticação (estáticos e health check): não passam pelo parse do cookie
+AUTH_BYPASS_PREFIXES = tuple(
+    prefix.strip()
+    for prefix in os.getenv("AUTH_BYPASS_PREFIXES", "/assets/,/health,/favicon.ico,/robot.svg").split(",")
+    if prefix.strip()
+)
+
+# Hash de senha (argon2) num pool de processos dedicado; 0 workers = hash inline no processo atual
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "10"))
+
+# Índices em memória do catálogo (acesso por setor/usuário, autocomplete); reconstruídos
+# periodicamente para absorver alterações feitas por outros workers
+ACCESS_INDEX_REFRESH_SECONDS = int(os.getenv("ACCESS_INDEX_REFRESH_SECONDS", "300"))
+
+# Cache dos corpos serializados de /automations e /sectors por escopo de acesso (ETag/304).
+# O TTL limita por quanto tempo um worker serve o catálogo sem ver escritas feitas em outro worker
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "512"))
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "60"))
+
+# Máximo de itens (upserts + deletes) aceitos por POST /automations/bulk
+AUTOMATION_BULK_MAX_ITEMS = int(os.getenv("AUTOMATION_BULK_MAX_ITEMS", "1000"))
+
+# Monitor de saúde dos target_url das automações ativas (sondagens em background por worker)
+HEALTH_MONITOR_ENABLED = os.getenv("HEALTH_MONITOR_ENABLED", "true").lower() == "true"
+# Intervalo normal entre sondagens de um alvo estável e o mínimo usado para alvos instáveis
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "300"))
+HEALTH_CHECK_MIN_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_MIN_INTERVAL_SECONDS", "30"))
+HEALTH_CHECK_CONCURRENCY = int(os.getenv("HEALTH_CHECK_CONCURRENCY", "20"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "5"))
+# Espaçamento mínimo entre sondagens ao mesmo host (vários robôs atrás do mesmo servidor)
+HEALTH_CHECK_HOST_SPACING_SECONDS = float(os.getenv("HEALTH_CHECK_HOST_SPACING_SECONDS", "1"))
+# Sondagens guardadas por alvo para latência, uptime e detecção de instabilidade
+HEALTH_CHECK_HISTORY_SIZE = int(os.getenv("HEALTH_CHECK_HISTORY_SIZE", "20"))
+
+# Cliques em /automations/{id}/launch: bufferizados em memória e gravados em lote por uma task
+# de background quando o lote enche ou o intervalo vence
+CLICK_FLUSH_BATCH_SIZE = int(os.getenv("CLICK_FLUSH_BATCH_SIZE", "500"))
+CLICK_FLUSH_INTERVAL_SECONDS = float(os.getenv("CLICK_FLUSH_INTERVAL_SECONDS", "5"))
+# Teto do buffer se o banco ficar indisponível: acima disso os cliques mais antigos são descartados
+CLICK_BUFFER_MAX_EVENTS = int(os.getenv("CLICK_BUFFER_MAX_EVENTS", "100000"))
+
+# Fuso dos dias e horários dos gráficos de uso (rollups diários e horário de pico)
+ANALYTICS_TIMEZONE = os.getenv("ANALYTICS_TIMEZONE", "America/Sao_Paulo")
+
+# Audit log: registros vão para uma fila em memória e são gravados em lote (write-behind)
+AUDIT_FLUSH_BATCH_SIZE = int(os.getenv("AUDIT_FLUSH_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "2"))
+AUDIT_BUFFER_MAX_EVENTS = int(os.getenv("AUDIT_BUFFER_MAX_EVENTS", "50000"))
+# Partições mensais (Postgres) criadas à frente do mês corrente
+AUDIT_PARTITION_MONTHS_AHEAD = int(os.getenv("AUDIT_PARTITION_MONTHS_AHEAD", "2"))
+
+# Eventos SSE (/events): fila por conexão; um cliente que a encher recebe "resync" em vez do atraso
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+# Últimos eventos guardados para o reenvio a partir do Last-Event-ID
+EVENTS_HISTORY_SIZE = int(os.getenv("EVENTS_HISTORY_SIZE", "1000"))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "5000"))
+# Comentário de keep-alive em conexões ociosas (proxies derrubam conexões sem tráfego)
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+
+# Delta-sync do catálogo: tombstones mais antigos que isso são expurgados (clientes com versão
+# anterior ao expurgo recebem a carga completa)
+CATALOG_TOMBSTONE_RETENTION_DAYS = int(os.getenv("CATALOG_TOMBSTONE_RETENTION_DAYS", "30"))
@@ -0,0 +1,170 @@
+"""
+Broadcaster em processo dos eventos de mudança do catálogo (Server-Sent Events).
+
+Os routers publicam depois do commit (automação criada/alterada/removida, permissões, setores,
+avisos); cada conexão SSE é uma Subscription com fila limitada no event loop, então milhares de
+conexões ociosas custam só uma fila vazia cada. O público de cada evento é um conjunto de setores
+e usuários: admins, gestores e analistas recebem tudo; os demais só o que afeta o seu acesso.
+
+Backpressure: se um cliente lento encher a fila, ela é descartada e substituída por um único
+evento "resync" (o frontend recarrega o catálogo) em vez de crescer sem limite. Os últimos
+eventos ficam num histórico para o reenvio a partir do Last-Event-ID na reconexão.
+
+Só entrega eventos publicados neste worker; em deploys com vários workers os clientes ligados a
+outro processo veem a mudança no próximo resync/recarregamento.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from typing import Any, Iterable, NamedTuple, Optional
+
+from app.config import EVENTS_HISTORY_SIZE, EVENTS_MAX_SUBSCRIBERS, EVENTS_QUEUE_SIZE
+
+# Perfis que enxergam todo o catálogo (mesma regra de GET /automations)
+_FULL_ACCESS_ROLES = ("manager", "analyst")
+
+RESYNC = "resync"
+
+
+class Event(NamedTuple):
+    id: int
+    type: str
+    data: dict
+    # None nos dois campos: evento para todos
+    sector_ids: Optional[frozenset[int]]
+    user_ids: Optional[frozenset[int]]
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    def __init__(self, user: Any, queue_size: int) -> None:
+        self.user_id: Optional[int] = getattr(user, "id", None)
+        self.sector_id: Optional[int] = getattr(user, "sector_id", None)
+        self.sees_all = bool(getattr(user, "is_admin", False)) or getattr(user, "role", None) in _FULL_ACCESS_ROLES
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=queue_size)
+        self.last_id = 0
+        self.resyncs = 0
+
+    def wants(self, event: Event) -> bool:
+        if self.sees_all or (event.sector_ids is None and event.user_ids is None):
+            return True
+        return self.sector_id in (event.sector_ids or ()) or self.user_id in (event.user_ids or ())
+
+    def outdated_by(self, event: Event) -> bool:
+        """Setor e perfil são os do momento da conexão: uma mudança de permissões do próprio usuário os invalida"""
+        if event.type != "permissions.changed" or self.user_id is None:
+            return False
+        return event.data.get("user_id") == self.user_id
+
+
+class EventBroadcaster:
+    def __init__(
+        self,
+        queue_size: int = EVENTS_QUEUE_SIZE,
+        history_size: int = EVENTS_HISTORY_SIZE,
+        max_subscribers: int = EVENTS_MAX_SUBSCRIBERS,
+    ) -> None:
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._history: deque[Event] = deque(maxlen=history_size)
+        self._subscribers: set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+
+    # --- Publicação (qualquer thread) ------------------------------------------
+
+    def publish(
+        self,
+        event_type: str,
+        data: dict,
+        sector_ids: Optional[Iterable[int]] = None,
+        user_ids: Optional[Iterable[int]] = None,
+    ) -> Event:
+        """Chamado pelos routers (threadpool) após o commit; a entrega acontece no event loop"""
+        with self._lock:
+            event = Event(
+                next(self._ids),
+                event_type,
+                data,
+                frozenset(sector_ids) if sector_ids is not None else None,
+                frozenset(user_ids) if user_ids is not None else None,
+            )
+            self._history.append(event)
+            self.published += 1
+            # Agendado ainda com o lock: o loop despacha na ordem dos ids, mesmo com publishers
+            # concorrentes (fora do lock, N+1 poderia chegar antes e N seria descartado como repetido)
+            if self._loop is not None and self._subscribers:
+                try:
+                    self._loop.call_soon_threadsafe(self._dispatch, event)
+                except RuntimeError:
+                    pass  # loop encerrado (shutdown)
+        return event
+
+    def _dispatch(self, event: Event) -> None:
+        for subscription in list(self._subscribers):
+            if subscription.wants(event):
+                self._offer(subscription, event)
+
+    def _offer(self, subscription: Subscription, event: Event) -> None:
+        # Um evento publicado durante o subscribe chega pelo histórico e pelo dispatch
+        if event.id <= subscription.last_id:
+            return
+        subscription.last_id = event.id
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente lento: troca o atraso por um único pedido de recarga
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.resyncs += 1
+            subscription.queue.put_nowait(event._replace(type=RESYNC, data={}))
+
+    # --- Assinaturas (event loop) -------------------------------------------------
+
+    def subscribe(self, user: Any, last_event_id: Optional[int] = None) -> Optional[Subscription]:
+        """Nova assinatura (None se o limite de conexões foi atingido), já com o reenvio pendente"""
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(user, self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            # Snapshot e registro juntos: o que for publicado depois já é despachado para esta
+            # assinatura; o que veio antes está no snapshot (os repetidos são ignorados em _offer)
+            self._loop = loop
+            self._subscribers.add(subscription)
+            history = list(self._history)
+            latest = self.published
+        if last_event_id is not None:
+            oldest = history[0].id if history else latest + 1
+            if last_event_id + 1 < oldest or last_event_id > latest:
+                # Parte do que o cliente perdeu já saiu do histórico (ou o processo reiniciou)
+                self._offer(subscription, Event(latest, RESYNC, {}, None, None))
+            else:
+                for event in history:
+                    if event.id > last_event_id and subscription.wants(event):
+                        self._offer(subscription, event)
+        return subscription
+
+    def is_full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "history": len(self._history),
+            "resyncs": sum(subscription.resyncs for subscription in self._subscribers),
+        }
+
+
+event_broadcaster = EventBroadcaster()
@@ -0,0 +1,271 @@
+"""
+Monitor de saúde dos target_url das automações ativas.
+
+Roda em background (iniciado no lifespan) e sonda os alvos com paralelismo limitado, um único
+httpx.AsyncClient com keep-alive e espaçamento mínimo por host. Alvos estáveis são sondados a
+cada HEALTH_CHECK_INTERVAL_SECONDS; os que acabaram de mudar de estado ou estão oscilando, a cada
+HEALTH_CHECK_MIN_INTERVAL_SECONDS. O histórico fica em memória e snapshot() responde sem I/O,
+então o dashboard nunca espera por uma sondagem.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+
+from app.catalog_cache import catalog_cache
+from app.config import (
+    HEALTH_CHECK_CONCURRENCY,
+    HEALTH_CHECK_HISTORY_SIZE,
+    HEALTH_CHECK_HOST_SPACING_SECONDS,
+    HEALTH_CHECK_INTERVAL_SECONDS,
+    HEALTH_CHECK_MIN_INTERVAL_SECONDS,
+    HEALTH_CHECK_TIMEOUT,
+)
+from app.database import SessionLocal
+from app.models import Automation
+
+# Métodos que alguns servidores não implementam para HEAD: repete com GET
+_HEAD_UNSUPPORTED = {405, 501}
+# A cada quantos segundos a lista de alvos é relida do banco
+_TARGETS_REFRESH_SECONDS = 60.0
+_MAX_TICK_SECONDS = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeResult(NamedTuple):
+    ok: bool
+    status_code: Optional[int]
+    latency_ms: float
+    checked_at: datetime
+
+
+class HealthSnapshot(NamedTuple):
+    status: str  # "up", "down" ou "unknown" (ainda não sondado)
+    latency_ms: Optional[float] = None  # última sondagem
+    avg_latency_ms: Optional[float] = None  # média das sondagens ok do histórico
+    checked_at: Optional[datetime] = None
+    uptime: Optional[float] = None  # fração de sondagens ok no histórico
+    flapping: bool = False
+
+
+UNKNOWN = HealthSnapshot("unknown")
+
+
+class _Target:
+    __slots__ = ("url", "host", "history", "next_due", "in_flight")
+
+    def __init__(self, url: str, next_due: float, history_size: int) -> None:
+        self.url = url
+        self.host = urlsplit(url).netloc.lower()
+        self.history: deque[ProbeResult] = deque(maxlen=history_size)
+        self.next_due = next_due
+        self.in_flight = False
+
+
+def _flips(history: Iterable[ProbeResult]) -> int:
+    history = list(history)
+    return sum(1 for previous, current in zip(history, islice(history, 1, None)) if previous.ok != current.ok)
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        interval: float = HEALTH_CHECK_INTERVAL_SECONDS,
+        min_interval: float = HEALTH_CHECK_MIN_INTERVAL_SECONDS,
+        concurrency: int = HEALTH_CHECK_CONCURRENCY,
+        timeout: float = HEALTH_CHECK_TIMEOUT,
+        host_spacing: float = HEALTH_CHECK_HOST_SPACING_SECONDS,
+        history_size: int = HEALTH_CHECK_HISTORY_SIZE,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self.min_interval = min_interval
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.host_spacing = host_spacing
+        self.history_size = history_size
+        self.transport = transport
+        self._targets: dict[int, _Target] = {}
+        self._host_next_slot: dict[str, float] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._probes: set[asyncio.Task] = set()
+        self._targets_loaded_at = float("-inf")
+        # Status mudou desde o último tick: o catálogo é invalidado uma vez por tick, não por alvo
+        self._catalog_stale = False
+
+    # --- Ciclo de vida ------------------------------------------------------
+
+    async def start(self) -> None:
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            timeout=httpx.Timeout(self.timeout),
+            transport=self.transport,
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._runner, *self._probes) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runner = None
+        self._probes.clear()
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if time.monotonic() - self._targets_loaded_at >= _TARGETS_REFRESH_SECONDS:
+                    self.set_targets(await run_in_threadpool(self._load_targets))
+                    self._targets_loaded_at = time.monotonic()
+                self.dispatch_due()
+                self.publish_changes()
+            except Exception:
+                logger.exception("Health monitor tick failed")
+            await asyncio.sleep(self._seconds_until_next_due())
+
+    # --- Alvos ---------------------------------------------------------------
+
+    def _load_targets(self) -> dict[int, str]:
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(Automation.id, Automation.target_url).where(Automation.is_active == True)
+            ).all()
+        finally:
+            db.close()
+        return {automation_id: url for automation_id, url in rows if url}
+
+    def set_targets(self, targets: dict[int, str]) -> None:
+        """Sincroniza os alvos; novos entram espalhados no primeiro intervalo curto (sem rajada no startup)"""
+        now = time.monotonic()
+        for automation_id in set(self._targets) - set(targets):
+            del self._targets[automation_id]
+        for automation_id, url in targets.items():
+            target = self._targets.get(automation_id)
+            if target is None or target.url != url:
+                self._targets[automation_id] = _Target(
+                    url, now + random.uniform(0, self.min_interval), self.history_size
+                )
+        # Hosts sem alvo (automação removida ou URL trocada) saem do espaçamento
+        hosts = {target.host for target in self._targets.values()}
+        for host in set(self._host_next_slot) - hosts:
+            del self._host_next_slot[host]
+
+    def _seconds_until_next_due(self) -> float:
+        now = time.monotonic()
+        pending = [target.next_due for target in self._targets.values() if not target.in_flight]
+        until_next = min(pending, default=now + _MAX_TICK_SECONDS) - now
+        return min(max(until_next, 0.05), _MAX_TICK_SECONDS)
+
+    # --- Sondagens -----------------------------------------------------------
+
+    def dispatch_due(self) -> list[asyncio.Task]:
+        """Agenda (sem esperar) a sondagem de cada alvo vencido"""
+        now = time.monotonic()
+        tasks = []
+        for automation_id, target in self._targets.items():
+            if target.in_flight or target.next_due > now:
+                continue
+            target.in_flight = True
+            task = asyncio.create_task(self._probe_target(automation_id, target))
+            self._probes.add(task)
+            task.add_done_callback(self._probes.discard)
+            tasks.append(task)
+        return tasks
+
+    async def _wait_for_host(self, host: str) -> None:
+        """Reserva o próximo horário livre do host; fora do semáforo para não ocupar vaga esperando"""
+        now = time.monotonic()
+        slot = max(now, self._host_next_slot.get(host, now))
+        self._host_next_slot[host] = slot + self.host_spacing
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _probe_target(self, automation_id: int, target: _Target) -> None:
+        try:
+            await self._wait_for_host(target.host)
+            async with self._semaphore:
+                result = await self.probe(target.url)
+            self._record(automation_id, target, result)
+        finally:
+            target.in_flight = False
+
+    async def probe(self, url: str) -> ProbeResult:
+        """HEAD (GET se o servidor não suportar); qualquer resposta abaixo de 500 conta como no ar"""
+        started = time.perf_counter()
+        status_code = None
+        try:
+            response = await self._client.head(url)
+            if response.status_code in _HEAD_UNSUPPORTED:
+                response = await self._client.get(url)
+            status_code = response.status_code
+            ok = status_code < 500
+        except (httpx.HTTPError, httpx.InvalidURL):
+            ok = False
+        latency_ms = (time.perf_counter() - started) * 1000
+        return ProbeResult(ok, status_code, round(latency_ms, 1), datetime.utcnow())
+
+    def _record(self, automation_id: int, target: _Target, result: ProbeResult) -> None:
+        changed = bool(target.history) and target.history[-1].ok != result.ok
+        first = not target.history
+        target.history.append(result)
+        interval = self._next_interval(target.history)
+        target.next_due = time.monotonic() + interval * random.uniform(0.9, 1.1)
+        if changed or first:
+            self._catalog_stale = True
+
+    def publish_changes(self) -> None:
+        """Invalida o corpo cacheado de /automations (que traz o status) se algo mudou no último tick"""
+        if self._catalog_stale:
+            self._catalog_stale = False
+            catalog_cache.invalidate()
+
+    def _next_interval(self, history: deque[ProbeResult]) -> float:
+        """Intervalo curto logo após mudança de estado ou com oscilação; metade do normal se fora do ar"""
+        if history[-1].ok != (history[-2].ok if len(history) > 1 else True) or _flips(history) >= 2:
+            return self.min_interval
+        if not history[-1].ok:
+            return max(self.min_interval, self.interval / 2)
+        return self.interval
+
+    # --- Consulta ------------------------------------------------------------
+
+    def snapshot(self, automation_id: int) -> HealthSnapshot:
+        target = self._targets.get(automation_id)
+        if target is None:
+            return UNKNOWN
+        # Roda no threadpool enquanto _record anexa no event loop: trabalha sobre uma cópia
+        history = list(target.history)
+        if not history:
+            return UNKNOWN
+        last = history[-1]
+        latencies = [result.latency_ms for result in history if result.ok]
+        return HealthSnapshot(
+            status="up" if last.ok else "down",
+            latency_ms=last.latency_ms,
+            avg_latency_ms=round(sum(latencies) / len(latencies), 1) if latencies else None,
+            checked_at=last.checked_at,
+            uptime=round(sum(result.ok for result in history) / len(history), 3),
+            flapping=_flips(history) >= 2,
+        )
+
+
+health_monitor = HealthMonitor()
@@ -0,0 +1,195 @@
+"""
+Atualização parcial e consultas em colunas JSONB (User.preferences, Automation.config).
+
+Um patch tem três partes, aplicadas nesta ordem: merge (JSON merge-patch, RFC 7386: null remove a
+chave, objetos são mesclados recursivamente), set (grava valor num caminho; como o jsonb_set, só
+cria o último nível) e remove (apaga o caminho, como o operador #-). No Postgres vira um único
+UPDATE ... SET col = <expressão> RETURNING col: o documento é alterado no servidor sob o lock da
+linha, então duas abas editando chaves diferentes não se sobrescrevem. Nos outros bancos (SQLite
+dos testes) o patch é aplicado em Python, com a mesma semântica, dentro da transação.
+"""
+import copy
+from typing import Any, Optional
+
+from sqlalchemy import Text, case, cast, exists, func, literal, literal_column, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.schemas import JsonPatch
+
+# Índices GIN (jsonb_path_ops) para consultas de contenção (@>), ex.: favoritos de uma automação
+_GIN_INDEXES = (
+    ("ix_users_preferences_gin", "users", "preferences"),
+    ("ix_automations_config_gin", "automations", "config"),
+)
+
+FAVORITES_KEY = "favorites"
+
+
+def ensure_json_indexes(engine: Engine) -> None:
+    """Cria os índices GIN no Postgres (idempotente); nada a fazer em outros bancos"""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for name, table, column in _GIN_INDEXES:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING GIN ({column} jsonb_path_ops)"))
+
+
+# --- Postgres: patch como expressão SQL -----------------------------------------
+
+
+def _jsonb(value: Any):
+    # None viraria NULL do SQL (e jsonb_set(..., NULL) anula o documento inteiro), não null do JSON
+    if value is None:
+        return literal_column("'null'::jsonb", JSONB)
+    return cast(value, JSONB)
+
+
+_EMPTY_OBJECT = literal_column("'{}'::jsonb", JSONB)
+
+
+def _path(path: list[str]):
+    return cast(literal(path, ARRAY(Text)), ARRAY(Text))
+
+
+def _merge_expression(source, patch: dict):
+    """
+    Merge-patch sobre `source`. Chaves aninhadas leem `source -> chave` da coluna original, então
+    a expressão cresce linearmente com o patch (sem repetir a expressão inteira a cada nível).
+    """
+    document = case((func.jsonb_typeof(source) == "object", source), else_=_EMPTY_OBJECT)
+    removed = [key for key, value in patch.items() if value is None]
+    if removed:
+        document = document.op("-", return_type=JSONB)(_path(removed))
+    scalars = {key: value for key, value in patch.items() if value is not None and not isinstance(value, dict)}
+    if scalars:
+        document = document.op("||", return_type=JSONB)(_jsonb(scalars))
+    nested = [(key, value) for key, value in patch.items() if isinstance(value, dict)]
+    if nested:
+        pairs = []
+        for key, value in nested:
+            child = source.op("->", return_type=JSONB)(cast(key, Text))
+            pairs += [cast(key, Text), _merge_expression(child, value)]
+        document = document.op("||", return_type=JSONB)(func.jsonb_build_object(*pairs, type_=JSONB))
+    return document
+
+
+def patch_expression(column, patch: JsonPatch):
+    document = func.coalesce(column, _EMPTY_OBJECT, type_=JSONB)
+    if patch.merge is not None:
+        document = _merge_expression(document, patch.merge)
+    for operation in patch.set:
+        document = func.jsonb_set(document, _path(operation.path), _jsonb(operation.value), True, type_=JSONB)
+    for path in patch.remove:
+        document = document.op("#-", return_type=JSONB)(_path(path))
+    return document
+
+
+# --- Outros bancos: mesma semântica em Python ---------------------------------------
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _index(segment: str) -> int:
+    try:
+        return int(segment)
+    except ValueError:
+        raise ValueError(f"path element {segment!r} is not an array index")
+
+
+def _resolve(document: Any, path: list[str]) -> Any:
+    """Container do último segmento do caminho (None se algum nível não existir)"""
+    node = document
+    for segment in path:
+        if isinstance(node, dict):
+            node = node.get(segment)
+        elif isinstance(node, list):
+            position = _index(segment)
+            node = node[position] if -len(node) <= position < len(node) else None
+        else:
+            return None
+    return node
+
+
+def _set(document: Any, path: list[str], value: Any) -> None:
+    parent, last = _resolve(document, path[:-1]), path[-1]
+    if isinstance(parent, dict):
+        parent[last] = value
+    elif isinstance(parent, list):
+        position = _index(last)
+        if -len(parent) <= position < len(parent):
+            parent[position] = value
+        elif position < 0:
+            parent.insert(0, value)
+        else:
+            parent.append(value)
+
+
+def _remove(document: Any, path: list[str]) -> None:
+    parent, last = _resolve(document, path[:-1]), path[-1]
+    if isinstance(parent, dict):
+        parent.pop(last, None)
+    elif isinstance(parent, list):
+        position = _index(last)
+        if -len(parent) <= position < len(parent):
+            del parent[position]
+
+
+def apply_patch(document: Optional[dict], patch: JsonPatch) -> dict:
+    document = copy.deepcopy(document) if document is not None else {}
+    if patch.merge is not None:
+        document = merge_patch(document, patch.merge)
+    for operation in patch.set:
+        _set(document, operation.path, copy.deepcopy(operation.value))
+    for path in patch.remove:
+        _remove(document, path)
+    return document
+
+
+# --- API usada pelos routers -----------------------------------------------------
+
+
+def patch_column(db: Session, column, criterion, patch: JsonPatch) -> Optional[dict]:
+    """
+    Aplica o patch na linha que casa com `criterion` e devolve o documento novo (None se não
+    houver linha). Não faz commit. ValueError/DataError indicam caminho inválido para o documento.
+    """
+    model = column.class_
+    if db.get_bind().dialect.name == "postgresql":
+        statement = (
+            update(model)
+            .where(criterion)
+            .values({column.key: patch_expression(column, patch)})
+            .returning(column)
+        )
+        return db.execute(statement).scalar_one_or_none()
+
+    row = db.query(model).filter(criterion).with_for_update().first()
+    if row is None:
+        return None
+    document = apply_patch(getattr(row, column.key), patch)
+    setattr(row, column.key, document)
+    db.flush()
+    return document
+
+
+def array_contains(db: Session, column, key: str, value: Any):
+    """
+    Critério "documento[key] contém value". No Postgres é column @> {key: [value]}, atendido pelo
+    índice GIN jsonb_path_ops; nos outros bancos percorre o array com json_each.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return column.op("@>")(_jsonb({key: [value]}))
+    elements = func.json_each(column, f"$.{key}").table_valued("value")
+    return exists(select(1).select_from(elements).where(elements.c.value == value))
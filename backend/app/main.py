@@ -1,28 +1,73 @@
 from __future__ import annotations
 
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Any, Awaitable, Callable
 
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy import inspect, text
-from starlette.middleware.sessions import SessionMiddleware
 
-from app.auth import KeycloakJWTMiddleware
-from app.config import APP_NAME, DEBUG, SECRET_KEY
+from app.access_index import automation_access_index
+from app.audit import audit_log, ensure_audit_partitions, ensure_audit_schema
+from app.auth import KeycloakJWTMiddleware, user_session_store
+from app.catalog_version import purge_tombstones
+from app.click_log import click_buffer
+from app.config import (
+    ACCESS_INDEX_REFRESH_SECONDS,
+    APP_NAME,
+    AUTH_BYPASS_PREFIXES,
+    DEBUG,
+    HEALTH_MONITOR_ENABLED,
+    REFRESH_TOKEN_PURGE_INTERVAL_SECONDS,
+    SECRET_KEY,
+    SESSION_TTL_SECONDS,
+)
 from app.database import Base, engine
-from app.routers import auth, automations, sectors, users
+from app.health_monitor import health_monitor
+from app.jsonb import ensure_json_indexes
+from app.oidc import oidc_client
+from app.passwords import password_pool
+from app.routers import audit, auth, automations, dashboard, events, sectors, users
+from app.search import ensure_search_schema
 from app.seed import seed_initial_data
+from app.suggest import automation_suggest_index
+from app.token_store import refresh_token_store
 
 API_PREFIX = "/api/v1"
 
 
+async def run_periodically(interval: float, func: Callable[[], Any]) -> None:
+    """Executa uma tarefa síncrona de manutenção no threadpool a cada `interval` segundos"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(func)
+        except Exception as exc:
+            print(f"Periodic task {func.__name__} failed: {exc}")
+
+
+async def shutdown_step(name: str, step: Callable[[], Awaitable[Any]]) -> None:
+    """Uma etapa do encerramento; a falha de uma (ex.: banco fora no último flush) não pula as outras"""
+    try:
+        await step()
+    except Exception as exc:
+        print(f"Shutdown step {name} failed: {exc}")
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     """Application startup/shutdown lifecycle."""
+    # audit_log particionada por mês no Postgres; precisa existir antes do create_all
+    try:
+        ensure_audit_schema(engine)
+    except Exception as exc:
+        print(f"Audit schema warning: {exc}")
     Base.metadata.create_all(bind=engine)
 
     # Lightweight migration guard for existing databases.
@@ -41,11 +86,57 @@ async def lifespan(_: FastAPI):
             add_column_if_missing("users", "preferences", "TEXT")
             add_column_if_missing("automations", "updated_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
             add_column_if_missing("automations", "config", "TEXT")
+            add_column_if_missing("automations", "version", "BIGINT NOT NULL DEFAULT 0")
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_automations_version ON automations (version)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email))"))
+            conn.commit()
     except Exception as exc:
         print(f"Schema migration warning: {exc}")
 
+    # Coluna tsvector gerada + índices GIN/trigram da busca (só Postgres)
+    try:
+        ensure_search_schema(engine)
+    except Exception as exc:
+        print(f"Search schema warning: {exc}")
+
+    # Índices GIN de preferences/config para consultas de contenção (só Postgres)
+    try:
+        ensure_json_indexes(engine)
+    except Exception as exc:
+        print(f"JSON index warning: {exc}")
+
     seed_initial_data()
-    yield
+    await run_in_threadpool(automation_access_index.rebuild)
+    await run_in_threadpool(automation_suggest_index.rebuild)
+
+    # Pool HTTP único (keep-alive) para o Keycloak durante toda a vida do processo
+    await oidc_client.start()
+    background_tasks = [
+        asyncio.create_task(run_periodically(REFRESH_TOKEN_PURGE_INTERVAL_SECONDS, refresh_token_store.purge_expired)),
+        asyncio.create_task(run_periodically(REFRESH_TOKEN_PURGE_INTERVAL_SECONDS, user_session_store.purge_expired)),
+        asyncio.create_task(run_periodically(ACCESS_INDEX_REFRESH_SECONDS, automation_access_index.rebuild)),
+        asyncio.create_task(run_periodically(ACCESS_INDEX_REFRESH_SECONDS, automation_suggest_index.rebuild)),
+        asyncio.create_task(run_periodically(24 * 3600, ensure_audit_partitions)),
+        asyncio.create_task(run_periodically(24 * 3600, purge_tombstones)),
+    ]
+    # Cliques do launch vão para o banco em lote, fora do caminho do redirect
+    await click_buffer.start()
+    await audit_log.start()
+    # Sondagens dos target_url em background; o status vai nas respostas a partir da memória
+    if HEALTH_MONITOR_ENABLED:
+        await health_monitor.start()
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await shutdown_step("health_monitor", health_monitor.stop)
+        # Drena os buffers de cliques e auditoria antes de fechar o processo
+        await shutdown_step("click_buffer", click_buffer.stop)
+        await shutdown_step("audit_log", audit_log.stop)
+        await shutdown_step("oidc_client", oidc_client.aclose)
+        await shutdown_step("password_pool", lambda: run_in_threadpool(password_pool.shutdown))
 
 
 def resolve_static_dir() -> Path:
@@ -94,21 +185,26 @@ def create_app() -> FastAPI:
         allow_headers=["Content-Type", "Authorization"],
     )
 
-    # Middleware order matters in Starlette/FastAPI (last added runs first).
-    # SessionMiddleware must run before KeycloakJWTMiddleware.
-    app.add_middleware(KeycloakJWTMiddleware)
+    # KeycloakJWTMiddleware embute o SessionMiddleware e o pula nos prefixos de bypass
+    # (assets, /health), que não precisam de sessão.
     app.add_middleware(
-        SessionMiddleware,
-        secret_key=SECRET_KEY,
-        https_only=not DEBUG,
-        same_site="lax",
-        max_age=60 * 60 * 8,
+        KeycloakJWTMiddleware,
+        bypass_prefixes=AUTH_BYPASS_PREFIXES,
+        session_options={
+            "secret_key": SECRET_KEY,
+            "https_only": not DEBUG,
+            "same_site": "lax",
+            "max_age": SESSION_TTL_SECONDS,
+        },
     )
 
     app.include_router(auth.router, prefix=API_PREFIX)
     app.include_router(automations.router, prefix=API_PREFIX)
     app.include_router(users.router, prefix=API_PREFIX)
     app.include_router(sectors.router, prefix=API_PREFIX)
+    app.include_router(dashboard.router, prefix=API_PREFIX)
+    app.include_router(audit.router, prefix=API_PREFIX)
+    app.include_router(events.router, prefix=API_PREFIX)
 
     static_dir = resolve_static_dir()
     assets_dir = static_dir / "assets"
@@ -143,4 +239,4 @@ def create_app() -> FastAPI:
     return app
 
 
-app = create_app()
+app = create_app()
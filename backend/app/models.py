@@ -1,11 +1,14 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Table, Text
+from sqlalchemy import JSON, BigInteger, Column, Date, Index, Integer, String, Boolean, ForeignKey, DateTime, Table, Text, event, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.dialects.postgresql import JSONB
 
 from app.database import Base
 
+# JSONB no Postgres; JSON simples no SQLite usado pelos testes
+JSONBType = JSONB().with_variant(JSON(), "sqlite")
+
 
 # Many-to-many relationship table for automations and sectors
 automation_permissions = Table(
@@ -56,7 +59,7 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Suporte nativo ao Postgres JSONB para alto desempenho
-    preferences = Column(JSONB, nullable=True, default={})
+    preferences = Column(JSONBType, nullable=True, default={})
 
     # Relationships
     sector = relationship("Sector", back_populates="users")
@@ -75,6 +78,10 @@ class User(Base):
         return "active" if self.is_active else "inactive"
 
 
+# Busca do login por e-mail sem diferenciar maiúsculas (lookup_local_user)
+Index("ix_users_email_lower", func.lower(User.email))
+
+
 class Automation(Base):
     __tablename__ = "automations"
 
@@ -88,7 +95,9 @@ class Automation(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Suporte nativo ao Postgres JSONB para alto desempenho
-    config = Column(JSONB, nullable=True, default={})
+    config = Column(JSONBType, nullable=True, default={})
+    # Versão do catálogo da última escrita (app.catalog_version); base de GET /automations/changes
+    version = Column(BigInteger, nullable=False, default=0, index=True)
 
     # Relationships
     sectors = relationship(
@@ -109,3 +118,100 @@ class Automation(Base):
     @hybrid_property
     def status(self) -> str:
         return "active" if self.is_active else "inactive"
+
+
+class AutomationClick(Base):
+    """Abertura de uma automação pelo portal (gravada em lote pelo ClickBuffer)"""
+    __tablename__ = "automation_clicks"
+
+    id = Column(Integer, primary_key=True)
+    # Sem FK: o histórico de uso continua válido depois que a automação ou o usuário é removido
+    automation_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=True, index=True)
+    sector_id = Column(Integer, nullable=True)
+    clicked_at = Column(DateTime, nullable=False, index=True)
+
+
+class UsageRollupHourly(Base):
+    """Cliques por hora (UTC) e dimensão; somados pelo flush do ClickBuffer"""
+    __tablename__ = "usage_rollups_hourly"
+
+    bucket = Column(DateTime, primary_key=True)  # início da hora
+    dimension = Column(String(16), primary_key=True)  # "total", "automation" ou "sector"
+    key = Column(Integer, primary_key=True)  # automation_id / sector_id (0 em "total")
+    clicks = Column(Integer, nullable=False, default=0)
+
+
+class UsageRollupDaily(Base):
+    """Cliques por dia (fuso ANALYTICS_TIMEZONE) e dimensão"""
+    __tablename__ = "usage_rollups_daily"
+
+    bucket = Column(Date, primary_key=True)
+    dimension = Column(String(16), primary_key=True)
+    key = Column(Integer, primary_key=True)
+    clicks = Column(Integer, nullable=False, default=0)
+
+
+class AuditLogEntry(Base):
+    """
+    Registro append-only de quem alterou/acessou o quê. No Postgres a tabela é particionada por
+    mês em created_at (criada por app.audit.ensure_audit_schema antes do create_all).
+    """
+    __tablename__ = "audit_log"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    actor_id = Column(Integer, nullable=True, index=True)  # sem FK: o log sobrevive ao usuário
+    actor_email = Column(String(255), nullable=True)
+    action = Column(String(64), nullable=False)  # ex.: "automation.update", "auth.login"
+    resource_type = Column(String(32), nullable=False)
+    resource_id = Column(String(64), nullable=True)
+    details = Column(JSONBType, nullable=True)
+
+
+class CatalogState(Base):
+    """Linha única com o contador de versões do catálogo de automações"""
+    __tablename__ = "catalog_state"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    # Tombstones até esta versão já foram expurgados: clientes mais antigos refazem a carga completa
+    purged_through = Column(BigInteger, nullable=False, default=0)
+
+
+@event.listens_for(CatalogState.__table__, "after_create")
+def _seed_catalog_state(target, connection, **kw):
+    # A linha do contador nasce com a tabela; next_version só precisa do UPDATE
+    connection.execute(target.insert().values(id=1, version=0, purged_through=0))
+
+
+class CatalogTombstone(Base):
+    """
+    Remoção no catálogo para o delta-sync: automação apagada (automation_id) ou acesso de um usuário
+    alterado a ponto de exigir recarga completa (user_id).
+    """
+    __tablename__ = "catalog_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, index=True)
+    automation_id = Column(Integer, nullable=True)  # sem FK: a automação já foi removida
+    user_id = Column(Integer, nullable=True, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    session_id = Column(String(64), primary_key=True)
+    token = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AuthSession(Base):
+    __tablename__ = "auth_sessions"
+
+    session_id = Column(String(64), primary_key=True)
+    data = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
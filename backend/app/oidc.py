@@ -0,0 +1,117 @@
+"""Cliente HTTP assíncrono compartilhado com o Keycloak (token exchange, refresh e JWKS)"""
+import asyncio
+import random
+from typing import Any, Optional
+
+import httpx
+
+from app.config import (
+    OIDC_HTTP_BACKOFF_BASE,
+    OIDC_HTTP_BACKOFF_MAX,
+    OIDC_HTTP_CONNECT_TIMEOUT,
+    OIDC_HTTP_KEEPALIVE_EXPIRY,
+    OIDC_HTTP_MAX_CONNECTIONS,
+    OIDC_HTTP_MAX_KEEPALIVE,
+    OIDC_HTTP_RETRIES,
+    OIDC_HTTP_TIMEOUT,
+)
+
+# Erros em que a requisição com certeza não chegou ao servidor: seguros para repetir mesmo em POST
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Erros/status que só podem ser repetidos em requisições idempotentes (GET do JWKS)
+_IDEMPOTENT_RETRY_ERRORS = (httpx.ReadTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+_IDEMPOTENT_RETRY_STATUS = {502, 503, 504}
+
+
+class OIDCHttpClient:
+    """
+    Mantém um único httpx.AsyncClient com keep-alive para o Keycloak.
+
+    Criado/fechado no lifespan da aplicação. Fora do lifespan (scripts, testes) o client
+    é criado sob demanda e recriado se o event loop mudar.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = OIDC_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = OIDC_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = OIDC_HTTP_KEEPALIVE_EXPIRY,
+        timeout: float = OIDC_HTTP_TIMEOUT,
+        connect_timeout: float = OIDC_HTTP_CONNECT_TIMEOUT,
+        retries: int = OIDC_HTTP_RETRIES,
+        backoff_base: float = OIDC_HTTP_BACKOFF_BASE,
+        backoff_max: float = OIDC_HTTP_BACKOFF_MAX,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def configure(self, transport: Optional[httpx.AsyncBaseTransport] = None, **options: Any) -> None:
+        """Troca transport/opções (ex.: apontar para um Keycloak fake). Vale para o próximo client criado."""
+        self.transport = transport
+        for name, value in options.items():
+            setattr(self, name, value)
+        self._client = None
+        self._loop = None
+
+    async def start(self) -> None:
+        self._client_for_running_loop()
+
+    async def aclose(self) -> None:
+        client, self._client, self._loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+    def _client_for_running_loop(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=self.transport,
+            )
+            self._loop = loop
+        return self._client
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # Full jitter: evita que vários workers repitam em sincronia contra o Keycloak
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(self, method: str, url: str, *, idempotent: bool = False, **kwargs: Any) -> httpx.Response:
+        attempt = 0
+        while True:
+            client = self._client_for_running_loop()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except _NOT_SENT_ERRORS:
+                if attempt >= self.retries:
+                    raise
+            except _IDEMPOTENT_RETRY_ERRORS:
+                if not idempotent or attempt >= self.retries:
+                    raise
+            else:
+                if not (idempotent and response.status_code in _IDEMPOTENT_RETRY_STATUS and attempt < self.retries):
+                    return response
+                await response.aclose()
+
+            await asyncio.sleep(self._backoff_delay(attempt))
+            attempt += 1
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, idempotent=True, **kwargs)
+
+    async def post_form(self, url: str, data: dict[str, Any]) -> httpx.Response:
+        return await self.request("POST", url, data=data)
+
+
+oidc_client = OIDCHttpClient()
@@ -0,0 +1,116 @@
+"""
+Paginação por cursor (keyset) e filtros comuns das listagens.
+
+O cursor é opaco para o cliente: base64url de [sort, valor da chave, id] do último item da página.
+A próxima página continua a partir de (chave, id), então o custo não cresce com o "offset".
+Chaves NULL (created_at de linhas antigas) contam como maiores que qualquer valor, a ordem padrão do
+Postgres: vêm no fim em ordem crescente e no início em decrescente.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query as ORMQuery
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+SORT_PATTERN = "^-?(id|created_at)$"
+
+
+class ListParams:
+    """Parâmetros de paginação/ordenação; sem limit nem cursor a listagem mantém o formato antigo (lista)"""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables the page envelope"),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        sort: str = Query("id", pattern=SORT_PATTERN, description="id, created_at, -id or -created_at"),
+    ) -> None:
+        self.limit = limit
+        self.cursor = cursor
+        self.sort = sort
+
+    @property
+    def paginated(self) -> bool:
+        return self.limit is not None or self.cursor is not None
+
+    def cache_key(self) -> tuple:
+        return (self.limit, self.cursor, self.sort)
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def encode_cursor(sort: str, key: Any, row_id: int) -> str:
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = json.dumps([sort, key, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if cursor_sort != sort or not isinstance(row_id, int):
+            raise ValueError(cursor)
+        if sort.lstrip("-") == "created_at" and key is not None:
+            key = datetime.fromisoformat(key)
+        return key, row_id
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+
+
+def prefix_pattern(search: str) -> str:
+    """Padrão LIKE de prefixo com % e _ escapados (usar com escape='\\')"""
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+def apply_sort(query: ORMQuery, model: Any, sort: str) -> ORMQuery:
+    field = sort.lstrip("-")
+    column = getattr(model, field)
+    if sort.startswith("-"):
+        order = column.desc() if field == "id" else column.desc().nulls_first()
+        return query.order_by(order, model.id.desc())
+    order = column.asc() if field == "id" else column.asc().nulls_last()
+    return query.order_by(order, model.id.asc())
+
+
+def paginate(query: ORMQuery, model: Any, params: ListParams) -> tuple[list[Any], Optional[str]]:
+    """Aplica ordenação + keyset; sem paginação devolve todas as linhas ordenadas"""
+    sort = params.sort
+    field = sort.lstrip("-")
+    column = getattr(model, field)
+
+    if params.cursor:
+        key, row_id = decode_cursor(params.cursor, sort)
+        if field == "id":
+            condition = model.id < row_id if sort.startswith("-") else model.id > row_id
+        elif key is None:
+            # Página terminou no bloco de NULLs
+            if sort.startswith("-"):
+                condition = or_(column.isnot(None), and_(column.is_(None), model.id < row_id))
+            else:
+                condition = and_(column.is_(None), model.id > row_id)
+        elif sort.startswith("-"):
+            condition = or_(column < key, and_(column == key, model.id < row_id))
+        else:
+            condition = or_(column > key, and_(column == key, model.id > row_id), column.is_(None))
+        query = query.filter(condition)
+
+    query = apply_sort(query, model, sort)
+    if not params.paginated:
+        return query.all(), None
+
+    limit = params.limit or DEFAULT_PAGE_SIZE
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, getattr(last, field), last.id)
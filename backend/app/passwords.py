@@ -0,0 +1,133 @@
+"""
+Hash/verificação de senhas (argon2) num pool de processos limitado.
+
+Argon2 é propositalmente caro em CPU e memória; rodando fora do processo da API ele não
+disputa o GIL nem prende o threadpool das demais requisições. Este módulo é importado pelos
+processos filhos (start method "spawn"), por isso depende apenas de passlib e app.config.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from passlib.context import CryptContext
+
+from app.config import PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_QUEUE_TIMEOUT, PASSWORD_HASH_WORKERS
+
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordPoolBusy(RuntimeError):
+    """A fila do pool de hash está cheia há mais de queue_timeout segundos"""
+
+
+class PasswordHasherPool:
+    def __init__(
+        self,
+        max_workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _discard_executor(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        if self.max_workers <= 0:
+            future: Future = Future()
+            future.set_result(func(*args))
+            return future
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordPoolBusy("Password hashing queue is full")
+
+        with self._lock:
+            self._pending += 1
+        try:
+            try:
+                future = self._get_executor().submit(func, *args)
+            except BrokenProcessPool:
+                # Um worker morreu (ex.: OOM); recria o pool uma vez antes de desistir
+                self._discard_executor()
+                future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Optional[Future]) -> None:
+        with self._lock:
+            self._pending -= 1
+            if future is not None:
+                self._completed += 1
+        self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._submit(_hash, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._submit(_verify, plain_password, hashed_password).result()
+
+    def hash_many(self, passwords: list[str]) -> list[str]:
+        """Submete todos os hashes de uma vez para que rodem em paralelo nos workers"""
+        futures = [self._submit(_hash, password) for password in passwords]
+        return [future.result() for future in futures]
+
+    async def ahash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash, password))
+
+    async def averify(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(_verify, plain_password, hashed_password))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+password_pool = PasswordHasherPool()
@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models import AuditLogEntry
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, ListParams, paginate
+from app.schemas import AuditLogResponse, Page
+from app.auth import AuthenticatedUser, get_current_admin
+
+router = APIRouter(prefix="/audit", tags=["audit"])
+
+
+@router.get("", response_model=Page[AuditLogResponse])
+def get_audit_log(
+    actor_id: Optional[int] = None,
+    action: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    resource_id: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Inclusive lower bound of created_at (UTC)"),
+    until: Optional[datetime] = Query(None, description="Exclusive upper bound of created_at (UTC)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_admin)
+):
+    """
+    Audit records, newest first, with keyset pagination (Admin only).
+    since/until restrict the scan to the matching monthly partitions.
+    Records are written in batches, so the last few seconds may not be listed yet.
+    """
+    query = db.query(AuditLogEntry)
+    if actor_id is not None:
+        query = query.filter(AuditLogEntry.actor_id == actor_id)
+    if action:
+        query = query.filter(AuditLogEntry.action == action)
+    if resource_type:
+        query = query.filter(AuditLogEntry.resource_type == resource_type)
+    if resource_id:
+        query = query.filter(AuditLogEntry.resource_id == resource_id)
+    if since is not None:
+        query = query.filter(AuditLogEntry.created_at >= since)
+    if until is not None:
+        query = query.filter(AuditLogEntry.created_at < until)
+
+    entries, next_cursor = paginate(query, AuditLogEntry, ListParams(limit=limit, cursor=cursor, sort="-created_at"))
+    return {"items": entries, "next_cursor": next_cursor, "limit": limit}
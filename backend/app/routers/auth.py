@@ -4,9 +4,11 @@ from urllib.parse import urlencode, urlparse
 
 from itsdangerous import BadSignature, URLSafeSerializer
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 
+from app.audit import audit_log
 from app.config import KEYCLOAK_REDIRECT_URI, KEYCLOAK_CLIENT_ID, KEYCLOAK_LOGOUT_URL, SECRET_KEY
 from app.database import get_db
 from app.auth import (
@@ -16,11 +18,16 @@ from app.auth import (
     generate_pkce_pair,
     validate_keycloak_jwt,
     claims_to_authenticated_user,
-    get_or_create_session_id,
+    clear_user_session,
+    end_user_session,
+    get_request_user,
     set_refresh_token_for_session,
-    clear_refresh_token_for_session,
+    start_user_session,
+    get_current_admin,
     get_current_user
 )
+from app.passwords import password_pool
+from app.token_store import refresh_token_store
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 _state_serializer = URLSafeSerializer(SECRET_KEY, salt="oidc-state-v1")
@@ -101,7 +108,7 @@ def login(request: Request, redirect_url: Optional[str] = None):
     # Salva na sessão para validar no callback
     request.session["oauth_state"] = csrf
     request.session["oauth_verifier"] = code_verifier
-    request.session.pop("user", None)
+    clear_user_session(request)
 
     # Salva URL de retorno já sanitizada para evitar open redirect
     request.session["post_login_redirect"] = safe_redirect
@@ -118,7 +125,7 @@ def login(request: Request, redirect_url: Optional[str] = None):
 
 @router.get("/callback")
 @router.get("/callback/")
-def callback(
+async def callback(
     request: Request,
     code: Optional[str] = None,
     state: Optional[str] = None,
@@ -187,7 +194,7 @@ def callback(
 
     # 3. Troca Code por Tokens
     try:
-        token_data = exchange_code_for_tokens(
+        token_data = await exchange_code_for_tokens(
             code=code,
             code_verifier=code_verifier,
             redirect_uri=KEYCLOAK_REDIRECT_URI
@@ -215,7 +222,7 @@ def callback(
 
     # 4. Valida e Decodifica o Token
     try:
-        claims = validate_keycloak_jwt(access_token)
+        claims = await validate_keycloak_jwt(access_token)
     except HTTPException:
         request.session.pop("oauth_state", None)
         request.session.pop("oauth_verifier", None)
@@ -227,7 +234,7 @@ def callback(
 
     # 5. Cria objeto de usuário autenticado (vincula com DB local se possível)
     try:
-        auth_user = claims_to_authenticated_user(claims, db)
+        auth_user = await run_in_threadpool(claims_to_authenticated_user, claims, db)
     except HTTPException:
         request.session.pop("oauth_state", None)
         request.session.pop("oauth_verifier", None)
@@ -242,13 +249,15 @@ def callback(
     request.session.pop("oauth_state", None)
     request.session.pop("oauth_verifier", None)
     
-    # Salva usuário na sessão (serializado como dict)
-    request.session["user"] = auth_user.model_dump()
+    # Salva usuário na sessão server-side; o cookie leva apenas o sid
+    sid = await run_in_threadpool(start_user_session, request, auth_user)
+    audit_log.emit(auth_user, "auth.login", "session")
     
     # Salva refresh token (em memória ou banco seguro, não no cookie)
-    sid = get_or_create_session_id(request)
     if refresh_token:
-        set_refresh_token_for_session(sid, refresh_token)
+        await run_in_threadpool(
+            set_refresh_token_for_session, sid, refresh_token, ttl=token_data.get("refresh_expires_in")
+        )
 
     # 7. Redireciona de volta para o HUB
     request.session.pop("post_login_redirect", None)
@@ -257,18 +266,20 @@ def callback(
 
 
 @router.get("/logout")
-def logout(request: Request, redirect_url: Optional[str] = None):
+async def logout(request: Request, redirect_url: Optional[str] = None):
     """
     Encerra a sessão local e redireciona para logout no Keycloak.
     """
-    # 1. Limpa refresh token do store
-    sid = request.session.get("sid")
-    clear_refresh_token_for_session(sid)
+    # 1. Limpa usuário e refresh token do store e a sessão local (cookie)
+    try:
+        user = await get_request_user(request)
+    except HTTPException:
+        user = None  # credencial inválida não impede o logout
+    await run_in_threadpool(end_user_session, request)
+    if user is not None:
+        audit_log.emit(user, "auth.logout", "session")
     
-    # 2. Limpa sessão local (cookie)
-    request.session.clear()
-    
-    # 3. Monta URL de logout do Keycloak
+    # 2. Monta URL de logout do Keycloak
     # Keycloak 18+ usa post_logout_redirect_uri + client_id
     logout_redirect = _sanitize_redirect_url(redirect_url)
     query = urlencode(
@@ -286,3 +297,15 @@ def logout(request: Request, redirect_url: Optional[str] = None):
 def get_current_user_info(current_user: AuthenticatedUser = Depends(get_current_user)):
     """Retorna informações do usuário logado (para o frontend)"""
     return current_user
+
+
+@router.get("/token-store/stats")
+def get_token_store_stats(current_user: AuthenticatedUser = Depends(get_current_admin)):
+    """Métricas do store de refresh tokens: entradas, memória aproximada e latência de leitura (Admin)"""
+    return refresh_token_store.stats()
+
+
+@router.get("/password-pool/stats")
+def get_password_pool_stats(current_user: AuthenticatedUser = Depends(get_current_admin)):
+    """Métricas do pool de hash de senha: workers, profundidade da fila e rejeições (Admin)"""
+    return password_pool.stats()
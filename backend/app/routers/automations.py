@@ -1,17 +1,147 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import RedirectResponse
+from pydantic import TypeAdapter
+from sqlalchemy import bindparam, delete, exists, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DataError
+from sqlalchemy.orm import Session, selectinload
 
+from app.access_index import automation_access_index, direct_user_ids
+from app.audit import audit_log
+from app.catalog_cache import catalog_cache, serialize
+from app.catalog_version import current_state, next_version, record_deletions
+from app.click_log import click_buffer
 from app.database import get_db
-from app.models import User, Automation, Sector
-from app.schemas import AutomationCreate, AutomationResponse, AutomationUpdate
+from app.events import event_broadcaster
+from app.health_monitor import health_monitor
+from app.config import AUTOMATION_BULK_MAX_ITEMS
+from app.jsonb import patch_column
+from app.models import (
+    User,
+    Automation,
+    CatalogTombstone,
+    Sector,
+    automation_permissions,
+    user_automation_permissions,
+)
+from app.pagination import DEFAULT_PAGE_SIZE, ListParams, paginate, prefix_pattern
+from app.schemas import (
+    AutomationBulkRequest,
+    AutomationBulkResponse,
+    AutomationCreate,
+    AutomationHealth,
+    AutomationResponse,
+    AutomationSuggestion,
+    AutomationUpdate,
+    CatalogChanges,
+    JsonPatch,
+    Page,
+)
+from app.search import automation_search_index, ranked_automations
+from app.suggest import automation_suggest_index
 from app.auth import AuthenticatedUser, get_current_user, get_current_admin
 
 router = APIRouter(prefix="/automations", tags=["automations"])
 
 
-@router.get("", response_model=List[AutomationResponse])
+_automation_list_adapter = TypeAdapter(List[AutomationResponse])
+_automation_page_adapter = TypeAdapter(Page[AutomationResponse])
+
+
+def _with_health(automations: List[Automation]) -> List[AutomationResponse]:
+    """Responses with the last known state of each target_url (in-memory snapshot, no I/O)"""
+    return [
+        AutomationResponse.model_validate(automation).model_copy(
+            update={"health": AutomationHealth(**health_monitor.snapshot(automation.id)._asdict())}
+        )
+        for automation in automations
+    ]
+
+
+def _automations_query(db: Session, current_user: AuthenticatedUser):
+    """Base query of the automations visible to the user (None when nothing is visible)"""
+    query = db.query(Automation).options(selectinload(Automation.sectors))
+    if current_user.is_admin:
+        # Admins see all automations (active and inactive) for management
+        return query
+    if current_user.role in ["manager", "analyst"]:
+        # Managers and Analysts see all ACTIVE automations
+        return query.filter(Automation.is_active == True)
+
+    # Sector grants + direct grants come from the precomputed access index
+    automation_ids = automation_access_index.visible_ids(current_user.id, current_user.sector_id, db)
+    if not automation_ids:
+        return None
+    return query.filter(Automation.id.in_(automation_ids)).filter(Automation.is_active == True)
+
+
+def _access_scope(current_user: AuthenticatedUser, db: Session) -> tuple:
+    """Users with the same scope see exactly the same automation list"""
+    if current_user.is_admin:
+        return ("admin",)
+    if current_user.role in ["manager", "analyst"]:
+        return ("active",)
+    direct_ids = automation_access_index.direct_ids(current_user.id, db)
+    return ("sector", current_user.sector_id, tuple(sorted(direct_ids)))
+
+
+def _has_access(db: Session, current_user: AuthenticatedUser, automation_id: int) -> bool:
+    """Sector or direct grant, answered by the primary keys of the permission tables (no rows loaded)"""
+    sector_grant = exists().where(
+        automation_permissions.c.automation_id == automation_id,
+        automation_permissions.c.sector_id == current_user.sector_id,
+    )
+    direct_grant = exists().where(
+        user_automation_permissions.c.user_id == current_user.id,
+        user_automation_permissions.c.automation_id == automation_id,
+    )
+    return bool(db.execute(select(or_(sector_grant, direct_grant))).scalar())
+
+
+def _automation_changed(
+    db: Session,
+    automation: Automation,
+    event_type: str = "automation.updated",
+    granted_user_ids: Optional[set[int]] = None,
+) -> None:
+    """
+    Keeps the in-memory indexes and the catalog cache in sync after a committed write.
+    Direct grants are read as ids only (users_with_access is never loaded); bulk passes them in.
+    """
+    if granted_user_ids is None:
+        granted_user_ids = direct_user_ids(db, [automation.id])[automation.id]
+    # Previous audience too, so subscribers who just lost access are told
+    sector_ids, user_ids = automation_access_index.audience(automation.id)
+    automation_access_index.index_automation(automation, granted_user_ids)
+    automation_search_index.index_automation(automation)
+    automation_suggest_index.index_automation(automation)
+    catalog_cache.invalidate()
+    event_broadcaster.publish(
+        event_type,
+        {"automation_id": automation.id},
+        sector_ids=sector_ids | {sector.id for sector in automation.sectors},
+        user_ids=user_ids | granted_user_ids,
+    )
+
+
+def _automation_removed(automation_id: int) -> None:
+    sector_ids, user_ids = automation_access_index.audience(automation_id)
+    automation_access_index.remove_automation(automation_id)
+    automation_search_index.remove_automation(automation_id)
+    automation_suggest_index.remove_automation(automation_id)
+    catalog_cache.invalidate()
+    event_broadcaster.publish("automation.deleted", {"automation_id": automation_id}, sector_ids, user_ids)
+
+
+@router.get("", response_model=Union[List[AutomationResponse], Page[AutomationResponse]])
 def get_automations(
+    request: Request,
+    is_active: Optional[bool] = None,
+    sector_id: Optional[int] = None,
+    search: Optional[str] = Query(None, min_length=1, description="Prefix of the title"),
+    params: ListParams = Depends(),
     db: Session = Depends(get_db),
     current_user: AuthenticatedUser = Depends(get_current_user)
 ):
@@ -19,34 +149,112 @@ def get_automations(
     Get automations available for the current user's sector.
     Regular users see only automations their sector has access to.
     Admins see all automations.
+    Without limit/cursor returns the plain list; with them returns a Page with next_cursor.
+    The serialized body is cached per access scope and query; If-None-Match answers 304.
     """
-    if current_user.is_admin:
-        # Admins see all automations (active and inactive) for management
-        automations = db.query(Automation).all()
-    elif current_user.role in ["manager", "analyst"]:
-        # Managers and Analysts see all ACTIVE automations
-        automations = db.query(Automation).filter(Automation.is_active == True).all()
-    else:
-        # 1. Automations from sector
-        sector_automations = (
-            db.query(Automation)
-            .join(Automation.sectors)
-            .filter(Sector.id == current_user.sector_id)
-            .filter(Automation.is_active == True)
-        )
-        
-        # 2. Automations assigned directly to user (Bonus)
-        user_automations = (
-            db.query(Automation)
-            .join(Automation.users_with_access)
-            .filter(User.id == current_user.id)
-            .filter(Automation.is_active == True)
-        )
-        
-        # Union of both sets
-        automations = sector_automations.union(user_automations).all()
-    
-    return automations
+
+    def build_body() -> bytes:
+        query = _automations_query(db, current_user)
+        automations, next_cursor = [], None
+        if query is not None:
+            if is_active is not None:
+                query = query.filter(Automation.is_active == is_active)
+            if sector_id is not None:
+                query = query.filter(Automation.sectors.any(Sector.id == sector_id))
+            if search:
+                query = query.filter(Automation.title.ilike(prefix_pattern(search), escape="\\"))
+            automations, next_cursor = paginate(query, Automation, params)
+        automations = _with_health(automations)
+
+        if not params.paginated:
+            return serialize(_automation_list_adapter, automations)
+        page = {"items": automations, "next_cursor": next_cursor, "limit": params.limit or DEFAULT_PAGE_SIZE}
+        return serialize(_automation_page_adapter, page)
+
+    return catalog_cache.serve(
+        request,
+        ("automations",) + _access_scope(current_user, db) + (is_active, sector_id, search) + params.cache_key(),
+        build_body,
+    )
+
+
+@router.get("/search", response_model=List[AutomationResponse])
+def search_automations(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    Full-text search over title, description and config keys, ranked by relevance.
+    Tolerates typos and respects the same access rules as the listing.
+    """
+    query = _automations_query(db, current_user)
+    if query is None:
+        return []
+    visible_ids = None
+    if not current_user.is_admin and current_user.role not in ["manager", "analyst"]:
+        visible_ids = automation_access_index.visible_ids(current_user.id, current_user.sector_id, db)
+    return _with_health(ranked_automations(db, query, q, limit, within=visible_ids))
+
+
+@router.get("/suggest", response_model=List[AutomationSuggestion])
+async def suggest_automations(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    Type-ahead suggestions by title or sector name prefix, served from memory (no database).
+    Only automations the current user can open are suggested.
+    """
+    within, active_only = None, False
+    if not current_user.is_admin:
+        active_only = True
+        if current_user.role not in ["manager", "analyst"]:
+            within = automation_access_index.visible_ids(current_user.id, current_user.sector_id)
+    return [
+        AutomationSuggestion(**suggestion._asdict())
+        for suggestion in automation_suggest_index.suggest(q, limit, within, active_only)
+    ]
+
+
+@router.get("/changes", response_model=CatalogChanges)
+def get_automation_changes(
+    since: Optional[int] = Query(None, ge=0, description="version returned by the previous sync; omit to load the whole catalog"),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    Delta sync of the automations visible to the current user.
+    Returns the rows created or updated after `since` and, in `deleted`, the ids to drop
+    (deleted, deactivated or no longer shared with the user). With reset=true `items` is the
+    whole visible catalog and replaces the client's copy. Store `version` for the next call.
+    """
+    # Read the version first: every write up to it is already committed
+    version, purged_through = current_state(db)
+    reset = since is None or since < purged_through or since > version
+    if not reset and current_user.id is not None:
+        reset = db.execute(select(exists().where(
+            CatalogTombstone.user_id == current_user.id, CatalogTombstone.version > since
+        ))).scalar()
+
+    query = _automations_query(db, current_user)
+    if reset:
+        items = query.order_by(Automation.id).all() if query is not None else []
+        return {"version": version, "reset": True, "items": items, "deleted": []}
+
+    items = []
+    if query is not None:
+        items = query.filter(Automation.version > since).order_by(Automation.id).all()
+    deleted = set(db.execute(
+        select(CatalogTombstone.automation_id)
+        .where(CatalogTombstone.version > since, CatalogTombstone.automation_id.is_not(None))
+    ).scalars())
+    if not current_user.is_admin:
+        changed = set(db.execute(select(Automation.id).where(Automation.version > since)).scalars())
+        deleted |= changed - {automation.id for automation in items}
+    return {"version": version, "reset": False, "items": items, "deleted": sorted(deleted)}
 
 
 @router.get("/{automation_id}", response_model=AutomationResponse)
@@ -56,7 +264,12 @@ def get_automation(
     current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """Get a specific automation by ID"""
-    automation = db.query(Automation).filter(Automation.id == automation_id).first()
+    automation = (
+        db.query(Automation)
+        .options(selectinload(Automation.sectors))
+        .filter(Automation.id == automation_id)
+        .first()
+    )
     
     if not automation:
         raise HTTPException(
@@ -66,16 +279,42 @@ def get_automation(
     
     # Check if user has access to this automation
     if not current_user.is_admin and current_user.role not in ["manager", "analyst"]:
-        sector_ids = [s.id for s in automation.sectors]
-        user_ids = [u.id for u in automation.users_with_access]
-        
-        if current_user.sector_id not in sector_ids and current_user.id not in user_ids:
+        if not _has_access(db, current_user, automation_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You don't have access to this automation"
             )
     
-    return automation
+    return _with_health([automation])[0]
+
+
+@router.get("/{automation_id}/launch", status_code=status.HTTP_302_FOUND, response_class=RedirectResponse)
+def launch_automation(
+    automation_id: int,
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    Redirect to the automation's target_url after the same access check as get_automation.
+    The click is only appended to an in-memory buffer; a background task writes it in batches.
+    """
+    target_url = db.query(Automation.target_url).filter(Automation.id == automation_id).scalar()
+
+    if target_url is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Automation not found"
+        )
+
+    if not current_user.is_admin and current_user.role not in ["manager", "analyst"]:
+        if not _has_access(db, current_user, automation_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have access to this automation"
+            )
+
+    click_buffer.record(automation_id, current_user.id, current_user.sector_id)
+    return RedirectResponse(target_url, status_code=status.HTTP_302_FOUND)
 
 
 @router.post("", response_model=AutomationResponse, status_code=status.HTTP_201_CREATED)
@@ -92,7 +331,8 @@ def create_automation(
         target_url=automation.target_url,
         icon=automation.icon,
         is_active=automation.is_active,
-        config=automation.config
+        config=automation.config,
+        version=next_version(db)
     )
     db.add(db_automation)
     db.flush()  # Get the ID before adding sectors
@@ -104,6 +344,10 @@ def create_automation(
     
     db.commit()
     db.refresh(db_automation)
+    _automation_changed(db, db_automation, "automation.created")
+    audit_log.emit(
+        current_user, "automation.create", "automation", db_automation.id, {"title": db_automation.title}
+    )
     
     return db_automation
 
@@ -137,13 +381,47 @@ def update_automation(
     if sector_ids is not None:
         sectors = db.query(Sector).filter(Sector.id.in_(sector_ids)).all()
         automation.sectors = sectors
+    automation.version = next_version(db)
     
     db.commit()
     db.refresh(automation)
+    _automation_changed(db, automation)
+    audit_log.emit(
+        current_user, "automation.update", "automation", automation.id,
+        {"fields": sorted(automation_update.model_fields_set)}
+    )
     
     return automation
 
 
+@router.patch("/{automation_id}/config", response_model=dict)
+def patch_automation_config(
+    automation_id: int,
+    patch: JsonPatch,
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_admin)
+):
+    """
+    Partially update an automation's config and return the new document (Admin only).
+    Applied server-side in a single statement instead of rewriting the whole config.
+    """
+    try:
+        config = patch_column(db, Automation.config, Automation.id == automation_id, patch)
+    except (ValueError, DataError) as exc:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid config patch: {exc}")
+    if config is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Automation not found"
+        )
+    db.execute(update(Automation).where(Automation.id == automation_id).values(version=next_version(db)))
+    db.commit()
+    _automation_changed(db, db.get(Automation, automation_id))
+    audit_log.emit(current_user, "automation.update", "automation", automation_id, {"fields": ["config"]})
+    return config
+
+
 @router.delete("/{automation_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_automation(
     automation_id: int,
@@ -159,7 +437,169 @@ def delete_automation(
             detail="Automation not found"
         )
     
+    title = automation.title
     db.delete(automation)
+    record_deletions(db, next_version(db), [automation_id])
     db.commit()
+    _automation_removed(automation_id)
+    audit_log.emit(current_user, "automation.delete", "automation", automation_id, {"title": title})
     
     return None
+
+
+# Colunas substituídas por um upsert do bulk (mesmos campos de AutomationCreate)
+_BULK_COLUMNS = ("title", "description", "target_url", "icon", "is_active", "config")
+
+
+def _bulk_errors(db: Session, batch: AutomationBulkRequest) -> list[dict]:
+    """Validates the whole batch up front with two queries; errors use the FastAPI validation layout"""
+    errors = []
+    referenced_ids = [item.id for item in batch.upserts if item.id is not None] + batch.deletes
+    existing_ids = set()
+    if referenced_ids:
+        existing_ids = set(db.execute(select(Automation.id).where(Automation.id.in_(referenced_ids))).scalars())
+    sector_ids = {sector_id for item in batch.upserts for sector_id in item.sector_ids or ()}
+    existing_sectors = set()
+    if sector_ids:
+        existing_sectors = set(db.execute(select(Sector.id).where(Sector.id.in_(sector_ids))).scalars())
+
+    seen = set()
+    items = [("upserts", index, item.id, item) for index, item in enumerate(batch.upserts)]
+    items += [("deletes", index, automation_id, None) for index, automation_id in enumerate(batch.deletes)]
+    for operation, index, automation_id, item in items:
+        loc = ["body", operation, index] + (["id"] if operation == "upserts" else [])
+        if automation_id is not None:
+            if automation_id in seen:
+                errors.append({"loc": loc, "msg": "Automation appears more than once in the batch"})
+            elif automation_id not in existing_ids:
+                errors.append({"loc": loc, "msg": "Automation not found"})
+            seen.add(automation_id)
+        unknown = sorted(set(item.sector_ids or ()) - existing_sectors) if item else []
+        if unknown:
+            errors.append({"loc": ["body", operation, index, "sector_ids"], "msg": f"Sectors not found: {unknown}"})
+    return errors
+
+
+def _upsert_statement(db: Session, rows: list[dict]):
+    """Multi-row INSERT ... ON CONFLICT (id) DO UPDATE in the dialect of the session"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(Automation.__table__).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[Automation.__table__.c.id],
+        set_={column: statement.excluded[column] for column in _BULK_COLUMNS + ("updated_at", "version")},
+    )
+
+
+def _sync_sectors(db: Session, desired: dict[int, set[int]], created_ids: set[int]) -> None:
+    """Applies only the difference between current and desired automation/sector pairs"""
+    current = set()
+    existing_ids = [automation_id for automation_id in desired if automation_id not in created_ids]
+    if existing_ids:
+        current = set(db.execute(
+            select(automation_permissions.c.automation_id, automation_permissions.c.sector_id)
+            .where(automation_permissions.c.automation_id.in_(existing_ids))
+        ).tuples())
+    wanted = {(automation_id, sector_id) for automation_id, sectors in desired.items() for sector_id in sectors}
+
+    removed = current - wanted
+    if removed:
+        db.execute(
+            automation_permissions.delete().where(
+                automation_permissions.c.automation_id == bindparam("old_automation_id"),
+                automation_permissions.c.sector_id == bindparam("old_sector_id"),
+            ),
+            [{"old_automation_id": automation_id, "old_sector_id": sector_id} for automation_id, sector_id in removed],
+        )
+    added = wanted - current
+    if added:
+        db.execute(
+            insert(automation_permissions),
+            [{"automation_id": automation_id, "sector_id": sector_id} for automation_id, sector_id in sorted(added)],
+        )
+
+
+@router.post("/bulk", response_model=AutomationBulkResponse)
+def bulk_automations(
+    batch: AutomationBulkRequest,
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_admin)
+):
+    """
+    Create, replace and delete many automations in one transaction (Admin only).
+    Upserts without id are created; with id they replace the automation's fields, and
+    sector_ids (when given) become its exact sector list. Any invalid item rejects the
+    whole batch with 400 and nothing is written. Results follow the request order:
+    upserts first, then deletes.
+    """
+    if len(batch.upserts) + len(batch.deletes) > AUTOMATION_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch accepts at most {AUTOMATION_BULK_MAX_ITEMS} items"
+        )
+    errors = _bulk_errors(db, batch)
+    if errors:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=errors)
+
+    now = datetime.utcnow()
+    version = next_version(db)  # one catalog version for the whole batch
+    rows = [
+        item.model_dump(include=set(_BULK_COLUMNS)) | {"updated_at": now, "version": version}
+        for item in batch.upserts
+    ]
+    new_positions = [index for index, item in enumerate(batch.upserts) if item.id is None]
+    automation_ids = [item.id for item in batch.upserts]
+
+    if new_positions:
+        # Um único INSERT multi-row: os ids saem da sequência na ordem do VALUES, então ordená-los
+        # devolve a correspondência com os itens mesmo que o RETURNING venha em outra ordem
+        created = sorted(db.execute(
+            insert(Automation.__table__)
+            .values([rows[index] | {"created_at": now} for index in new_positions])
+            .returning(Automation.__table__.c.id)
+        ).scalars())
+        for index, automation_id in zip(new_positions, created):
+            automation_ids[index] = automation_id
+    updated_rows = [rows[index] | {"id": item.id} for index, item in enumerate(batch.upserts) if item.id is not None]
+    if updated_rows:
+        db.execute(_upsert_statement(db, updated_rows))
+
+    desired_sectors = {
+        automation_ids[index]: set(item.sector_ids)
+        for index, item in enumerate(batch.upserts)
+        if item.sector_ids is not None
+    }
+    created_ids = {automation_ids[index] for index in new_positions}
+    _sync_sectors(db, desired_sectors, created_ids)
+
+    if batch.deletes:
+        db.execute(delete(automation_permissions).where(automation_permissions.c.automation_id.in_(batch.deletes)))
+        db.execute(
+            delete(user_automation_permissions).where(user_automation_permissions.c.automation_id.in_(batch.deletes))
+        )
+        db.execute(
+            delete(Automation).where(Automation.id.in_(batch.deletes)).execution_options(synchronize_session=False)
+        )
+        record_deletions(db, version, batch.deletes)
+    db.commit()
+
+    if automation_ids:
+        granted = direct_user_ids(db, automation_ids)
+        for automation in (
+            db.query(Automation)
+            .options(selectinload(Automation.sectors))
+            .filter(Automation.id.in_(automation_ids))
+        ):
+            event_type = "automation.created" if automation.id in created_ids else "automation.updated"
+            _automation_changed(db, automation, event_type, granted[automation.id])
+    for automation_id in batch.deletes:
+        _automation_removed(automation_id)
+
+    results = [
+        {"id": automation_id, "action": "created" if automation_id in created_ids else "updated"}
+        for automation_id in automation_ids
+    ]
+    results += [{"id": automation_id, "action": "deleted"} for automation_id in batch.deletes]
+    for result in results:
+        action = {"created": "create", "updated": "update", "deleted": "delete"}[result["action"]]
+        audit_log.emit(current_user, f"automation.{action}", "automation", result["id"], {"bulk": True})
+    return {"results": results}
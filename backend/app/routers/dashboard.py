@@ -0,0 +1,96 @@
+from datetime import timedelta
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import analytics
+from app.database import get_db
+from app.models import Automation, Sector, User
+from app.schemas import DashboardStats, UsageByAutomation, UsageByDay, UsageByHour, UsageBySector
+from app.auth import AuthenticatedUser, get_current_user
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+MAX_WINDOW_DAYS = 365
+
+
+def get_analytics_user(current_user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
+    """Usage analytics are visible to admins, managers and analysts"""
+    if not current_user.is_admin and current_user.role not in ["manager", "analyst"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have access to usage analytics"
+        )
+    return current_user
+
+
+def _days_param():
+    return Query(30, ge=1, le=MAX_WINDOW_DAYS, description="Window size in days, ending today")
+
+
+@router.get("/stats", response_model=DashboardStats)
+def get_dashboard_stats(
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_analytics_user)
+):
+    """Catalog totals plus click counts, read from the daily usage rollups"""
+    today = analytics.local_today()
+    return DashboardStats(
+        total_automations=db.scalar(select(func.count()).select_from(Automation)),
+        total_users=db.scalar(select(func.count()).select_from(User)),
+        total_sectors=db.scalar(select(func.count()).select_from(Sector)),
+        clicks_today=analytics.clicks_since(db, today),
+        clicks_last_30_days=analytics.clicks_since(db, today - timedelta(days=29)),
+    )
+
+
+@router.get("/charts/daily", response_model=List[UsageByDay])
+def get_daily_usage(
+    days: int = _days_param(),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_analytics_user)
+):
+    """Clicks per day in the window (days without clicks are returned with 0)"""
+    return [UsageByDay(day=day, clicks=clicks) for day, clicks in analytics.clicks_per_day(db, days)]
+
+
+@router.get("/charts/top-automations", response_model=List[UsageByAutomation])
+def get_top_automations(
+    days: int = _days_param(),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_analytics_user)
+):
+    """Most launched automations in the window"""
+    top = analytics.top_keys(db, analytics.AUTOMATION, days, limit)
+    titles = dict(db.execute(
+        select(Automation.id, Automation.title).where(Automation.id.in_([key for key, _ in top]))
+    ).all()) if top else {}
+    return [UsageByAutomation(automation_id=key, title=titles.get(key), clicks=clicks) for key, clicks in top]
+
+
+@router.get("/charts/sectors", response_model=List[UsageBySector])
+def get_sector_usage(
+    days: int = _days_param(),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_analytics_user)
+):
+    """Sectors ranked by clicks of their users in the window"""
+    top = analytics.top_keys(db, analytics.SECTOR, days, limit)
+    names = dict(db.execute(
+        select(Sector.id, Sector.name).where(Sector.id.in_([key for key, _ in top]))
+    ).all()) if top else {}
+    return [UsageBySector(sector_id=key, name=names.get(key), clicks=clicks) for key, clicks in top]
+
+
+@router.get("/charts/peak-hours", response_model=List[UsageByHour])
+def get_peak_hours(
+    days: int = _days_param(),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_analytics_user)
+):
+    """Clicks per hour of the day (local time) over the window"""
+    hours = analytics.clicks_by_hour_of_day(db, days)
+    return [UsageByHour(hour=hour, clicks=clicks) for hour, clicks in enumerate(hours)]
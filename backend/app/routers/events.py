@@ -0,0 +1,95 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.audit import audit_log
+from app.config import EVENTS_HEARTBEAT_SECONDS
+from app.events import event_broadcaster
+from app.schemas import AnnouncementCreate
+from app.auth import AuthenticatedUser, get_current_user, get_current_admin
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # nginx: entrega cada evento sem bufferizar
+}
+
+
+def _parse_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def stream_events(
+    user: AuthenticatedUser, last_event_id: Optional[int] = None, heartbeat: float = EVENTS_HEARTBEAT_SECONDS
+):
+    """
+    Corpo SSE: eventos da fila e um comentário de keep-alive quando a conexão fica ociosa.
+    A assinatura nasce aqui dentro: se o cliente cair antes do primeiro chunk o gerador nunca roda,
+    e uma assinatura criada no endpoint ficaria registrada para sempre.
+    """
+    subscription = event_broadcaster.subscribe(user, last_event_id)
+    if subscription is None:
+        # Limite atingido entre a checagem do endpoint e o início do stream: o EventSource reconecta
+        return
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield event.encode()
+            if subscription.outdated_by(event):
+                # Setor/perfil mudaram: encerra para o cliente reconectar (Last-Event-ID) com o acesso novo
+                return
+    finally:
+        # Cliente desconectou (o Starlette cancela o gerador), permissões mudaram ou shutdown
+        event_broadcaster.unsubscribe(subscription)
+
+
+@router.get("")
+async def get_events(
+    last_event_id: Optional[str] = Header(None),
+    since: Optional[str] = Query(None, description="Event id to resume from (when Last-Event-ID cannot be sent)"),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """
+    Server-Sent Events stream of catalog and permission changes visible to the current user.
+    Event types: automation.created/updated/deleted, permissions.changed, sector.updated/deleted,
+    announcement, and resync (reload the catalog: events were missed).
+    The stream ends after a permissions.changed for the current user; the client reconnects with its new access.
+    """
+    if event_broadcaster.is_full():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many event subscribers")
+    return StreamingResponse(
+        stream_events(current_user, _parse_event_id(last_event_id or since)),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS,
+    )
+
+
+@router.post("/announcements", status_code=status.HTTP_202_ACCEPTED)
+def post_announcement(
+    announcement: AnnouncementCreate,
+    current_user: AuthenticatedUser = Depends(get_current_admin)
+):
+    """Push an announcement to everyone, or only to the given sectors (Admin only)"""
+    event = event_broadcaster.publish(
+        "announcement",
+        {"message": announcement.message, "author": current_user.full_name or current_user.email},
+        sector_ids=announcement.sector_ids,
+    )
+    audit_log.emit(current_user, "announcement.create", "announcement", event.id, {"sector_ids": announcement.sector_ids})
+    return {"id": event.id}
+
+
+@router.get("/stats")
+def get_event_stats(current_user: AuthenticatedUser = Depends(get_current_admin)):
+    """Connected subscribers and published events of this worker (Admin)"""
+    return event_broadcaster.stats()
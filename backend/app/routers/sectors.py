@@ -1,23 +1,52 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
+from app.access_index import automation_access_index
+from app.audit import audit_log
+from app.catalog_cache import catalog_cache, serialize
+from app.catalog_version import touch_sector_automations
 from app.database import get_db
+from app.events import event_broadcaster
 from app.models import User, Sector
-from app.schemas import SectorCreate, SectorResponse, SectorUpdate
+from app.pagination import DEFAULT_PAGE_SIZE, ListParams, paginate, prefix_pattern
+from app.schemas import Page, SectorCreate, SectorResponse, SectorUpdate
+from app.suggest import automation_suggest_index
 from app.auth import AuthenticatedUser, get_current_user, get_current_admin
 
 router = APIRouter(prefix="/sectors", tags=["sectors"])
 
 
-@router.get("", response_model=List[SectorResponse])
+_sector_list_adapter = TypeAdapter(List[SectorResponse])
+_sector_page_adapter = TypeAdapter(Page[SectorResponse])
+
+
+@router.get("", response_model=Union[List[SectorResponse], Page[SectorResponse]])
 def get_sectors(
+    request: Request,
+    search: Optional[str] = Query(None, min_length=1, description="Prefix of the sector name"),
+    params: ListParams = Depends(),
     db: Session = Depends(get_db),
     current_user: AuthenticatedUser = Depends(get_current_user)
 ):
-    """Get all sectors"""
-    sectors = db.query(Sector).all()
-    return sectors
+    """
+    Get all sectors.
+    Without limit/cursor returns the plain list; with them returns a Page with next_cursor.
+    The serialized body is cached; If-None-Match answers 304.
+    """
+
+    def build_body() -> bytes:
+        query = db.query(Sector)
+        if search:
+            query = query.filter(Sector.name.ilike(prefix_pattern(search), escape="\\"))
+        sectors, next_cursor = paginate(query, Sector, params)
+        if not params.paginated:
+            return serialize(_sector_list_adapter, sectors)
+        page = {"items": sectors, "next_cursor": next_cursor, "limit": params.limit or DEFAULT_PAGE_SIZE}
+        return serialize(_sector_page_adapter, page)
+
+    return catalog_cache.serve(request, ("sectors", search) + params.cache_key(), build_body)
 
 
 @router.get("/{sector_id}", response_model=SectorResponse)
@@ -62,6 +91,9 @@ def create_sector(
     db.add(db_sector)
     db.commit()
     db.refresh(db_sector)
+    automation_suggest_index.set_sector(db_sector.id, db_sector.name)
+    catalog_cache.invalidate()
+    audit_log.emit(current_user, "sector.create", "sector", db_sector.id, {"name": db_sector.name})
     
     return db_sector
 
@@ -85,9 +117,16 @@ def update_sector(
 
     for key, value in sector_update.model_dump(exclude_unset=True).items():
         setattr(sector, key, value)
+    touch_sector_automations(db, sector.id)
 
     db.commit()
     db.refresh(sector)
+    automation_suggest_index.set_sector(sector.id, sector.name)
+    catalog_cache.invalidate()
+    audit_log.emit(
+        current_user, "sector.update", "sector", sector.id, {"fields": sorted(sector_update.model_fields_set)}
+    )
+    event_broadcaster.publish("sector.updated", {"sector_id": sector.id}, sector_ids=[sector.id])
     return sector
 
 @router.delete("/{sector_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -113,7 +152,14 @@ def delete_sector(
             detail="Cannot delete sector with users. Reassign users first."
         )
     
+    name = sector.name
+    touch_sector_automations(db, sector_id)
     db.delete(sector)
     db.commit()
+    automation_access_index.remove_sector(sector_id)
+    automation_suggest_index.remove_sector(sector_id)
+    catalog_cache.invalidate()
+    audit_log.emit(current_user, "sector.delete", "sector", sector_id, {"name": name})
+    event_broadcaster.publish("sector.deleted", {"sector_id": sector_id}, sector_ids=[sector_id])
     
     return None
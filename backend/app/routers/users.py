@@ -1,23 +1,59 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, or_
+from sqlalchemy.exc import DataError
+from sqlalchemy.orm import Session, selectinload
 
+from app.access_index import automation_access_index
+from app.audit import audit_log
+from app.catalog_cache import catalog_cache
+from app.catalog_version import record_access_change
 from app.database import get_db
+from app.events import event_broadcaster
+from app.jsonb import FAVORITES_KEY, array_contains, patch_column
 from app.models import User, Sector, Automation
-from app.schemas import UserCreate, UserResponse, UserUpdate
-from app.auth import AuthenticatedUser, get_current_user, get_current_admin, get_password_hash
+from app.pagination import DEFAULT_PAGE_SIZE, ListParams, paginate, prefix_pattern
+from app.schemas import JsonPatch, Page, UserCreate, UserResponse, UserUpdate
+from app.auth import AuthenticatedUser, get_current_user, get_current_admin, get_password_hash, invalidate_local_user
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Campos que mudam o que o usuário enxerga no catálogo
+_ACCESS_FIELDS = {"automation_ids", "sector_id", "role", "is_admin", "is_active"}
 
-@router.get("", response_model=List[UserResponse])
+
+@router.get("", response_model=Union[List[UserResponse], Page[UserResponse]])
 def get_users(
+    is_active: Optional[bool] = None,
+    sector_id: Optional[int] = None,
+    role: Optional[str] = None,
+    search: Optional[str] = Query(None, min_length=1, description="Prefix of full name or e-mail"),
+    favorite_automation_id: Optional[int] = Query(None, description="Users with this automation in preferences.favorites"),
+    params: ListParams = Depends(),
     db: Session = Depends(get_db),
     current_user: AuthenticatedUser = Depends(get_current_admin)
 ):
-    """Get all users (Admin only)"""
-    users = db.query(User).all()
-    return users
+    """
+    Get all users (Admin only).
+    Without limit/cursor returns the plain list; with them returns a Page with next_cursor.
+    """
+    query = db.query(User).options(selectinload(User.extra_automations))
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    if sector_id is not None:
+        query = query.filter(User.sector_id == sector_id)
+    if role:
+        query = query.filter(User.role == role)
+    if search:
+        pattern = prefix_pattern(search)
+        query = query.filter(or_(User.full_name.ilike(pattern, escape="\\"), User.email.ilike(pattern, escape="\\")))
+    if favorite_automation_id is not None:
+        query = query.filter(array_contains(db, User.preferences, FAVORITES_KEY, favorite_automation_id))
+
+    users, next_cursor = paginate(query, User, params)
+    if not params.paginated:
+        return users
+    return Page[UserResponse](items=users, next_cursor=next_cursor, limit=params.limit or DEFAULT_PAGE_SIZE)
 
 
 @router.get("/me", response_model=UserResponse)
@@ -28,12 +64,46 @@ def get_my_profile(
     """Get current user's profile"""
     if not current_user.email:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Local profile not found")
-    user = db.query(User).filter(User.email == current_user.email).first()
+    user = (
+        db.query(User)
+        .options(selectinload(User.extra_automations))
+        .filter(func.lower(User.email) == current_user.email.lower())
+        .first()
+    )
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Local profile not found")
     return user
 
 
+def _patch_preferences(db: Session, criterion, patch: JsonPatch) -> Optional[dict]:
+    try:
+        preferences = patch_column(db, User.preferences, criterion, patch)
+    except (ValueError, DataError) as exc:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid preferences patch: {exc}")
+    db.commit()
+    return preferences
+
+
+@router.patch("/me/preferences", response_model=dict)
+def patch_my_preferences(
+    patch: JsonPatch,
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """
+    Partially update the current user's preferences and return the new document.
+    Applied server-side in a single statement, so concurrent edits of different keys are kept.
+    """
+    preferences = None
+    if current_user.email:
+        preferences = _patch_preferences(db, func.lower(User.email) == current_user.email.lower(), patch)
+    if preferences is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Local profile not found")
+    audit_log.emit(current_user, "user.update", "user", current_user.id, {"fields": ["preferences"]})
+    return preferences
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
     user_id: int,
@@ -41,7 +111,7 @@ def get_user(
     current_user: AuthenticatedUser = Depends(get_current_admin)
 ):
     """Get a specific user by ID (Admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.query(User).options(selectinload(User.extra_automations)).filter(User.id == user_id).first()
     
     if not user:
         raise HTTPException(
@@ -52,6 +122,24 @@ def get_user(
     return user
 
 
+@router.patch("/{user_id}/preferences", response_model=dict)
+def patch_user_preferences(
+    user_id: int,
+    patch: JsonPatch,
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_admin)
+):
+    """Partially update a user's preferences (Admin only)"""
+    preferences = _patch_preferences(db, User.id == user_id, patch)
+    if preferences is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    audit_log.emit(current_user, "user.update", "user", user_id, {"fields": ["preferences"]})
+    return preferences
+
+
 @router.post("", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def create_user(
     user: UserCreate,
@@ -59,6 +147,9 @@ def create_user(
     current_user: AuthenticatedUser = Depends(get_current_admin)
 ):
     """Create a new user (Admin only)"""
+    # Hash in the password pool before the first query, so no DB connection is held while argon2 runs
+    password_hash = get_password_hash(user.password)
+
     # Check if email already exists
     existing_user = db.query(User).filter(User.email == user.email).first()
     if existing_user:
@@ -79,7 +170,7 @@ def create_user(
     db_user = User(
         email=user.email,
         full_name=user.full_name,
-        password_hash=get_password_hash(user.password),
+        password_hash=password_hash,
         is_admin=user.is_admin,
         role=user.role,
         sector_id=user.sector_id,
@@ -93,6 +184,12 @@ def create_user(
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    invalidate_local_user(db_user.email)
+    automation_access_index.set_user_grants(db_user.id, (a.id for a in db_user.extra_automations))
+    catalog_cache.invalidate()
+    audit_log.emit(
+        current_user, "user.create", "user", db_user.id, {"email": db_user.email, "role": db_user.role}
+    )
     
     return db_user
 
@@ -105,6 +202,9 @@ def update_user(
     current_user: AuthenticatedUser = Depends(get_current_admin)
 ):
     """Update a user (Admin only)"""
+    # Hash in the password pool before the first query, so no DB connection is held while argon2 runs
+    password_hash = get_password_hash(user_update.password) if user_update.password is not None else None
+
     user = db.query(User).filter(User.id == user_id).first()
     
     if not user:
@@ -113,6 +213,8 @@ def update_user(
             detail="User not found"
         )
     
+    previous_email = user.email
+
     # Update fields
     update_data = user_update.model_dump(exclude_unset=True)
     
@@ -125,9 +227,10 @@ def update_user(
         if existing_user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
     
-    # If password is being updated, hash it
-    if "password" in update_data:
-        update_data["password_hash"] = get_password_hash(update_data.pop("password"))
+    # If password is being updated, store the hash computed above
+    update_data.pop("password", None)
+    if password_hash is not None:
+        update_data["password_hash"] = password_hash
     
     for field, value in update_data.items():
         setattr(user, field, value)
@@ -136,9 +239,21 @@ def update_user(
     if automation_ids is not None:
         automations = db.query(Automation).filter(Automation.id.in_(automation_ids)).all()
         user.extra_automations = automations
+    if user_update.model_fields_set & _ACCESS_FIELDS:
+        record_access_change(db, user.id)
 
     db.commit()
     db.refresh(user)
+    invalidate_local_user(previous_email, user.email)
+    if automation_ids is not None:
+        automation_access_index.set_user_grants(user.id, (a.id for a in user.extra_automations))
+    catalog_cache.invalidate()
+    # Só os nomes dos campos: valores (ex.: senha) não vão para o log
+    audit_log.emit(
+        current_user, "user.update", "user", user.id, {"fields": sorted(user_update.model_fields_set)}
+    )
+    if user_update.model_fields_set & _ACCESS_FIELDS:
+        event_broadcaster.publish("permissions.changed", {"user_id": user.id}, user_ids=[user.id])
     
     return user
 
@@ -165,7 +280,13 @@ def delete_user(
             detail="User not found"
         )
     
+    email = user.email
     db.delete(user)
     db.commit()
+    invalidate_local_user(email)
+    automation_access_index.remove_user(user_id)
+    catalog_cache.invalidate()
+    audit_log.emit(current_user, "user.delete", "user", user_id, {"email": email})
+    event_broadcaster.publish("permissions.changed", {"user_id": user_id}, user_ids=[user_id])
     
     return None
@@ -1,6 +1,6 @@
-from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, EmailStr, ConfigDict, computed_field, field_validator
+from datetime import date, datetime
+from typing import Any, Generic, Optional, List, TypeVar
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, field_validator
 
 
 # ============ Sector Schemas ============
@@ -104,6 +104,15 @@ class AutomationUpdate(BaseModel):
     config: Optional[dict] = None
 
 
+class AutomationHealth(BaseModel):
+    status: str # "up", "down" or "unknown" (not probed yet)
+    latency_ms: Optional[float] = None
+    avg_latency_ms: Optional[float] = None
+    checked_at: Optional[datetime] = None
+    uptime: Optional[float] = None # Share of successful probes in the recent history
+    flapping: bool = False
+
+
 class AutomationResponse(AutomationBase):
     id: int
     name: str # Populated from model hybrid_property
@@ -112,6 +121,7 @@ class AutomationResponse(AutomationBase):
     updated_at: datetime
     config: Optional[dict] = None # Populated from model property
     sectors: List[SectorResponse] = []
+    health: Optional[AutomationHealth] = None # Filled by the catalog endpoints from the health monitor
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -121,6 +131,39 @@ class AutomationResponse(AutomationBase):
         return v or ""
 
 
+class AutomationBulkUpsert(AutomationCreate):
+    id: Optional[int] = None # None creates; an existing id is replaced
+    sector_ids: Optional[List[int]] = None # None keeps the current sectors of an existing automation
+
+
+class AutomationBulkRequest(BaseModel):
+    upserts: List[AutomationBulkUpsert] = []
+    deletes: List[int] = []
+
+
+class AutomationBulkResult(BaseModel):
+    id: int
+    action: str # "created", "updated" or "deleted"
+
+
+class AutomationBulkResponse(BaseModel):
+    results: List[AutomationBulkResult]
+
+
+class CatalogChanges(BaseModel):
+    version: int # Pass as `since` on the next sync
+    reset: bool # True: items is the whole catalog and replaces the client's copy
+    items: List[AutomationResponse]
+    deleted: List[int] = [] # Automation ids to drop from the client's copy
+
+
+class AutomationSuggestion(BaseModel):
+    automation_id: int
+    title: str
+    matched: str # "title" or "sector"
+    sector: Optional[str] = None # Sector name when matched by sector
+
+
 # ============ Auth Schemas ============
 class LoginRequest(BaseModel):
     email: EmailStr
@@ -139,8 +182,95 @@ class TokenData(BaseModel):
     sector_id: Optional[int] = None
 
 
+# ============ JSON Patch Schemas ============
+def _path_segments(path: Any) -> Any:
+    # Array indexes may be sent as numbers; paths are text[] in Postgres
+    return [str(segment) for segment in path] if isinstance(path, list) else path
+
+
+class JsonSetOperation(BaseModel):
+    path: List[str] = Field(min_length=1) # e.g. ["theme", "color"] or ["favorites", "0"]
+    value: Any = None
+
+    @field_validator('path', mode='before')
+    @classmethod
+    def normalize_path(cls, path: Any) -> Any:
+        return _path_segments(path)
+
+
+class JsonPatch(BaseModel):
+    """Applied in order: merge (RFC 7386 merge patch), then set, then remove"""
+    merge: Optional[dict] = None # null values delete keys; nested objects are merged
+    set: List[JsonSetOperation] = [] # only the last path level is created if missing
+    remove: List[List[str]] = []
+
+    @field_validator('remove', mode='before')
+    @classmethod
+    def normalize_remove_paths(cls, paths: Any) -> Any:
+        if not isinstance(paths, list):
+            return paths
+        normalized = [_path_segments(path) for path in paths]
+        if any(isinstance(path, list) and not path for path in normalized):
+            raise ValueError("paths must not be empty")
+        return normalized
+
+
+# ============ Event Schemas ============
+class AnnouncementCreate(BaseModel):
+    message: str = Field(min_length=1, max_length=1000)
+    sector_ids: Optional[List[int]] = None # None announces to everyone
+
+
+# ============ Audit Schemas ============
+class AuditLogResponse(BaseModel):
+    id: int
+    created_at: datetime
+    actor_id: Optional[int] = None
+    actor_email: Optional[str] = None
+    action: str
+    resource_type: str
+    resource_id: Optional[str] = None
+    details: Optional[dict] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ============ Pagination Schemas ============
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None # None on the last page
+    limit: int
+
+
 # ============ Dashboard Schemas ============
 class DashboardStats(BaseModel):
     total_automations: int
     total_users: int
     total_sectors: int
+    clicks_today: int = 0
+    clicks_last_30_days: int = 0
+
+
+class UsageByDay(BaseModel):
+    day: date
+    clicks: int
+
+
+class UsageByAutomation(BaseModel):
+    automation_id: int
+    title: Optional[str] = None # None when the automation was deleted
+    clicks: int
+
+
+class UsageBySector(BaseModel):
+    sector_id: int
+    name: Optional[str] = None # None when the sector was deleted
+    clicks: int
+
+
+class UsageByHour(BaseModel):
+    hour: int # 0-23 in ANALYTICS_TIMEZONE
+    clicks: int
@@ -0,0 +1,287 @@
+"""
+Busca textual de automações (título, descrição e chaves do config).
+
+No Postgres usa uma coluna tsvector gerada (GIN) e pg_trgm no título para tolerar erros de
+digitação. Em outros bancos (SQLite dos testes) usa AutomationSearchIndex, um índice invertido
+em memória com a mesma semântica: todos os termos precisam casar (exato, prefixo ou parecido).
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import func, literal_column, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query as ORMQuery
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Automation
+
+SEARCH_TEXT_CONFIG = "portuguese"
+FUZZY_THRESHOLD = 0.4
+
+_FIELD_WEIGHTS = {"title": 3.0, "description": 1.0, "config": 1.0}
+_PREFIX_FACTOR = 0.6
+_TOKEN_RE = re.compile(r"\w+")
+
+# Expressão da coluna gerada; jsonb_to_tsvector(..., '["key"]') indexa as chaves em todos os níveis
+_SEARCH_VECTOR_SQL = f"""
+    setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(description, '')), 'B') ||
+    setweight(jsonb_to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(config, '{{}}'::jsonb), '["key"]'), 'C')
+"""
+
+
+_postgres_search_ready = False
+
+
+def ensure_search_schema(engine: Engine) -> None:
+    """
+    Cria coluna gerada + índices de busca no Postgres (idempotente); nada a fazer em outros bancos.
+    Se falhar (ex.: config ainda TEXT num banco legado), a busca segue pelo índice em memória.
+    """
+    global _postgres_search_ready
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(
+            "ALTER TABLE automations ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({_SEARCH_VECTOR_SQL}) STORED"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_automations_search_vector ON automations USING GIN (search_vector)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_automations_title_trgm ON automations USING GIN (title gin_trgm_ops)"
+        ))
+    _postgres_search_ready = True
+
+
+def normalize(value: str) -> str:
+    """Minúsculas e sem acentos ("Relatório" -> "relatorio")"""
+    decomposed = unicodedata.normalize("NFKD", value.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(value: Optional[str]) -> list[str]:
+    return _TOKEN_RE.findall(normalize(value)) if value else []
+
+
+def _config_keys(config: Any) -> Iterable[str]:
+    if isinstance(config, dict):
+        for key, value in config.items():
+            yield str(key)
+            yield from _config_keys(value)
+    elif isinstance(config, list):
+        for item in config:
+            yield from _config_keys(item)
+
+
+def _trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AutomationSearchIndex:
+    def __init__(self, session_factory=SessionLocal) -> None:
+        self.session_factory = session_factory
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._postings: dict[str, dict[int, float]] = {}  # token -> {automation_id: peso}
+        self._tokens_of: dict[int, set[str]] = {}
+        self._vocabulary: list[str] = []  # ordenado, para busca por prefixo com bisect
+        self._trigram_index: dict[str, set[str]] = {}
+
+    # --- Manutenção --------------------------------------------------------
+
+    def rebuild(self, db: Optional[Session] = None) -> None:
+        own_session = db is None
+        db = db or self.session_factory()
+        try:
+            rows = db.execute(
+                select(Automation.id, Automation.title, Automation.description, Automation.config)
+            ).all()
+        finally:
+            if own_session:
+                db.close()
+        with self._lock:
+            self._postings, self._tokens_of, self._trigram_index = {}, {}, {}
+            for automation_id, title, description, config in rows:
+                self._add(automation_id, title, description, config)
+            self._vocabulary = sorted(self._postings)
+            self._loaded = True
+
+    def _ensure_loaded(self, db: Optional[Session]) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.rebuild(db)
+
+    def _add(self, automation_id: int, title: Optional[str], description: Optional[str], config: Any) -> None:
+        weights: dict[str, float] = {}
+        fields = (
+            ("title", tokenize(title)),
+            ("description", tokenize(description)),
+            ("config", [token for key in _config_keys(config) for token in tokenize(key)]),
+        )
+        for field, tokens in fields:
+            for token in tokens:
+                weights[token] = max(weights.get(token, 0.0), _FIELD_WEIGHTS[field])
+        for token, weight in weights.items():
+            if token not in self._postings:
+                self._postings[token] = {}
+                for trigram in _trigrams(token):
+                    self._trigram_index.setdefault(trigram, set()).add(token)
+            self._postings[token][automation_id] = weight
+        self._tokens_of[automation_id] = set(weights)
+
+    def _remove(self, automation_id: int) -> None:
+        for token in self._tokens_of.pop(automation_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(automation_id, None)
+            if not postings:
+                del self._postings[token]
+                for trigram in _trigrams(token):
+                    self._trigram_index.get(trigram, set()).discard(token)
+
+    def index_automation(self, automation: Automation) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove(automation.id)
+            self._add(automation.id, automation.title, automation.description, automation.config)
+            self._vocabulary = sorted(self._postings)
+
+    def remove_automation(self, automation_id: int) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            self._remove(automation_id)
+            self._vocabulary = sorted(self._postings)
+
+    # --- Consulta ----------------------------------------------------------
+
+    def _expand(self, term: str) -> list[tuple[str, float]]:
+        """Tokens do vocabulário que satisfazem o termo, com fator: exato > prefixo > parecido (trigramas)"""
+        expansions = [(term, 1.0)] if term in self._postings else []
+        position = bisect.bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            if self._vocabulary[position] != term:
+                expansions.append((self._vocabulary[position], _PREFIX_FACTOR))
+            position += 1
+
+        if not expansions and len(term) >= 3:
+            term_trigrams = _trigrams(term)
+            shared_counts: dict[str, int] = {}
+            for trigram in term_trigrams:
+                for token in self._trigram_index.get(trigram, ()):
+                    shared_counts[token] = shared_counts.get(token, 0) + 1
+            for token, shared in shared_counts.items():
+                similarity = shared / len(term_trigrams | _trigrams(token))
+                if similarity >= FUZZY_THRESHOLD:
+                    expansions.append((token, similarity * _PREFIX_FACTOR))
+        return expansions
+
+    def _score(self, automation_id: int, expansions: list[tuple[str, float]]) -> float:
+        best = 0.0
+        for token, factor in expansions:
+            weight = self._postings[token].get(automation_id)
+            if weight is not None and weight * factor > best:
+                best = weight * factor
+        return best
+
+    def search(
+        self,
+        query: str,
+        db: Optional[Session] = None,
+        within: Optional[set[int]] = None,
+    ) -> dict[int, float]:
+        """
+        Pontuação das automações que casam com todos os termos (opcionalmente restritas a `within`).
+
+        Começa pelo termo mais raro e só consulta os demais para os candidatos que sobraram, então o
+        custo acompanha o menor conjunto de resultados e não o tamanho do catálogo.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return {}
+        self._ensure_loaded(db)
+        with self._lock:
+            expanded = [self._expand(term) for term in dict.fromkeys(terms)]
+            if not all(expanded):
+                return {}
+            expanded.sort(key=lambda expansions: sum(len(self._postings[token]) for token, _ in expansions))
+
+            scores: dict[int, float] = {}
+            for token, factor in expanded[0]:
+                for automation_id, weight in self._postings[token].items():
+                    if within is not None and automation_id not in within:
+                        continue
+                    if weight * factor > scores.get(automation_id, 0.0):
+                        scores[automation_id] = weight * factor
+
+            for expansions in expanded[1:]:
+                next_scores = {}
+                for automation_id, total in scores.items():
+                    score = self._score(automation_id, expansions)
+                    if score:
+                        next_scores[automation_id] = total + score
+                scores = next_scores
+                if not scores:
+                    break
+        return scores
+
+
+automation_search_index = AutomationSearchIndex()
+
+
+def ranked_automations(
+    db: Session,
+    base_query: ORMQuery,
+    q: str,
+    limit: int,
+    within: Optional[set[int]] = None,
+) -> list[Automation]:
+    """
+    Aplica a busca sobre base_query (que já carrega as regras de acesso) e devolve por relevância.
+    `within` (ids visíveis do usuário) restringe o índice em memória antes do ranking.
+    """
+    if _postgres_search_ready and db.get_bind().dialect.name == "postgresql":
+        ts_query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_TEXT_CONFIG}'::regconfig"), q)
+        search_vector = literal_column("automations.search_vector")
+        rank = func.ts_rank_cd(search_vector, ts_query) + func.similarity(Automation.title, q)
+        return (
+            base_query
+            .filter(or_(search_vector.op("@@")(ts_query), Automation.title.op("%")(q)))
+            .order_by(rank.desc(), Automation.id)
+            .limit(limit)
+            .all()
+        )
+
+    scores = automation_search_index.search(q, db, within)
+    if not scores:
+        return []
+    # Só os primeiros colocados são ordenados; base_query ainda descarta o que o usuário não pode ver
+    # (ex.: inativas). O restante só é ordenado se o primeiro lote não bastar.
+    batch_size = limit * 2
+    ordered = heapq.nsmallest(batch_size, ((-score, automation_id) for automation_id, score in scores.items()))
+    results = _visible_in_order(base_query, [automation_id for _, automation_id in ordered])
+    if len(results) < limit and len(ordered) < len(scores):
+        remaining = sorted((-score, automation_id) for automation_id, score in scores.items())[batch_size:]
+        for start in range(0, len(remaining), batch_size):
+            chunk = [automation_id for _, automation_id in remaining[start:start + batch_size]]
+            results.extend(_visible_in_order(base_query, chunk))
+            if len(results) >= limit:
+                break
+    return results[:limit]
+
+
+def _visible_in_order(base_query: ORMQuery, automation_ids: list[int]) -> list[Automation]:
+    rows = {row.id: row for row in base_query.filter(Automation.id.in_(automation_ids)).all()}
+    return [rows[automation_id] for automation_id in automation_ids if automation_id in rows]
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 
 from app.database import SessionLocal, engine, Base
 from app.models import Sector, User, Automation
-from app.auth import get_password_hash
+from app.auth import get_password_hashes
 
 
 def seed_initial_data():
@@ -51,11 +51,11 @@ def seed_initial_data():
                 }
             ]
         
-            for user_data in users_data:
-                password = user_data.pop("password")
+            password_hashes = get_password_hashes([user_data.pop("password") for user_data in users_data])
+            for user_data, password_hash in zip(users_data, password_hashes):
                 user = User(
                     **user_data,
-                    password_hash=get_password_hash(password)
+                    password_hash=password_hash
                 )
                 db.add(user)
             db.commit()
@@ -0,0 +1,177 @@
+"""Sessões de login server-side: o cookie leva só o id opaco (sid), o usuário fica aqui"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.config import SESSION_CACHE_SIZE, SESSION_CACHE_TTL_SECONDS, SESSION_STORE, SESSION_TTL_SECONDS
+from app.database import SessionLocal
+from app.models import AuthSession
+
+T = TypeVar("T")
+
+
+class MemorySessionBackend:
+    """Store compartilhado apenas dentro do processo (um único worker)"""
+
+    backend = "memory"
+
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def set(self, sid: str, data: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[sid] = (data, expires_at)
+
+    def get(self, sid: str) -> Optional[tuple[str, float]]:
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[sid]
+                return None
+            return entry
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._entries.items() if expires_at <= now]
+            for sid in expired:
+                del self._entries[sid]
+        return len(expired)
+
+
+class SQLSessionBackend:
+    """Store compartilhado entre workers na tabela auth_sessions (índice em expires_at)"""
+
+    backend = "sql"
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal) -> None:
+        self.session_factory = session_factory
+
+    def set(self, sid: str, data: str, expires_at: float) -> None:
+        with self.session_factory() as db:
+            db.merge(AuthSession(session_id=sid, data=data, expires_at=datetime.utcfromtimestamp(expires_at)))
+            db.commit()
+
+    def get(self, sid: str) -> Optional[tuple[str, float]]:
+        with self.session_factory() as db:
+            row = (
+                db.query(AuthSession.data, AuthSession.expires_at)
+                .filter(AuthSession.session_id == sid, AuthSession.expires_at > datetime.utcnow())
+                .first()
+            )
+        if row is None:
+            return None
+        return row.data, (row.expires_at - datetime(1970, 1, 1)).total_seconds()
+
+    def delete(self, sid: str) -> None:
+        with self.session_factory() as db:
+            db.query(AuthSession).filter(AuthSession.session_id == sid).delete(synchronize_session=False)
+            db.commit()
+
+    def purge_expired(self) -> int:
+        with self.session_factory() as db:
+            removed = (
+                db.query(AuthSession)
+                .filter(AuthSession.expires_at <= datetime.utcnow())
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return removed
+
+
+class ServerSessionStore(Generic[T]):
+    """
+    LRU em processo na frente de um backend compartilhado.
+
+    O LRU guarda o objeto já construído (factory aplicada uma vez), então um hit não paga
+    decode nem validação. Cada entrada local vale no máximo cache_ttl segundos, para que um
+    logout feito em outro worker seja percebido rapidamente.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        factory: Callable[[dict[str, Any]], T],
+        ttl: int = SESSION_TTL_SECONDS,
+        cache_size: int = SESSION_CACHE_SIZE,
+        cache_ttl: float = SESSION_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.backend = backend
+        self.factory = factory
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: OrderedDict[str, tuple[T, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, sid: str, value: T, expires_at: float) -> None:
+        with self._lock:
+            self._cache[sid] = (value, min(expires_at, time.time() + self.cache_ttl))
+            self._cache.move_to_end(sid)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def peek(self, sid: str) -> Optional[T]:
+        """Consulta apenas o LRU local (sem I/O); None se não estiver em cache"""
+        with self._lock:
+            entry = self._cache.get(sid)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._cache[sid]
+                return None
+            self._cache.move_to_end(sid)
+            return entry[0]
+
+    def load(self, sid: str) -> Optional[T]:
+        value = self.peek(sid)
+        if value is not None:
+            return value
+        entry = self.backend.get(sid)
+        if entry is None:
+            return None
+        data, expires_at = entry
+        try:
+            value = self.factory(json.loads(data))
+        except Exception:
+            # Formato antigo/corrompido: descarta a sessão
+            self.delete(sid)
+            return None
+        self._remember(sid, value, expires_at)
+        return value
+
+    def save(self, sid: str, value: T, payload: dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl
+        self.backend.set(sid, json.dumps(payload, default=str), expires_at)
+        self._remember(sid, value, expires_at)
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._cache.pop(sid, None)
+        self.backend.delete(sid)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._cache.items() if expires_at <= now]
+            for sid in expired:
+                del self._cache[sid]
+        return self.backend.purge_expired()
+
+
+def build_session_backend(backend: str = SESSION_STORE) -> Any:
+    if backend == "sql":
+        return SQLSessionBackend()
+    if backend != "memory":
+        print(f"SESSION_STORE desconhecido '{backend}', usando memória")
+    return MemorySessionBackend()
@@ -0,0 +1,253 @@
+"""
+Índice de prefixos em memória para o autocomplete da busca do dashboard.
+
+Um array ordenado de chaves normalizadas (título a partir de cada palavra e nome do setor) é
+consultado com bisect: cada tecla custa microssegundos e nunca chega ao banco. Construído no
+startup e atualizado de forma incremental pelos handlers de escrita de automações e setores.
+"""
+import bisect
+import threading
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models import Automation, Sector, automation_permissions
+from app.search import tokenize
+
+_TITLE, _SECTOR = 0, 1
+# Limite de chaves percorridas por consulta: prefixos de 1 letra com poucas automações visíveis
+# não viram uma varredura do catálogo inteiro
+_MAX_SCAN = 5000
+
+
+class Suggestion(NamedTuple):
+    automation_id: int
+    title: str
+    matched: str  # "title" ou "sector"
+    sector: Optional[str] = None
+
+
+class _AutomationEntry(NamedTuple):
+    title: str
+    is_active: bool
+    sector_ids: frozenset[int]
+    keys: tuple[str, ...]
+
+
+def _title_keys(title: str) -> tuple[str, ...]:
+    """"Relatório de Fretes" -> ("relatorio de fretes", "de fretes", "fretes")"""
+    words = tokenize(title)
+    return tuple(dict.fromkeys(" ".join(words[i:]) for i in range(len(words))))
+
+
+def _sector_key(name: str) -> str:
+    return " ".join(tokenize(name))
+
+
+class SuggestIndex:
+    def __init__(self, session_factory=SessionLocal) -> None:
+        self.session_factory = session_factory
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._generation = 0
+        self._entries: list[tuple[str, int, int]] = []  # (chave, tipo, automation_id | sector_id), ordenado
+        self._automations: dict[int, _AutomationEntry] = {}
+        self._sectors: dict[int, str] = {}
+        self._automations_by_sector: dict[int, set[int]] = {}
+
+    # --- Manutenção --------------------------------------------------------
+
+    def rebuild(self) -> None:
+        for _ in range(3):
+            generation = self._generation
+            snapshot = self._load_snapshot()
+            with self._lock:
+                # Uma escrita incremental durante a leitura tornaria o snapshot mais velho que o índice
+                if generation == self._generation or not self._loaded:
+                    self._entries, self._automations, self._sectors, self._automations_by_sector = snapshot
+                    self._loaded = True
+                    return
+
+    def _load_snapshot(self) -> tuple:
+        db = self.session_factory()
+        try:
+            automations = db.execute(select(Automation.id, Automation.title, Automation.is_active)).all()
+            sectors = db.execute(select(Sector.id, Sector.name)).all()
+            grants = db.execute(
+                select(automation_permissions.c.automation_id, automation_permissions.c.sector_id)
+            ).all()
+        finally:
+            db.close()
+
+        sector_ids_of: dict[int, set[int]] = {}
+        for automation_id, sector_id in grants:
+            sector_ids_of.setdefault(automation_id, set()).add(sector_id)
+
+        entries: list[tuple[str, int, int]] = []
+        automation_entries: dict[int, _AutomationEntry] = {}
+        by_sector: dict[int, set[int]] = {}
+        for automation_id, title, is_active in automations:
+            sector_ids = frozenset(sector_ids_of.get(automation_id, ()))
+            keys = _title_keys(title)
+            automation_entries[automation_id] = _AutomationEntry(title, bool(is_active), sector_ids, keys)
+            entries.extend((key, _TITLE, automation_id) for key in keys)
+            for sector_id in sector_ids:
+                by_sector.setdefault(sector_id, set()).add(automation_id)
+        for sector_id, name in sectors:
+            entries.append((_sector_key(name), _SECTOR, sector_id))
+        entries.sort()
+        return entries, automation_entries, dict(sectors), by_sector
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.rebuild()
+
+    def _insert(self, entry: tuple[str, int, int]) -> None:
+        position = bisect.bisect_left(self._entries, entry)
+        if position == len(self._entries) or self._entries[position] != entry:
+            self._entries.insert(position, entry)
+
+    def _delete(self, entry: tuple[str, int, int]) -> None:
+        position = bisect.bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def _unlink_automation(self, automation_id: int) -> None:
+        previous = self._automations.pop(automation_id, None)
+        if previous is None:
+            return
+        for key in previous.keys:
+            self._delete((key, _TITLE, automation_id))
+        for sector_id in previous.sector_ids:
+            self._automations_by_sector.get(sector_id, set()).discard(automation_id)
+
+    def set_automation(self, automation_id: int, title: str, is_active: bool, sector_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._generation += 1
+            if not self._loaded:
+                return  # o primeiro uso carrega o estado já commitado
+            self._unlink_automation(automation_id)
+            entry = _AutomationEntry(title, bool(is_active), frozenset(sector_ids), _title_keys(title))
+            self._automations[automation_id] = entry
+            for key in entry.keys:
+                self._insert((key, _TITLE, automation_id))
+            for sector_id in entry.sector_ids:
+                self._automations_by_sector.setdefault(sector_id, set()).add(automation_id)
+
+    def index_automation(self, automation: Automation) -> None:
+        self.set_automation(
+            automation.id, automation.title, automation.is_active, (sector.id for sector in automation.sectors)
+        )
+
+    def remove_automation(self, automation_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._loaded:
+                self._unlink_automation(automation_id)
+
+    def set_sector(self, sector_id: int, name: str) -> None:
+        with self._lock:
+            self._generation += 1
+            if not self._loaded:
+                return
+            previous = self._sectors.get(sector_id)
+            if previous is not None:
+                self._delete((_sector_key(previous), _SECTOR, sector_id))
+            self._sectors[sector_id] = name
+            self._insert((_sector_key(name), _SECTOR, sector_id))
+
+    def remove_sector(self, sector_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            if not self._loaded:
+                return
+            name = self._sectors.pop(sector_id, None)
+            if name is not None:
+                self._delete((_sector_key(name), _SECTOR, sector_id))
+            for automation_id in self._automations_by_sector.pop(sector_id, set()):
+                entry = self._automations.get(automation_id)
+                if entry is not None:
+                    self._automations[automation_id] = entry._replace(sector_ids=entry.sector_ids - {sector_id})
+
+    # --- Consulta ----------------------------------------------------------
+
+    def _candidates(self, key: str, within: Optional[set[int]]) -> Iterator[tuple[str, int, int]]:
+        """Entradas que começam com `key`, em ordem; com poucos ids visíveis, olha só as deles"""
+        if within is not None and len(within) <= _MAX_SCAN // 4:
+            entries = [
+                (title_key, _TITLE, automation_id)
+                for automation_id in within
+                if automation_id in self._automations
+                for title_key in self._automations[automation_id].keys
+                if title_key.startswith(key)
+            ]
+            entries.extend(
+                (_sector_key(name), _SECTOR, sector_id)
+                for sector_id, name in self._sectors.items()
+                if _sector_key(name).startswith(key)
+            )
+            yield from sorted(entries)
+            return
+
+        position = bisect.bisect_left(self._entries, (key,))
+        end = min(len(self._entries), position + _MAX_SCAN)
+        while position < end and self._entries[position][0].startswith(key):
+            yield self._entries[position]
+            position += 1
+
+    def suggest(
+        self,
+        prefix: str,
+        limit: int = 8,
+        within: Optional[set[int]] = None,
+        active_only: bool = False,
+    ) -> list[Suggestion]:
+        """
+        Automações cujo título (a partir de qualquer palavra) ou setor começa com `prefix`.
+        `within` (ids visíveis do usuário) e `active_only` aplicam as regras de acesso.
+        Títulos vêm antes dos setores, cada grupo em ordem alfabética da chave.
+        """
+        key = " ".join(tokenize(prefix))
+        if not key:
+            return []
+        self._ensure_loaded()
+        title_matches: list[Suggestion] = []
+        sector_matches: list[Suggestion] = []
+        title_seen: set[int] = set()
+        sector_seen: set[int] = set()
+
+        def _accept(automation_id: int, seen: set[int]) -> Optional[_AutomationEntry]:
+            entry = self._automations.get(automation_id)
+            if entry is None or automation_id in seen:
+                return None
+            if (active_only and not entry.is_active) or (within is not None and automation_id not in within):
+                return None
+            seen.add(automation_id)
+            return entry
+
+        with self._lock:
+            for _, kind, ref_id in self._candidates(key, within):
+                if len(title_matches) >= limit:
+                    break
+                if kind == _TITLE:
+                    automation = _accept(ref_id, title_seen)
+                    if automation is not None:
+                        title_matches.append(Suggestion(ref_id, automation.title, "title"))
+                    continue
+                sector_name = self._sectors[ref_id]
+                for automation_id in sorted(self._automations_by_sector.get(ref_id, ())):
+                    if len(sector_matches) >= limit:
+                        break
+                    automation = _accept(automation_id, sector_seen)
+                    if automation is not None:
+                        sector_matches.append(Suggestion(automation_id, automation.title, "sector", sector_name))
+
+        # Títulos têm prioridade: a automação que casou pelos dois caminhos aparece só uma vez
+        sector_matches = [match for match in sector_matches if match.automation_id not in title_seen]
+        return (title_matches + sector_matches)[:limit]
+
+
+automation_suggest_index = SuggestIndex()
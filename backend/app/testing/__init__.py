@@ -0,0 +1 @@
+# Ferramentas de teste/benchmark (ex.: Keycloak fake em processo)
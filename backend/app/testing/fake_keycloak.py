@@ -0,0 +1,391 @@
+"""
+Keycloak fake em processo para testes offline e benchmarks de autenticação.
+
+Implementa o subconjunto de OIDC usado pelo hub: JWKS (certs), authorize com PKCE (S256),
+token (authorization_code, refresh_token, client_credentials) e logout, assinando tokens RS256
+reais com chaves rotacionáveis. Latência e falhas podem ser injetadas.
+
+Uso em testes (sem rede, via httpx.ASGITransport):
+
+    fake = FakeKeycloak()
+    fake.add_user("ana@logtudo.com.br", roles=["user"])
+    with fake.install():
+        ...  # app.auth passa a falar com o fake
+
+Ou rodando em localhost:
+
+    python -m app.testing.fake_keycloak --port 8080
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import random
+import secrets
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from jose.backends.base import Key
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse, Response
+from starlette.routing import Route
+
+from app.config import KEYCLOAK_CLIENT_ID, KEYCLOAK_CLIENT_SECRET, KEYCLOAK_ISSUER
+
+
+@dataclass
+class _SigningKey:
+    kid: str
+    private_key: Key
+    public_jwk: dict[str, Any]
+
+
+@dataclass
+class _AuthorizationCode:
+    email: str
+    client_id: str
+    redirect_uri: str
+    code_challenge: Optional[str]
+    expires_at: float
+
+
+@dataclass
+class _RefreshGrant:
+    email: str
+    client_id: str
+    session_id: str
+    expires_at: float
+
+
+@dataclass
+class FakeUser:
+    email: str
+    name: str
+    roles: list[str] = field(default_factory=list)
+    client_roles: list[str] = field(default_factory=list)
+    extra_claims: dict[str, Any] = field(default_factory=dict)
+    subject: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+
+def _generate_signing_key() -> _SigningKey:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    kid = secrets.token_urlsafe(12)
+    public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+    public_jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    # Key já construída: recarregar o PEM a cada assinatura custa dezenas de ms (checagens RSA)
+    return _SigningKey(kid=kid, private_key=jwk.construct(private_pem, "RS256"), public_jwk=public_jwk)
+
+
+def _pkce_challenge(verifier: str) -> str:
+    digest = hashlib.sha256(verifier.encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest).decode("utf-8").rstrip("=")
+
+
+class FakeKeycloak:
+    def __init__(
+        self,
+        issuer: str = KEYCLOAK_ISSUER,
+        client_id: str = KEYCLOAK_CLIENT_ID,
+        client_secret: Optional[str] = KEYCLOAK_CLIENT_SECRET,
+        access_token_ttl: int = 300,
+        refresh_token_ttl: int = 1800,
+        jwks_max_age: int = 300,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 503,
+    ) -> None:
+        self.issuer = issuer.rstrip("/")
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.access_token_ttl = access_token_ttl
+        self.refresh_token_ttl = refresh_token_ttl
+        self.jwks_max_age = jwks_max_age
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.users: dict[str, FakeUser] = {}
+        self.request_counts: dict[str, int] = {}
+        self._keys: list[_SigningKey] = [_generate_signing_key()]
+        self._codes: dict[str, _AuthorizationCode] = {}
+        self._refresh_grants: dict[str, _RefreshGrant] = {}
+        self._forced_failures: list[int] = []
+        self._random = random.Random()
+        self.app = self._build_app()
+
+    # --- Configuração -------------------------------------------------------
+
+    @property
+    def base_path(self) -> str:
+        return f"{urlparse(self.issuer).path}/protocol/openid-connect"
+
+    @property
+    def active_kid(self) -> str:
+        return self._keys[0].kid
+
+    def add_user(
+        self,
+        email: str,
+        name: Optional[str] = None,
+        roles: Optional[list[str]] = None,
+        client_roles: Optional[list[str]] = None,
+        **extra_claims: Any,
+    ) -> FakeUser:
+        user = FakeUser(
+            email=email,
+            name=name or email.split("@")[0],
+            roles=list(roles or []),
+            client_roles=list(client_roles or []),
+            extra_claims=extra_claims,
+        )
+        self.users[email] = user
+        return user
+
+    def rotate_keys(self, keep_previous: bool = True) -> str:
+        """Gera uma nova chave ativa; a anterior continua publicada no JWKS se keep_previous"""
+        new_key = _generate_signing_key()
+        self._keys = [new_key] + (self._keys[:1] if keep_previous else [])
+        return new_key.kid
+
+    def fail_next(self, count: int = 1, status_code: Optional[int] = None) -> None:
+        """As próximas `count` requisições respondem com erro (503 por padrão)"""
+        self._forced_failures.extend([status_code or self.failure_status] * count)
+
+    # --- Emissão de tokens --------------------------------------------------
+
+    def issue_access_token(self, email: str, expires_in: Optional[int] = None, **claims: Any) -> str:
+        user = self.users[email]
+        now = int(time.time())
+        payload: dict[str, Any] = {
+            "iss": self.issuer,
+            "aud": [self.client_id, "account"],
+            "azp": self.client_id,
+            "sub": user.subject,
+            "typ": "Bearer",
+            "iat": now,
+            "exp": now + (expires_in if expires_in is not None else self.access_token_ttl),
+            "jti": str(uuid.uuid4()),
+            "email": user.email,
+            "name": user.name,
+            "preferred_username": user.email,
+            "realm_access": {"roles": user.roles},
+            "resource_access": {self.client_id: {"roles": user.client_roles}},
+        }
+        payload.update(user.extra_claims)
+        payload.update(claims)
+        key = self._keys[0]
+        return jwt.encode(payload, key.private_key, algorithm="RS256", headers={"kid": key.kid})
+
+    def issue_code(self, email: str, redirect_uri: str, code_challenge: Optional[str] = None) -> str:
+        """Simula o usuário concluindo o login na tela do Keycloak"""
+        if email not in self.users:
+            self.add_user(email)
+        code = secrets.token_urlsafe(24)
+        self._codes[code] = _AuthorizationCode(
+            email=email,
+            client_id=self.client_id,
+            redirect_uri=redirect_uri,
+            code_challenge=code_challenge,
+            expires_at=time.time() + 60,
+        )
+        return code
+
+    def complete_login(self, authorization_url: str, email: str) -> str:
+        """Recebe a URL de /auth gerada pelo hub e devolve a URL de callback com code e state"""
+        query = {key: values[0] for key, values in parse_qs(urlparse(authorization_url).query).items()}
+        code = self.issue_code(email, query["redirect_uri"], query.get("code_challenge"))
+        return f"{query['redirect_uri']}?{urlencode({'code': code, 'state': query.get('state', '')})}"
+
+    def _token_response(self, email: str, client_id: str, session_id: Optional[str] = None) -> dict[str, Any]:
+        session_id = session_id or str(uuid.uuid4())
+        refresh_token = secrets.token_urlsafe(32)
+        self._refresh_grants[refresh_token] = _RefreshGrant(
+            email=email,
+            client_id=client_id,
+            session_id=session_id,
+            expires_at=time.time() + self.refresh_token_ttl,
+        )
+        return {
+            "access_token": self.issue_access_token(email, sid=session_id),
+            "id_token": self.issue_access_token(email, sid=session_id, typ="ID"),
+            "refresh_token": refresh_token,
+            "token_type": "Bearer",
+            "expires_in": self.access_token_ttl,
+            "refresh_expires_in": self.refresh_token_ttl,
+            "session_state": session_id,
+            "scope": "openid profile email",
+        }
+
+    # --- ASGI ---------------------------------------------------------------
+
+    def transport(self) -> httpx.ASGITransport:
+        return httpx.ASGITransport(app=self.app)
+
+    @contextmanager
+    def install(self) -> Iterator["FakeKeycloak"]:
+        """Aponta o cliente OIDC de app.auth para este fake (sem rede) e limpa os caches de auth"""
+        from app.auth import reset_auth_caches
+        from app.oidc import oidc_client
+
+        previous_transport = oidc_client.transport
+        oidc_client.configure(transport=self.transport())
+        reset_auth_caches()
+        try:
+            yield self
+        finally:
+            oidc_client.configure(transport=previous_transport)
+            reset_auth_caches()
+
+    def _build_app(self) -> Starlette:
+        base = self.base_path
+        return Starlette(routes=[
+            Route(f"{base}/certs", self._certs, methods=["GET"]),
+            Route(f"{base}/auth", self._authorize, methods=["GET"]),
+            Route(f"{base}/token", self._token, methods=["POST"]),
+            Route(f"{base}/logout", self._logout, methods=["GET", "POST"]),
+        ])
+
+    async def _before_request(self, endpoint: str) -> Optional[Response]:
+        self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._forced_failures:
+            return JSONResponse({"error": "injected_failure"}, status_code=self._forced_failures.pop(0))
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            return JSONResponse({"error": "injected_failure"}, status_code=self.failure_status)
+        return None
+
+    async def _certs(self, request: Request) -> Response:
+        failure = await self._before_request("certs")
+        if failure:
+            return failure
+        return JSONResponse(
+            {"keys": [key.public_jwk for key in self._keys]},
+            headers={"Cache-Control": f"public, max-age={self.jwks_max_age}"},
+        )
+
+    async def _authorize(self, request: Request) -> Response:
+        failure = await self._before_request("auth")
+        if failure:
+            return failure
+        params = request.query_params
+        if params.get("client_id") != self.client_id or params.get("response_type") != "code":
+            return JSONResponse({"error": "invalid_request"}, status_code=400)
+        # Sem tela de login: usa login_hint ou o primeiro usuário cadastrado
+        email = params.get("login_hint") or next(iter(self.users), None)
+        if not email:
+            return JSONResponse({"error": "no_users"}, status_code=400)
+        code = self.issue_code(email, params["redirect_uri"], params.get("code_challenge"))
+        query = urlencode({"code": code, "state": params.get("state", "")})
+        return RedirectResponse(f"{params['redirect_uri']}?{query}", status_code=302)
+
+    def _client_error(self, form: Any) -> Optional[Response]:
+        if form.get("client_id") != self.client_id:
+            return JSONResponse({"error": "invalid_client"}, status_code=401)
+        if self.client_secret and form.get("client_secret") != self.client_secret:
+            return JSONResponse({"error": "unauthorized_client"}, status_code=401)
+        return None
+
+    async def _token(self, request: Request) -> Response:
+        failure = await self._before_request("token")
+        if failure:
+            return failure
+        form = await request.form()
+        client_error = self._client_error(form)
+        if client_error:
+            return client_error
+
+        grant_type = form.get("grant_type")
+        if grant_type == "authorization_code":
+            grant = self._codes.pop(str(form.get("code")), None)
+            if grant is None or grant.expires_at <= time.time():
+                return JSONResponse({"error": "invalid_grant", "error_description": "Code not valid"}, status_code=400)
+            if grant.redirect_uri != form.get("redirect_uri"):
+                return JSONResponse({"error": "invalid_grant", "error_description": "Incorrect redirect_uri"}, status_code=400)
+            if grant.code_challenge and _pkce_challenge(str(form.get("code_verifier", ""))) != grant.code_challenge:
+                return JSONResponse({"error": "invalid_grant", "error_description": "PKCE verification failed"}, status_code=400)
+            return JSONResponse(self._token_response(grant.email, grant.client_id))
+
+        if grant_type == "refresh_token":
+            refresh = self._refresh_grants.pop(str(form.get("refresh_token")), None)
+            if refresh is None or refresh.expires_at <= time.time():
+                return JSONResponse({"error": "invalid_grant", "error_description": "Token is not active"}, status_code=400)
+            return JSONResponse(self._token_response(refresh.email, refresh.client_id, refresh.session_id))
+
+        if grant_type == "client_credentials":
+            email = f"service-account-{self.client_id}@placeholder.org"
+            if email not in self.users:
+                self.add_user(email, name=f"service-account-{self.client_id}")
+            return JSONResponse({
+                "access_token": self.issue_access_token(email),
+                "token_type": "Bearer",
+                "expires_in": self.access_token_ttl,
+            })
+
+        return JSONResponse({"error": "unsupported_grant_type"}, status_code=400)
+
+    async def _logout(self, request: Request) -> Response:
+        failure = await self._before_request("logout")
+        if failure:
+            return failure
+        params = dict(request.query_params)
+        if request.method == "POST":
+            params.update(await request.form())
+
+        refresh_token = params.get("refresh_token")
+        session_id = self._refresh_grants[refresh_token].session_id if refresh_token in self._refresh_grants else None
+        if session_id:
+            for token, grant in list(self._refresh_grants.items()):
+                if grant.session_id == session_id:
+                    del self._refresh_grants[token]
+
+        redirect = params.get("post_logout_redirect_uri")
+        if redirect:
+            return RedirectResponse(redirect, status_code=302)
+        return Response(status_code=204)
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        import uvicorn
+
+        uvicorn.run(self.app, host=host, port=port, log_level="info")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keycloak fake para desenvolvimento/benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="latência artificial por request (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fração de requests com 503")
+    parser.add_argument("--user", action="append", default=[], help="e-mail de usuário (pode repetir)")
+    parser.add_argument("--admin", action="append", default=[], help="e-mail de usuário admin (pode repetir)")
+    args = parser.parse_args()
+
+    realm_path = urlparse(KEYCLOAK_ISSUER).path
+    fake = FakeKeycloak(
+        issuer=f"http://{args.host}:{args.port}{realm_path}",
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+    )
+    for user_email in args.user:
+        fake.add_user(user_email, roles=["user"])
+    for admin_email in args.admin:
+        fake.add_user(admin_email, roles=["admin"])
+    print(f"Fake Keycloak em http://{args.host}:{args.port}{realm_path} (use KEYCLOAK_BASE_URL=http://{args.host}:{args.port})")
+    fake.serve(args.host, args.port)
@@ -0,0 +1,230 @@
+"""Armazenamento de refresh tokens por sessão (sid), com TTL e backends plugáveis"""
+import base64
+import hashlib
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy.orm import Session
+
+from app.config import REFRESH_TOKEN_ENCRYPTION_KEY, REFRESH_TOKEN_STORE, REFRESH_TOKEN_TTL_SECONDS, SECRET_KEY
+from app.database import SessionLocal
+from app.models import RefreshToken
+
+_LATENCY_SAMPLES = 1024
+
+
+class RefreshTokenStore:
+    """
+    Interface dos stores de refresh token.
+
+    Subclasses implementam _set/_get/_delete/_purge_expired/_count; a classe base aplica o TTL
+    padrão e mede a latência das leituras para o endpoint de métricas.
+    """
+
+    backend = "base"
+
+    def __init__(self, default_ttl: int = REFRESH_TOKEN_TTL_SECONDS) -> None:
+        self.default_ttl = default_ttl
+        self._lookup_latencies: deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._lookups = 0
+        self._hits = 0
+
+    def set(self, sid: str, refresh_token: str, ttl: Optional[int] = None) -> None:
+        ttl = ttl if ttl and ttl > 0 else self.default_ttl
+        self._set(sid, refresh_token, time.time() + ttl)
+
+    def get(self, sid: str) -> Optional[str]:
+        started = time.perf_counter()
+        token = self._get(sid)
+        self._lookup_latencies.append(time.perf_counter() - started)
+        self._lookups += 1
+        if token is not None:
+            self._hits += 1
+        return token
+
+    def delete(self, sid: str) -> None:
+        self._delete(sid)
+
+    def purge_expired(self) -> int:
+        return self._purge_expired()
+
+    def stats(self) -> dict[str, Any]:
+        latencies = sorted(self._lookup_latencies)
+        stats: dict[str, Any] = {
+            "backend": self.backend,
+            "entries": self._count(),
+            "approx_memory_bytes": self._approx_memory_bytes(),
+            "lookups": self._lookups,
+            "hits": self._hits,
+            "lookup_latency_ms": None,
+        }
+        if latencies:
+            stats["lookup_latency_ms"] = {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 4),
+                "p95": round(latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000, 4),
+                "max": round(latencies[-1] * 1000, 4),
+            }
+        return stats
+
+    def _set(self, sid: str, refresh_token: str, expires_at: float) -> None:
+        raise NotImplementedError
+
+    def _get(self, sid: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _delete(self, sid: str) -> None:
+        raise NotImplementedError
+
+    def _purge_expired(self) -> int:
+        raise NotImplementedError
+
+    def _count(self) -> int:
+        raise NotImplementedError
+
+    def _approx_memory_bytes(self) -> Optional[int]:
+        return None
+
+
+class MemoryRefreshTokenStore(RefreshTokenStore):
+    """Store em memória do processo, particionado em N shards com lock próprio (lock striping)"""
+
+    backend = "memory"
+
+    def __init__(self, default_ttl: int = REFRESH_TOKEN_TTL_SECONDS, stripes: int = 16) -> None:
+        super().__init__(default_ttl)
+        self._stripes: list[tuple[threading.Lock, dict[str, tuple[str, float]]]] = [
+            (threading.Lock(), {}) for _ in range(stripes)
+        ]
+
+    def _stripe(self, sid: str) -> tuple[threading.Lock, dict[str, tuple[str, float]]]:
+        return self._stripes[zlib.crc32(sid.encode("utf-8")) % len(self._stripes)]
+
+    def _set(self, sid: str, refresh_token: str, expires_at: float) -> None:
+        lock, entries = self._stripe(sid)
+        with lock:
+            entries[sid] = (refresh_token, expires_at)
+
+    def _get(self, sid: str) -> Optional[str]:
+        lock, entries = self._stripe(sid)
+        with lock:
+            entry = entries.get(sid)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del entries[sid]
+                return None
+            return entry[0]
+
+    def _delete(self, sid: str) -> None:
+        lock, entries = self._stripe(sid)
+        with lock:
+            entries.pop(sid, None)
+
+    def _purge_expired(self) -> int:
+        now = time.time()
+        removed = 0
+        for lock, entries in self._stripes:
+            with lock:
+                expired = [sid for sid, (_, expires_at) in entries.items() if expires_at <= now]
+                for sid in expired:
+                    del entries[sid]
+                removed += len(expired)
+        return removed
+
+    def _count(self) -> int:
+        return sum(len(entries) for _, entries in self._stripes)
+
+    def _approx_memory_bytes(self) -> int:
+        total = 0
+        for lock, entries in self._stripes:
+            with lock:
+                total += sys.getsizeof(entries)
+                for sid, entry in entries.items():
+                    total += sys.getsizeof(sid) + sys.getsizeof(entry) + sys.getsizeof(entry[0])
+        return total
+
+
+def _token_cipher(secret: str) -> Fernet:
+    # Fernet exige 32 bytes em base64; a chave configurada pode ser qualquer texto
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret.encode("utf-8")).digest()))
+
+
+class SQLRefreshTokenStore(RefreshTokenStore):
+    """
+    Store compartilhado entre workers na tabela refresh_tokens (índice em expires_at).
+
+    Os tokens são gravados cifrados (Fernet): um vazamento só de leitura do banco não entrega
+    refresh tokens do Keycloak utilizáveis sem a chave da aplicação.
+    """
+
+    backend = "sql"
+
+    def __init__(
+        self,
+        default_ttl: int = REFRESH_TOKEN_TTL_SECONDS,
+        session_factory: Callable[[], Session] = SessionLocal,
+        encryption_key: str = REFRESH_TOKEN_ENCRYPTION_KEY or SECRET_KEY,
+    ) -> None:
+        super().__init__(default_ttl)
+        self.session_factory = session_factory
+        self._cipher = _token_cipher(encryption_key)
+
+    def _set(self, sid: str, refresh_token: str, expires_at: float) -> None:
+        with self.session_factory() as db:
+            db.merge(RefreshToken(
+                session_id=sid,
+                token=self._cipher.encrypt(refresh_token.encode("utf-8")).decode("ascii"),
+                expires_at=datetime.utcfromtimestamp(expires_at),
+            ))
+            db.commit()
+
+    def _get(self, sid: str) -> Optional[str]:
+        with self.session_factory() as db:
+            stored = (
+                db.query(RefreshToken.token)
+                .filter(RefreshToken.session_id == sid, RefreshToken.expires_at > datetime.utcnow())
+                .scalar()
+            )
+        if stored is None:
+            return None
+        try:
+            return self._cipher.decrypt(stored.encode("ascii")).decode("utf-8")
+        except (InvalidToken, UnicodeEncodeError):
+            # Gravado com outra chave (ou em texto puro, antes da cifra): equivale a sessão sem token
+            return None
+
+    def _delete(self, sid: str) -> None:
+        with self.session_factory() as db:
+            db.query(RefreshToken).filter(RefreshToken.session_id == sid).delete(synchronize_session=False)
+            db.commit()
+
+    def _purge_expired(self) -> int:
+        with self.session_factory() as db:
+            removed = (
+                db.query(RefreshToken)
+                .filter(RefreshToken.expires_at <= datetime.utcnow())
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return removed
+
+    def _count(self) -> int:
+        with self.session_factory() as db:
+            return db.query(RefreshToken).filter(RefreshToken.expires_at > datetime.utcnow()).count()
+
+
+def build_refresh_token_store(backend: str = REFRESH_TOKEN_STORE) -> RefreshTokenStore:
+    if backend == "sql":
+        return SQLRefreshTokenStore()
+    if backend != "memory":
+        print(f"REFRESH_TOKEN_STORE desconhecido '{backend}', usando memória")
+    return MemoryRefreshTokenStore()
+
+
+refresh_token_store = build_refresh_token_store()
@@ -0,0 +1,111 @@
+"""
+Buffer em memória gravado em lote por uma task de background (write-behind).
+
+Base do registro de cliques e do audit log: o caminho da request só anexa ao buffer (sem I/O) e
+a task grava quando o buffer atinge batch_size ou a cada interval segundos; stop() drena o resto
+no shutdown. Se o banco falhar, os itens voltam para a frente da fila; acima de max_items os mais
+antigos são descartados (e contados em dropped) para a memória não crescer sem limite.
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import Generic, Optional, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+
+class WriteBehindBuffer(Generic[T]):
+    name = "write-behind"
+
+    def __init__(self, session_factory, batch_size: int, interval: float, max_items: int) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._items: deque[T] = deque(maxlen=max_items)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    # --- Ciclo de vida ------------------------------------------------------
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Para a task e grava o que ainda estiver no buffer; a falha é só registrada para não travar o shutdown"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self._loop = None
+        try:
+            await run_in_threadpool(self.flush)
+        except Exception as exc:
+            print(f"{self.name} final flush failed: {exc}")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as exc:
+                print(f"{self.name} flush failed: {exc}")
+
+    # --- Escrita -------------------------------------------------------------
+
+    def _append(self, item: T) -> None:
+        """Só memória: chamado no caminho da request (thread do threadpool ou event loop)"""
+        with self._lock:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            full = len(self._items) >= self.batch_size
+        loop = self._loop
+        if full and loop is not None:
+            loop.call_soon_threadsafe(self._wake.set)
+
+    def _write(self, db: Session, items: list[T]) -> None:
+        """Grava o lote na transação aberta; o commit é feito por flush()"""
+        raise NotImplementedError
+
+    def flush(self) -> int:
+        """Grava todo o buffer; se o banco falhar os itens voltam para a frente da fila"""
+        with self._flush_lock:
+            with self._lock:
+                items = list(self._items)
+                self._items.clear()
+            if not items:
+                return 0
+            db = None
+            try:
+                db = self.session_factory()
+                self._write(db, items)
+                db.commit()
+            except Exception:
+                if db is not None:
+                    db.rollback()
+                with self._lock:
+                    pending = items + list(self._items)
+                    self.dropped += max(0, len(pending) - self._items.maxlen)
+                    self._items.clear()
+                    self._items.extend(pending)  # maxlen descarta os mais antigos
+                raise
+            finally:
+                if db is not None:
+                    db.close()
+            return len(items)
@@ -0,0 +1,101 @@
+"""
+Benchmark: KeycloakJWTMiddleware antigo (BaseHTTPMiddleware + usuário no cookie) vs. ASGI puro com bypass.
+
+Mede req/s em /health e /api/v1/auth/me chamando a aplicação in-process (httpx.ASGITransport),
+sem rede, para isolar o custo do middleware. Uso (a partir de backend/):
+
+    python -m benchmarks.bench_auth_middleware --requests 5000
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+from typing import Callable
+
+import httpx
+from fastapi import FastAPI, Request
+from itsdangerous import TimestampSigner
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.sessions import SessionMiddleware
+
+from app.auth import AuthenticatedUser, KeycloakJWTMiddleware, user_session_store
+from app.routers import auth as auth_router
+
+SECRET = "bench-secret"
+USER = AuthenticatedUser(
+    subject="sub-bench",
+    id=1,
+    email="bench@logtudo.com.br",
+    full_name="Bench User",
+    roles=["user", "offline_access", "uma_authorization"],
+    token_claims={
+        "sub": "sub-bench",
+        "email": "bench@logtudo.com.br",
+        "realm_access": {"roles": ["user", "offline_access", "uma_authorization"]},
+        "resource_access": {"account": {"roles": ["manage-account", "view-profile"]}},
+        "scope": "openid profile email",
+        "session_state": "x" * 36,
+    },
+)
+
+
+class LegacyKeycloakJWTMiddleware(BaseHTTPMiddleware):
+    """Cópia da implementação anterior: reconstrói o usuário do cookie em toda request"""
+
+    async def dispatch(self, request: Request, call_next: Callable):
+        session_user_data = request.session.get("user") if "session" in request.scope else None
+        if session_user_data:
+            request.state.auth_user = AuthenticatedUser(**session_user_data)
+        return await call_next(request)
+
+
+def _session_cookie(data: dict) -> str:
+    payload = base64.b64encode(json.dumps(data).encode("utf-8"))
+    return TimestampSigner(SECRET).sign(payload).decode("utf-8")
+
+
+def _app(legacy: bool) -> FastAPI:
+    app = FastAPI()
+    if legacy:
+        app.add_middleware(LegacyKeycloakJWTMiddleware)
+        app.add_middleware(SessionMiddleware, secret_key=SECRET)
+    else:
+        app.add_middleware(KeycloakJWTMiddleware, session_options={"secret_key": SECRET})
+    app.include_router(auth_router.router, prefix="/api/v1")
+
+    @app.get("/health")
+    async def health_check() -> dict[str, str]:
+        return {"status": "healthy"}
+
+    return app
+
+
+async def _measure(app: FastAPI, cookie: str, path: str, total: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies={"session": cookie}) as client:
+        response = await client.get(path)
+        assert response.status_code == 200, (path, response.status_code, response.text)
+        started = time.perf_counter()
+        for _ in range(total):
+            await client.get(path)
+        return total / (time.perf_counter() - started)
+
+
+async def main(total: int) -> None:
+    legacy_cookie = _session_cookie({"user": USER.model_dump()})
+    user_session_store.save("bench-sid", USER, USER.model_dump())
+    server_cookie = _session_cookie({"sid": "bench-sid"})
+    print(f"cookie size: legacy={len(legacy_cookie)}B server-side={len(server_cookie)}B")
+
+    for path in ("/health", "/api/v1/auth/me"):
+        before = await _measure(_app(legacy=True), legacy_cookie, path, total)
+        after = await _measure(_app(legacy=False), server_cookie, path, total)
+        print(f"{path:<18} before={before:8.1f} req/s after={after:8.1f} req/s ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
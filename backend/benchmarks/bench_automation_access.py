@@ -0,0 +1,79 @@
+"""
+Benchmark: checagem de acesso de GET /automations/{id} para uma automação muito compartilhada.
+
+Popula um SQLite em memória com uma automação liberada diretamente para N usuários e compara
+a checagem antiga (carrega automation.sectors e automation.users_with_access) com o EXISTS
+sobre as chaves primárias das tabelas de permissão. Uso (a partir de backend/):
+
+    python -m benchmarks.bench_automation_access --users 5000
+"""
+import argparse
+import time
+
+from sqlalchemy import insert
+
+from app.auth import AuthenticatedUser
+from app.models import Automation, Sector, User, automation_permissions, user_automation_permissions
+from app.routers.automations import _has_access
+from tests.db_utils import create_test_session_factory
+
+
+def _legacy_check(db, current_user: AuthenticatedUser, automation_id: int) -> bool:
+    automation = db.get(Automation, automation_id)
+    sector_ids = [s.id for s in automation.sectors]
+    user_ids = [u.id for u in automation.users_with_access]
+    return current_user.sector_id in sector_ids or current_user.id in user_ids
+
+
+def _exists_check(db, current_user: AuthenticatedUser, automation_id: int) -> bool:
+    db.get(Automation, automation_id)
+    return _has_access(db, current_user, automation_id)
+
+
+def main(total_users: int, repeat: int) -> None:
+    session_factory = create_test_session_factory()
+    db = session_factory()
+    sectors = [Sector(name=f"Setor {i}", slug=f"setor-{i}") for i in range(20)]
+    automation = Automation(title="Relatório de Fretes", target_url="https://automacoes.local/fretes")
+    db.add_all(sectors + [automation])
+    db.flush()
+    db.execute(insert(User), [
+        {
+            "email": f"user{i}@logtudo.com.br",
+            "password_hash": "x",
+            "full_name": f"Usuário {i}",
+            "sector_id": sectors[i % len(sectors)].id,
+        }
+        for i in range(total_users)
+    ])
+    user_ids = [user_id for (user_id,) in db.query(User.id)]
+    db.execute(insert(automation_permissions), [{"automation_id": automation.id, "sector_id": sectors[0].id}])
+    db.execute(
+        insert(user_automation_permissions),
+        [{"user_id": user_id, "automation_id": automation.id} for user_id in user_ids],
+    )
+    db.commit()
+    automation_id, outside_sector_id = automation.id, sectors[-1].id
+    db.close()
+
+    # Usuário com acesso direto, fora do setor liberado: o pior caso da checagem antiga
+    current_user = AuthenticatedUser(
+        subject="bench", id=user_ids[-1], email="bench@logtudo.com.br", role="user", sector_id=outside_sector_id
+    )
+    print(f"automação compartilhada com {total_users} usuários")
+    for label, check in (("relationships", _legacy_check), ("exists", _exists_check)):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            session = session_factory()  # sessão nova por request, como em get_db
+            allowed = check(session, current_user, automation_id)
+            session.close()
+        elapsed_ms = (time.perf_counter() - started) / repeat * 1000
+        print(f"{label:<14} {elapsed_ms:8.2f} ms  (acesso={allowed})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.users, args.repeat)
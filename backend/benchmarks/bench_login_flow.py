@@ -0,0 +1,65 @@
+"""
+Benchmark: fluxo completo de login (/login → Keycloak fake → /callback → /me) in-process.
+
+Usa app.testing.fake_keycloak via httpx.ASGITransport, sem rede, com latência opcional
+simulando o Keycloak real. Uso (a partir de backend/):
+
+    python -m benchmarks.bench_login_flow --logins 200 --latency 0.02
+"""
+import argparse
+import time
+from urllib.parse import urlparse
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import KeycloakJWTMiddleware
+from app.database import get_db
+from app.routers import auth as auth_router
+from app.testing.fake_keycloak import FakeKeycloak
+from tests.db_utils import create_test_session_factory
+
+
+def _app() -> FastAPI:
+    session_factory = create_test_session_factory()
+
+    def _db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.add_middleware(KeycloakJWTMiddleware, session_options={"secret_key": "bench-secret"})
+    app.include_router(auth_router.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = _db
+    return app
+
+
+def main(total: int, latency: float) -> None:
+    keycloak = FakeKeycloak(latency=latency)
+    emails = [f"user{i}@logtudo.com.br" for i in range(total)]
+    for email in emails:
+        keycloak.add_user(email, roles=["user"])
+
+    with keycloak.install(), TestClient(_app()) as client:
+        started = time.perf_counter()
+        for email in emails:
+            client.cookies.clear()
+            login = client.get("/api/v1/auth/login", follow_redirects=False)
+            callback = urlparse(keycloak.complete_login(login.headers["location"], email))
+            client.get(f"{callback.path}?{callback.query}", follow_redirects=False)
+            assert client.get("/api/v1/auth/me").json()["email"] == email
+        elapsed = time.perf_counter() - started
+
+    print(f"{total} logins em {elapsed:.2f}s ({total / elapsed:.1f} logins/s, latência fake={latency * 1000:.0f}ms)")
+    print(f"requests ao Keycloak: {keycloak.request_counts}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    main(args.logins, args.latency)
@@ -0,0 +1,110 @@
+"""
+Benchmark: token exchange com httpx.Client por chamada (implementação antiga) vs. pool assíncrono (OIDCHttpClient).
+
+Sobe um endpoint de token fake em localhost (uvicorn) e mede latência e vazão de N trocas de código,
+sequenciais e concorrentes. Uso (a partir de backend/):
+
+    python -m benchmarks.bench_oidc_client --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+REALM = "bench"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _token_endpoint(request):
+    await request.form()
+    return JSONResponse({"access_token": "a", "refresh_token": "r", "token_type": "Bearer", "expires_in": 300})
+
+
+def _start_fake_keycloak(port: int) -> uvicorn.Server:
+    app = Starlette(routes=[Route(f"/realms/{REALM}/protocol/openid-connect/token", _token_endpoint, methods=["POST"])])
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def _legacy_exchange(token_url: str) -> dict:
+    """Cópia da implementação anterior: um client (e uma conexão TCP) por chamada"""
+    with httpx.Client(timeout=10.0) as client:
+        response = client.post(token_url, data={"grant_type": "authorization_code", "code": "c"})
+        response.raise_for_status()
+        return response.json()
+
+
+def _summary(label: str, latencies: list[float], elapsed: float) -> str:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return (
+        f"{label:<28} mean={statistics.mean(ordered) * 1000:7.2f}ms "
+        f"p50={statistics.median(ordered) * 1000:7.2f}ms p95={p95 * 1000:7.2f}ms "
+        f"throughput={len(ordered) / elapsed:8.1f} req/s"
+    )
+
+
+async def _run(label: str, call, total: int, concurrency: int) -> str:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return _summary(label, latencies, time.perf_counter() - started)
+
+
+async def main(total: int, concurrency: int) -> None:
+    from starlette.concurrency import run_in_threadpool
+
+    from app import auth
+    from app.config import KEYCLOAK_TOKEN_URL
+    from app.oidc import oidc_client
+
+    await oidc_client.start()
+    try:
+        for level in (1, concurrency):
+            print(f"--- {total} requests, concurrency={level}")
+            print(await _run("legacy (Client per call)", lambda: run_in_threadpool(_legacy_exchange, KEYCLOAK_TOKEN_URL), total, level))
+            print(await _run("pooled AsyncClient", lambda: auth.exchange_code_for_tokens("c", "v", "http://localhost/cb"), total, level))
+    finally:
+        await oidc_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    port = _free_port()
+    # Precisa ser definido antes de importar app.config, que deriva as URLs do Keycloak
+    os.environ["KEYCLOAK_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["KEYCLOAK_REALM"] = REALM
+    server = _start_fake_keycloak(port)
+    try:
+        asyncio.run(main(args.requests, args.concurrency))
+    finally:
+        server.should_exit = True
@@ -0,0 +1,76 @@
+"""
+Benchmark: busca de automações no índice em memória (fallback usado fora do Postgres).
+
+Popula um SQLite em memória com N automações e mede a latência de /automations/search
+(índice + SELECT dos candidatos) para consultas exatas, por prefixo e com erro de digitação.
+Uso (a partir de backend/):
+
+    python -m benchmarks.bench_search --automations 100000
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import insert
+
+from app import search as app_search
+from app.models import Automation
+from app.search import AutomationSearchIndex, ranked_automations
+from tests.db_utils import create_test_session_factory
+
+WORDS = [
+    "relatorio", "fretes", "conciliacao", "bancaria", "notas", "fiscais", "estoque", "faturamento",
+    "cobranca", "pedidos", "entregas", "romaneio", "transportadora", "pagamentos", "clientes",
+    "fornecedores", "contabil", "folha", "ponto", "auditoria", "inventario", "compras", "vendas",
+]
+QUERIES = ["relatorio fretes", "concil", "transportadroa", "estoque diario", "auditoria 4821", "bacomi"]
+
+
+def _vocabulary(rng: random.Random, size: int) -> list[str]:
+    """Termos específicos (clientes, sistemas, filiais): cada um aparece em poucas automações"""
+    syllables = ["ba", "co", "mi", "ta", "ru", "le", "no", "pe", "sa", "vi", "lo", "ge", "fa", "di"]
+    return sorted({"".join(rng.choice(syllables) for _ in range(3)) for _ in range(size)})
+
+
+def main(total: int, repeat: int) -> None:
+    session_factory = create_test_session_factory()
+    rng = random.Random(42)
+    db = session_factory()
+    specific = _vocabulary(rng, 5000)
+    rows = [
+        {
+            "title": f"{rng.choice(WORDS).title()} {' '.join(rng.sample(specific, 2)).title()} {i}",
+            "description": " ".join(rng.sample(WORDS, 6)) + " diario",
+            "target_url": f"https://automacoes.local/{i}",
+            "is_active": True,
+            "config": {rng.choice(WORDS): {"timeout": 30}},
+        }
+        for i in range(total)
+    ]
+    for start in range(0, total, 5000):
+        db.execute(insert(Automation), rows[start:start + 5000])
+    db.commit()
+
+    index = AutomationSearchIndex(session_factory)
+    app_search.automation_search_index = index
+    started = time.perf_counter()
+    index.rebuild(db)
+    print(f"{total} automações indexadas em {time.perf_counter() - started:.2f}s")
+
+    base_query = db.query(Automation)
+    for query in QUERIES:
+        ranked_automations(db, base_query, query, 20)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            results = ranked_automations(db, base_query, query, 20)
+        elapsed_ms = (time.perf_counter() - started) / repeat * 1000
+        print(f"{query!r:<22} {elapsed_ms:7.2f} ms  ({len(results)} resultados)")
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--automations", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.automations, args.repeat)
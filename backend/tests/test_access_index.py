@@ -0,0 +1,140 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.access_index import AutomationAccessIndex
+from app.catalog_cache import catalog_cache
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.database import get_db
+from app.models import Automation, Sector, User
+from app.routers import automations as automations_router
+from app.routers import users as users_router
+from tests.db_utils import QueryCounter, create_test_session_factory
+
+
+class AutomationAccessIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.session_factory = create_test_session_factory()
+        db = self.session_factory()
+        self.ops = Sector(name="Operações", slug="ops")
+        self.fin = Sector(name="Financeiro", slug="fin")
+        self.user = User(email="ana@logtudo.com.br", password_hash="x", full_name="Ana", sector=self.ops)
+        self.shared = Automation(title="Shared", target_url="https://a", sectors=[self.ops, self.fin])
+        self.fin_only = Automation(title="Fin only", target_url="https://b", sectors=[self.fin])
+        self.direct = Automation(title="Direct", target_url="https://c", users_with_access=[self.user])
+        self.inactive = Automation(title="Inactive", target_url="https://d", is_active=False, sectors=[self.ops])
+        db.add_all([self.ops, self.fin, self.user, self.shared, self.fin_only, self.direct, self.inactive])
+        db.commit()
+        self.db = db
+        self.index = AutomationAccessIndex(session_factory=self.session_factory)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_rebuild_matches_sector_and_direct_grants(self):
+        self.assertEqual(self.index.visible_ids(self.user.id, self.ops.id), {self.shared.id, self.direct.id})
+        self.assertEqual(self.index.visible_ids(None, self.fin.id), {self.shared.id, self.fin_only.id})
+        self.assertEqual(self.index.visible_ids(None, None), set())
+
+    def test_incremental_updates(self):
+        self.index.rebuild()
+        self.index.set_automation(self.inactive.id, True, [self.ops.id], [])
+        self.assertIn(self.inactive.id, self.index.visible_ids(self.user.id, self.ops.id))
+
+        self.index.set_automation(self.shared.id, False, [self.ops.id, self.fin.id], [])
+        self.assertNotIn(self.shared.id, self.index.visible_ids(None, self.fin.id))
+
+        self.index.set_user_grants(self.user.id, [self.fin_only.id])
+        self.assertEqual(self.index.visible_ids(self.user.id, None), {self.fin_only.id})
+
+        self.index.remove_automation(self.fin_only.id)
+        self.index.remove_sector(self.ops.id)
+        self.assertEqual(self.index.visible_ids(self.user.id, self.ops.id), set())
+
+
+class AutomationListingUsesIndexTests(unittest.TestCase):
+    def setUp(self):
+        session_factory = create_test_session_factory()
+        self.engine = session_factory.kw["bind"]
+        db = session_factory()
+        ops = Sector(name="Operações", slug="ops")
+        user = User(email="ana@logtudo.com.br", password_hash="x", full_name="Ana", sector=ops)
+        db.add_all([ops, user, Automation(title="Ops", target_url="https://a", sectors=[ops])])
+        db.commit()
+        self.user_id, self.sector_id = user.id, ops.id
+        db.close()
+
+        catalog_cache.invalidate()
+        index = AutomationAccessIndex(session_factory=session_factory)
+        self.index_patches = [
+            patch.object(module, "automation_access_index", index)
+            for module in (automations_router, users_router)
+        ]
+        for index_patch in self.index_patches:
+            index_patch.start()
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(automations_router.router, prefix="/api/v1")
+        app.include_router(users_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        app.dependency_overrides[get_current_admin] = lambda: AuthenticatedUser(
+            subject="admin", id=999, email="admin@logtudo.com.br", is_admin=True, role="admin"
+        )
+        app.dependency_overrides[get_current_user] = lambda: AuthenticatedUser(
+            subject="ana", id=self.user_id, email="ana@logtudo.com.br", role="user", sector_id=self.sector_id
+        )
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        for index_patch in self.index_patches:
+            index_patch.stop()
+
+    def _titles(self):
+        response = self.client.get("/api/v1/automations")
+        self.assertEqual(response.status_code, 200)
+        return [automation["title"] for automation in response.json()]
+
+    def test_writes_are_reflected_in_listing(self):
+        self.assertEqual(self._titles(), ["Ops"])
+
+        created = self.client.post(
+            "/api/v1/automations",
+            json={"title": "Nova", "target_url": "https://n", "sector_ids": [self.sector_id]},
+        ).json()
+        self.assertEqual(self._titles(), ["Ops", "Nova"])
+
+        self.client.put(f"/api/v1/automations/{created['id']}", json={"is_active": False})
+        self.assertEqual(self._titles(), ["Ops"])
+
+        direct = self.client.post(
+            "/api/v1/automations", json={"title": "Direta", "target_url": "https://d", "sector_ids": []}
+        ).json()
+        self.client.put(f"/api/v1/users/{self.user_id}", json={"automation_ids": [direct["id"]]})
+        self.assertEqual(self._titles(), ["Ops", "Direta"])
+
+        self.client.delete(f"/api/v1/automations/{direct['id']}")
+        self.assertEqual(self._titles(), ["Ops"])
+
+    def test_automation_write_reads_only_grant_ids(self):
+        direct = self.client.post(
+            "/api/v1/automations", json={"title": "Direta", "target_url": "https://d", "sector_ids": []}
+        ).json()
+        self.client.put(f"/api/v1/users/{self.user_id}", json={"automation_ids": [direct["id"]]})
+        with QueryCounter(self.engine) as counter:
+            self.client.put(f"/api/v1/automations/{direct['id']}", json={"title": "Direta 2"})
+        # Automações compartilhadas com milhares de usuários não carregam as linhas de users
+        self.assertFalse([statement for statement in counter.statements if "FROM users" in statement])
+        self.assertEqual(self._titles(), ["Ops", "Direta 2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import analytics
+from app.auth import AuthenticatedUser, get_current_user
+from app.click_log import ClickBuffer, ClickEvent
+from app.database import get_db
+from app.models import Automation, Sector, UsageRollupDaily, UsageRollupHourly
+from app.routers import dashboard as dashboard_router
+from tests.db_utils import QueryCounter, create_test_session_factory
+
+
+class UsageRollupTests(unittest.TestCase):
+    def setUp(self):
+        self.session_factory = create_test_session_factory()
+
+    def _rollup(self, model, dimension, key):
+        db = self.session_factory()
+        try:
+            rows = db.query(model).filter(model.dimension == dimension, model.key == key).all()
+            return sum(row.clicks for row in rows)
+        finally:
+            db.close()
+
+    def test_flushes_increment_existing_counters(self):
+        buffer = ClickBuffer(self.session_factory)
+        for _ in range(2):
+            buffer.record(1, 10, 3)
+            buffer.record(2, 11, None)  # usuário sem setor: só total e automação
+            buffer.flush()
+
+        self.assertEqual(self._rollup(UsageRollupDaily, analytics.TOTAL, 0), 4)
+        self.assertEqual(self._rollup(UsageRollupDaily, analytics.AUTOMATION, 1), 2)
+        self.assertEqual(self._rollup(UsageRollupHourly, analytics.AUTOMATION, 2), 2)
+        self.assertEqual(self._rollup(UsageRollupDaily, analytics.SECTOR, 3), 2)
+
+    def test_local_day_and_hour_buckets(self):
+        db = self.session_factory()
+        # 02:30 UTC ainda é o dia anterior (23:30) em America/Sao_Paulo
+        analytics.apply_rollups(db, [ClickEvent(1, 1, 1, datetime(2026, 3, 10, 2, 30))])
+        db.commit()
+        self.assertEqual(db.query(UsageRollupDaily.bucket).first()[0].isoformat(), "2026-03-09")
+        self.assertEqual(db.query(UsageRollupHourly.bucket).first()[0], datetime(2026, 3, 10, 2, 0))
+        hours = analytics.clicks_by_hour_of_day(db, 1, now=datetime(2026, 3, 10, 12, 0))
+        db.close()
+        self.assertEqual(hours[23], 1)
+        self.assertEqual(sum(hours), 1)
+
+
+class DashboardEndpointTests(unittest.TestCase):
+    def setUp(self):
+        session_factory = create_test_session_factory()
+        self.engine = session_factory.kw["bind"]
+        db = session_factory()
+        ops = Sector(name="Operações", slug="ops")
+        fin = Sector(name="Financeiro", slug="fin")
+        fretes = Automation(title="Fretes", target_url="https://a")
+        notas = Automation(title="Notas", target_url="https://b")
+        db.add_all([ops, fin, fretes, notas])
+        db.commit()
+        now = datetime.utcnow()
+        events = (
+            [ClickEvent(fretes.id, 1, ops.id, now)] * 3
+            + [ClickEvent(notas.id, 2, fin.id, now)]
+            + [ClickEvent(notas.id, 2, fin.id, now - timedelta(days=60))] * 5  # fora da janela de 30 dias
+        )
+        analytics.apply_rollups(db, events)
+        db.commit()
+        self.fretes_id, self.notas_id, self.ops_id = fretes.id, notas.id, ops.id
+        db.close()
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(dashboard_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        self.app = app
+        self._login("analyst")
+        self.client = TestClient(app)
+
+    def _login(self, role):
+        user = AuthenticatedUser(subject="u", id=1, email="u@logtudo.com.br", role=role, sector_id=1)
+        self.app.dependency_overrides[get_current_user] = lambda: user
+
+    def test_stats_and_charts_read_only_rollups(self):
+        with QueryCounter(self.engine) as counter:
+            stats = self.client.get("/api/v1/dashboard/stats").json()
+            top = self.client.get("/api/v1/dashboard/charts/top-automations").json()
+            sectors = self.client.get("/api/v1/dashboard/charts/sectors").json()
+            hours = self.client.get("/api/v1/dashboard/charts/peak-hours").json()
+            daily = self.client.get("/api/v1/dashboard/charts/daily?days=7").json()
+        self.assertFalse(any("automation_clicks" in statement for statement in counter.statements))
+
+        self.assertEqual(
+            stats,
+            {"total_automations": 2, "total_users": 0, "total_sectors": 2, "clicks_today": 4, "clicks_last_30_days": 4},
+        )
+        self.assertEqual(
+            [(item["automation_id"], item["title"], item["clicks"]) for item in top],
+            [(self.fretes_id, "Fretes", 3), (self.notas_id, "Notas", 1)],
+        )
+        self.assertEqual(sectors[0], {"sector_id": self.ops_id, "name": "Operações", "clicks": 3})
+        self.assertEqual((len(hours), sum(item["clicks"] for item in hours)), (24, 4))
+        self.assertEqual([item["clicks"] for item in daily], [0, 0, 0, 0, 0, 0, 4])
+
+    def test_regular_users_are_forbidden(self):
+        self._login("user")
+        self.assertEqual(self.client.get("/api/v1/dashboard/stats").status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import audit
+from app.auth import AuthenticatedUser, get_current_admin, require_session_user
+from app.database import get_db
+from app.models import AuditLogEntry
+from app.routers import audit as audit_router
+from app.routers import sectors as sectors_router
+from tests.db_utils import QueryCounter, create_test_session_factory
+
+
+class AuditLogTests(unittest.TestCase):
+    def setUp(self):
+        self.session_factory = create_test_session_factory()
+        self.engine = self.session_factory.kw["bind"]
+        self.admin = AuthenticatedUser(subject="admin", id=7, email="admin@logtudo.com.br", is_admin=True, role="admin")
+
+    def test_flush_writes_one_multi_row_insert(self):
+        log = audit.AuditLog(self.session_factory)
+        for sector_id in range(120):
+            log.emit(self.admin, "sector.update", "sector", sector_id, {"fields": ["name"]})
+        with QueryCounter(self.engine) as counter:
+            self.assertEqual(log.flush(), 120)
+        inserts = [statement for statement in counter.statements if statement.startswith("INSERT INTO audit_log")]
+        self.assertEqual(len(inserts), 1)
+
+        db = self.session_factory()
+        entry = db.query(AuditLogEntry).order_by(AuditLogEntry.id.desc()).first()
+        db.close()
+        self.assertEqual(
+            (entry.actor_id, entry.actor_email, entry.resource_id, entry.details),
+            (7, "admin@logtudo.com.br", "119", {"fields": ["name"]}),
+        )
+
+    def test_mutations_enqueue_without_writing_in_the_request(self):
+        log = audit.AuditLog(self.session_factory)
+
+        def _db():
+            session = self.session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(sectors_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        app.dependency_overrides[get_current_admin] = lambda: self.admin
+        client = TestClient(app)
+
+        with patch.object(sectors_router, "audit_log", log), QueryCounter(self.engine) as counter:
+            created = client.post("/api/v1/sectors", json={"name": "Operações", "slug": "ops"}).json()
+            client.put(f"/api/v1/sectors/{created['id']}", json={"name": "Operações SP"})
+            client.delete(f"/api/v1/sectors/{created['id']}")
+        self.assertFalse(any("audit_log" in statement for statement in counter.statements))
+
+        self.assertEqual(
+            [(record.action, record.resource_id, record.details) for record in log._items],
+            [
+                ("sector.create", str(created["id"]), {"name": "Operações"}),
+                ("sector.update", str(created["id"]), {"fields": ["name"]}),
+                ("sector.delete", str(created["id"]), {"name": "Operações SP"}),
+            ],
+        )
+
+    def test_partition_maintenance_is_postgres_only(self):
+        with QueryCounter(self.engine) as counter:
+            audit.ensure_audit_schema(self.engine)
+            audit.ensure_audit_partitions(self.engine)
+        self.assertEqual(counter.count, 0)
+        self.assertEqual(audit._add_months(datetime(2026, 11, 20).date(), 2).isoformat(), "2027-01-01")
+
+
+class AuditEndpointTests(unittest.TestCase):
+    def setUp(self):
+        session_factory = create_test_session_factory()
+        db = session_factory()
+        base = datetime(2026, 5, 1, 12, 0)
+        db.add_all([
+            AuditLogEntry(
+                created_at=base + timedelta(minutes=minute),
+                actor_id=1 if minute % 2 else 2,
+                action="automation.update",
+                resource_type="automation",
+                resource_id=str(minute),
+            )
+            for minute in range(5)
+        ])
+        db.commit()
+        db.close()
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(audit_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        self.app = app
+        self._login(is_admin=True)
+        self.client = TestClient(app)
+
+    def _login(self, is_admin):
+        user = AuthenticatedUser(subject="u", id=1, email="u@logtudo.com.br", is_admin=is_admin, role="admin")
+        self.app.dependency_overrides[require_session_user] = lambda: user
+
+    def test_keyset_pages_newest_first(self):
+        first = self.client.get("/api/v1/audit?limit=2").json()
+        second = self.client.get(f"/api/v1/audit?limit=2&cursor={first['next_cursor']}").json()
+        self.assertEqual([item["resource_id"] for item in first["items"]], ["4", "3"])
+        self.assertEqual([item["resource_id"] for item in second["items"]], ["2", "1"])
+
+    def test_filters(self):
+        items = self.client.get(
+            "/api/v1/audit",
+            params={"actor_id": 1, "since": "2026-05-01T12:02:00", "until": "2026-05-01T12:10:00"},
+        ).json()["items"]
+        self.assertEqual([item["resource_id"] for item in items], ["3"])
+
+    def test_requires_admin(self):
+        self._login(is_admin=False)
+        self.assertEqual(self.client.get("/api/v1/audit").status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
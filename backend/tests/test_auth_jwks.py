@@ -0,0 +1,157 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+
+from app import auth
+from app.auth import JWKSManager, _parse_max_age
+from app.config import KEYCLOAK_CLIENT_ID, KEYCLOAK_ISSUER
+
+JWKS_V1 = {"keys": [{"kid": "k1", "kty": "RSA"}]}
+JWKS_V2 = {"keys": [{"kid": "k2", "kty": "RSA"}]}
+
+
+class _FakeJWKSManager(JWKSManager):
+    def __init__(self, responses, **kwargs):
+        super().__init__("http://keycloak.test/certs", **kwargs)
+        self.responses = list(responses)
+        self.fetch_count = 0
+
+    async def _fetch(self):
+        self.fetch_count += 1
+        await asyncio.sleep(0.01)
+        result = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class JWKSManagerTests(unittest.TestCase):
+    def test_parse_max_age(self):
+        self.assertEqual(_parse_max_age("public, max-age=300"), 300)
+        self.assertEqual(_parse_max_age("no-cache"), 0)
+        self.assertIsNone(_parse_max_age(None))
+        self.assertIsNone(_parse_max_age("public"))
+
+    def test_concurrent_misses_share_one_fetch(self):
+        manager = _FakeJWKSManager([(JWKS_V1, "max-age=300")])
+
+        async def scenario():
+            return await asyncio.gather(*(manager.get() for _ in range(20)))
+
+        results = asyncio.run(scenario())
+        self.assertEqual(manager.fetch_count, 1)
+        self.assertTrue(all(result == JWKS_V1 for result in results))
+
+    def test_expired_keys_are_served_while_refreshing_in_background(self):
+        manager = _FakeJWKSManager([(JWKS_V1, None), (JWKS_V2, None)], default_ttl=0, min_ttl=0)
+
+        async def scenario():
+            first = await manager.get()
+            stale = await manager.get()
+            await manager._inflight
+            fresh = manager.last_known_good
+            return first, stale, fresh
+
+        first, stale, fresh = asyncio.run(scenario())
+        self.assertEqual(first, JWKS_V1)
+        self.assertEqual(stale, JWKS_V1)
+        self.assertEqual(fresh, JWKS_V2)
+        self.assertEqual(manager.fetch_count, 2)
+
+    def test_keycloak_outage_falls_back_to_last_known_good(self):
+        manager = _FakeJWKSManager([(JWKS_V1, None), RuntimeError("keycloak down")], min_ttl=0)
+
+        async def scenario():
+            await manager.get()
+            return await manager.get(force_refresh=True)
+
+        self.assertEqual(asyncio.run(scenario()), JWKS_V1)
+
+    def test_outage_without_cached_keys_returns_503(self):
+        manager = _FakeJWKSManager([RuntimeError("keycloak down")])
+
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(manager.get())
+        self.assertEqual(ctx.exception.status_code, 503)
+
+
+def _generate_signing_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+    public_jwk.update({"kid": kid, "use": "sig"})
+    return private_pem, public_jwk
+
+
+class ValidateKeycloakJWTTests(unittest.TestCase):
+    def setUp(self):
+        self.private_pem, public_jwk = _generate_signing_key("kid-1")
+        self.manager = _FakeJWKSManager([({"keys": [public_jwk]}, "max-age=300")])
+        self.patches = [
+            patch.object(auth, "_jwks_manager", self.manager),
+            patch.object(auth, "_signing_key_registry", auth.SigningKeyRegistry()),
+            patch.object(auth, "_verified_token_cache", auth.VerifiedTokenCache(maxsize=2)),
+        ]
+        for patcher in self.patches:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in reversed(self.patches):
+            patcher.stop()
+
+    def _token(self, **claims):
+        payload = {
+            "sub": "sub-1",
+            "iss": KEYCLOAK_ISSUER,
+            "aud": KEYCLOAK_CLIENT_ID,
+            "exp": int(time.time()) + 300,
+        }
+        payload.update(claims)
+        return jwt.encode(payload, self.private_pem, algorithm="RS256", headers={"kid": "kid-1"})
+
+    def test_verified_token_is_not_verified_twice(self):
+        token = self._token()
+        with patch("app.auth.jwt.decode", wraps=jwt.decode) as decode:
+            first = asyncio.run(auth.validate_keycloak_jwt(token))
+            second = asyncio.run(auth.validate_keycloak_jwt(token))
+        self.assertEqual(first["sub"], "sub-1")
+        self.assertEqual(first, second)
+        self.assertEqual(decode.call_count, 1)
+
+    def test_signing_key_is_constructed_once_per_kid(self):
+        tokens = [self._token(sub="a"), self._token(sub="b")]
+        with patch("app.auth.jwk.construct", wraps=jwk.construct) as construct:
+            for token in tokens:
+                asyncio.run(auth.validate_keycloak_jwt(token))
+        self.assertEqual(construct.call_count, 1)
+
+    def test_token_cache_is_bounded(self):
+        tokens = [self._token(sub=f"sub-{index}") for index in range(3)]
+        for token in tokens:
+            asyncio.run(auth.validate_keycloak_jwt(token))
+        self.assertEqual(len(auth._verified_token_cache), 2)
+        self.assertIsNone(auth._verified_token_cache.get(tokens[0]))
+
+    def test_expired_token_is_rejected(self):
+        token = self._token(exp=int(time.time()) - 10)
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(auth.validate_keycloak_jwt(token))
+        self.assertEqual(ctx.exception.status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
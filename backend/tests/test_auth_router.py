@@ -1,13 +1,18 @@
+import base64
+import json
+import time
 import unittest
 from unittest.mock import patch
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.testclient import TestClient
 from starlette.middleware.sessions import SessionMiddleware
 
+from app import auth
 from app.auth import AuthenticatedUser, KeycloakJWTMiddleware
 from app.database import get_db
 from app.routers import auth as auth_router
+from app.session_store import MemorySessionBackend, ServerSessionStore
 
 
 def _fake_db_dependency():
@@ -28,6 +33,12 @@ class AuthRouterTests(unittest.TestCase):
         app.dependency_overrides[get_db] = _fake_db_dependency
         self.client = TestClient(app)
         self.app = app
+        store_patch = patch.object(
+            auth, "user_session_store",
+            ServerSessionStore(MemorySessionBackend(), factory=AuthenticatedUser.model_validate),
+        )
+        store_patch.start()
+        self.addCleanup(store_patch.stop)
 
     def tearDown(self):
         self.app.dependency_overrides.clear()
@@ -80,6 +91,51 @@ class AuthRouterTests(unittest.TestCase):
         self.assertEqual(payload["email"], "user@example.com")
         self.assertEqual(payload["subject"], "sub-123")
 
+    def test_session_cookie_only_carries_session_id(self):
+        state = self._perform_login()
+        user = AuthenticatedUser(
+            subject="sub-123",
+            id=10,
+            email="user@example.com",
+            full_name="Example User",
+            token_claims={"sub": "sub-123", "realm_access": {"roles": ["user"] * 50}},
+        )
+
+        with patch("app.routers.auth.exchange_code_for_tokens", return_value={"access_token": "token"}):
+            with patch("app.routers.auth.validate_keycloak_jwt", return_value={"sub": "sub-123"}):
+                with patch("app.routers.auth.claims_to_authenticated_user", return_value=user):
+                    self.client.get(
+                        "/api/v1/auth/callback",
+                        params={"code": "auth-code", "state": state},
+                        follow_redirects=False,
+                    )
+
+        cookie = self.client.cookies.get("session")
+        session_data = json.loads(base64.b64decode(cookie.split(".")[0]))
+        self.assertEqual(set(session_data), {"sid"})
+        self.assertEqual(self.client.get("/api/v1/auth/me").json()["subject"], "sub-123")
+
+    def test_bearer_token_authenticates_machine_clients_and_is_cached(self):
+        bot = AuthenticatedUser(subject="service-account-bot", full_name="RPA Bot", roles=["user"])
+        claims = {"sub": "service-account-bot", "exp": time.time() + 300}
+
+        with patch("app.auth.validate_keycloak_jwt", return_value=claims) as validate:
+            with patch("app.auth._load_bearer_user", return_value=bot) as load_user:
+                headers = {"Authorization": "Bearer bot-token-1"}
+                first = self.client.get("/api/v1/auth/me", headers=headers)
+                second = self.client.get("/api/v1/auth/me", headers=headers)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.json()["subject"], "service-account-bot")
+        self.assertEqual(validate.call_count, 1)
+        self.assertEqual(load_user.call_count, 1)
+
+    def test_invalid_bearer_token_is_rejected(self):
+        error = HTTPException(status_code=401, detail="Invalid token")
+        with patch("app.auth.validate_keycloak_jwt", side_effect=error):
+            response = self.client.get("/api/v1/auth/me", headers={"Authorization": "Bearer broken"})
+        self.assertEqual(response.status_code, 401)
+
     def test_callback_with_invalid_state_redirects_to_login_error(self):
         response = self.client.get(
             "/api/v1/auth/callback",
@@ -156,5 +212,31 @@ class AuthRouterTests(unittest.TestCase):
         self.assertEqual(me_response.status_code, 200)
 
 
+class KeycloakJWTMiddlewareTests(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(
+            KeycloakJWTMiddleware,
+            bypass_prefixes=("/health",),
+            session_options={"secret_key": "test-secret"},
+        )
+
+        @app.get("/health")
+        async def health(request: Request):
+            return {"has_session": "session" in request.scope}
+
+        @app.get("/private")
+        async def private(request: Request):
+            return {"has_session": "session" in request.scope}
+
+        self.client = TestClient(app)
+
+    def test_bypass_prefix_skips_session_parsing(self):
+        self.assertEqual(self.client.get("/health").json(), {"has_session": False})
+
+    def test_other_paths_get_a_session(self):
+        self.assertEqual(self.client.get("/private").json(), {"has_session": True})
+
+
 if __name__ == "__main__":
     unittest.main()
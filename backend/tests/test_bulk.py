@@ -0,0 +1,142 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.access_index import AutomationAccessIndex
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.catalog_cache import catalog_cache
+from app.database import get_db
+from app.models import Automation, Sector, User
+from app.routers import automations as automations_router
+from app.search import AutomationSearchIndex
+from app.suggest import SuggestIndex
+from tests.db_utils import QueryCounter, create_test_session_factory
+
+# Statements de um lote, independente do número de itens (inclui a versão do catálogo e os tombstones)
+MAX_BULK_QUERIES = 17
+
+
+class BulkAutomationsTests(unittest.TestCase):
+    def setUp(self):
+        catalog_cache.invalidate()
+        self.session_factory = create_test_session_factory()
+        self.engine = self.session_factory.kw["bind"]
+        db = self.session_factory()
+        ops = Sector(name="Operações", slug="ops")
+        fin = Sector(name="Financeiro", slug="fin")
+        kept = Automation(title="Fretes", target_url="https://a", sectors=[ops])
+        gone = Automation(title="Antiga", target_url="https://b", sectors=[ops])
+        user = User(email="ana@logtudo.com.br", password_hash="x", full_name="Ana", sector=fin, extra_automations=[gone])
+        db.add_all([ops, fin, kept, gone, user])
+        db.commit()
+        self.ops_id, self.fin_id, self.kept_id, self.gone_id = ops.id, fin.id, kept.id, gone.id
+        self.user_id = user.id
+        db.close()
+
+        self.access_index = AutomationAccessIndex(self.session_factory)
+        self.access_index.rebuild()
+        self.patches = [
+            patch.object(automations_router, "automation_access_index", self.access_index),
+            patch.object(automations_router, "automation_search_index", AutomationSearchIndex(self.session_factory)),
+            patch.object(automations_router, "automation_suggest_index", SuggestIndex(self.session_factory)),
+        ]
+        for index_patch in self.patches:
+            index_patch.start()
+
+        def _db():
+            session = self.session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(automations_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        admin = AuthenticatedUser(subject="admin", id=self.user_id, email="ana@logtudo.com.br", is_admin=True, role="admin")
+        app.dependency_overrides[get_current_admin] = lambda: admin
+        app.dependency_overrides[get_current_user] = lambda: admin
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        for index_patch in self.patches:
+            index_patch.stop()
+
+    def _bulk(self, payload):
+        return self.client.post("/api/v1/automations/bulk", json=payload)
+
+    def test_mixed_batch(self):
+        response = self._bulk({
+            "upserts": [
+                {"title": "Notas", "target_url": "https://n", "sector_ids": [self.fin_id]},
+                {"id": self.kept_id, "title": "Fretes v2", "target_url": "https://a2", "sector_ids": [self.fin_id]},
+                {"title": "Sem setor", "target_url": "https://s"},
+            ],
+            "deletes": [self.gone_id],
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        results = response.json()["results"]
+        self.assertEqual([result["action"] for result in results], ["created", "updated", "created", "deleted"])
+        self.assertEqual(results[1]["id"], self.kept_id)
+
+        db = self.session_factory()
+        kept = db.get(Automation, self.kept_id)
+        self.assertEqual((kept.title, kept.target_url), ("Fretes v2", "https://a2"))
+        self.assertEqual([sector.id for sector in kept.sectors], [self.fin_id])
+        created = db.get(Automation, results[0]["id"])
+        self.assertEqual((created.title, [sector.id for sector in created.sectors]), ("Notas", [self.fin_id]))
+        self.assertIsNone(db.get(Automation, self.gone_id))
+        self.assertEqual(db.get(User, self.user_id).extra_automations, [])
+        db.close()
+
+        # índices em memória acompanham o lote
+        self.assertEqual(
+            self.access_index.visible_ids(self.user_id, self.fin_id), {self.kept_id, results[0]["id"]}
+        )
+
+    def test_omitted_sector_ids_keep_current_sectors(self):
+        response = self._bulk({"upserts": [{"id": self.kept_id, "title": "Fretes", "target_url": "https://a"}]})
+        self.assertEqual(response.status_code, 200, response.text)
+        db = self.session_factory()
+        self.assertEqual([sector.id for sector in db.get(Automation, self.kept_id).sectors], [self.ops_id])
+        db.close()
+
+    def test_invalid_item_rejects_whole_batch(self):
+        response = self._bulk({
+            "upserts": [
+                {"title": "Nova", "target_url": "https://n"},
+                {"id": 999, "title": "X", "target_url": "https://x"},
+                {"title": "Y", "target_url": "https://y", "sector_ids": [999]},
+            ],
+            "deletes": [self.kept_id, self.kept_id],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [error["loc"] for error in response.json()["detail"]],
+            [["body", "upserts", 1, "id"], ["body", "upserts", 2, "sector_ids"], ["body", "deletes", 1]],
+        )
+        db = self.session_factory()
+        self.assertEqual(db.query(Automation).count(), 2)
+        db.close()
+
+    def test_statement_count_does_not_grow_with_batch(self):
+        upserts = [
+            {"title": f"Importada {i}", "target_url": f"https://i/{i}", "sector_ids": [self.ops_id, self.fin_id]}
+            for i in range(500)
+        ]
+        upserts.append({"id": self.kept_id, "title": "Fretes", "target_url": "https://a", "sector_ids": []})
+        with QueryCounter(self.engine) as counter:
+            response = self._bulk({"upserts": upserts, "deletes": [self.gone_id]})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertLessEqual(counter.count, MAX_BULK_QUERIES, counter.statements)
+
+        db = self.session_factory()
+        self.assertEqual(db.query(Automation).count(), 501)
+        self.assertEqual(db.get(Automation, self.kept_id).sectors, [])
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.catalog_cache import CatalogCache, catalog_cache
+from app.database import get_db
+from app.models import Sector
+from app.routers import sectors as sectors_router
+from tests.db_utils import QueryCounter, create_test_session_factory
+
+
+class CatalogCacheTests(unittest.TestCase):
+    def test_put_is_skipped_when_a_write_happened_meanwhile(self):
+        cache = CatalogCache(maxsize=2, ttl=60)
+        version = cache.version
+        cache.invalidate()
+        entry = cache.put("k", b"[]", version)
+        self.assertTrue(entry.etag.startswith('"'))
+        self.assertIsNone(cache.get("k"))
+
+    def test_lru_bound(self):
+        cache = CatalogCache(maxsize=2, ttl=60)
+        for key in ("a", "b", "c"):
+            cache.put(key, key.encode(), cache.version)
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+
+class SectorsConditionalGetTests(unittest.TestCase):
+    def setUp(self):
+        catalog_cache.invalidate()
+        session_factory = create_test_session_factory()
+        self.engine = session_factory.kw["bind"]
+        db = session_factory()
+        db.add(Sector(name="Operações", slug="ops"))
+        db.commit()
+        db.close()
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        admin = AuthenticatedUser(subject="admin", id=1, email="admin@logtudo.com.br", is_admin=True, role="admin")
+        app = FastAPI()
+        app.include_router(sectors_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        app.dependency_overrides[get_current_user] = lambda: admin
+        app.dependency_overrides[get_current_admin] = lambda: admin
+        self.client = TestClient(app)
+
+    def test_etag_304_and_invalidation_on_write(self):
+        first = self.client.get("/api/v1/sectors")
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers["etag"]
+
+        with QueryCounter(self.engine) as counter:
+            not_modified = self.client.get("/api/v1/sectors", headers={"If-None-Match": etag})
+            cached = self.client.get("/api/v1/sectors")
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(cached.json(), first.json())
+        self.assertEqual(counter.count, 0)
+
+        self.client.post("/api/v1/sectors", json={"name": "Financeiro", "slug": "fin"})
+        changed = self.client.get("/api/v1/sectors", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["etag"], etag)
+        self.assertEqual([sector["slug"] for sector in changed.json()], ["ops", "fin"])
+        # mesmo formato do response_model (validator troca description None por "")
+        self.assertEqual(changed.json()[0]["description"], "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.access_index import AutomationAccessIndex
+from app.audit import AuditLog
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.catalog_version import current_state, purge_tombstones, record_access_change
+from app.database import get_db
+from app.events import EventBroadcaster
+from app.models import Automation, CatalogTombstone, Sector
+from app.routers import automations as automations_router
+from app.search import AutomationSearchIndex
+from app.suggest import SuggestIndex
+from tests.db_utils import create_test_session_factory
+
+
+def _user(user_id, sector_id, role="user"):
+    return AuthenticatedUser(
+        subject=str(user_id), id=user_id, email=f"u{user_id}@logtudo.com.br",
+        role=role, is_admin=role == "admin", sector_id=sector_id,
+    )
+
+
+class CatalogChangesTests(unittest.TestCase):
+    def setUp(self):
+        self.session_factory = create_test_session_factory()
+        db = self.session_factory()
+        ops = Sector(name="Operações", slug="ops")
+        fin = Sector(name="Financeiro", slug="fin")
+        fretes = Automation(title="Fretes", target_url="https://a", sectors=[ops])
+        notas = Automation(title="Notas", target_url="https://b", sectors=[ops, fin])
+        db.add_all([ops, fin, fretes, notas])
+        db.commit()
+        self.ops_id, self.fin_id = ops.id, fin.id
+        self.fretes_id, self.notas_id = fretes.id, notas.id
+        db.close()
+
+        def _db():
+            session = self.session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        access_index = AutomationAccessIndex(self.session_factory)
+        access_index.rebuild()
+        search_index = AutomationSearchIndex(self.session_factory)
+        search_index.rebuild()
+        self.patches = [
+            patch.object(automations_router, "automation_access_index", access_index),
+            patch.object(automations_router, "automation_search_index", search_index),
+            patch.object(automations_router, "automation_suggest_index", SuggestIndex(self.session_factory)),
+            patch.object(automations_router, "audit_log", AuditLog(self.session_factory)),
+            patch.object(automations_router, "event_broadcaster", EventBroadcaster()),
+        ]
+        for module_patch in self.patches:
+            module_patch.start()
+
+        app = FastAPI()
+        app.include_router(automations_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        self.admin = _user(99, self.fin_id, role="admin")
+        self.current_user = self.admin
+        app.dependency_overrides[get_current_admin] = lambda: self.admin
+        app.dependency_overrides[get_current_user] = lambda: self.current_user
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        for module_patch in self.patches:
+            module_patch.stop()
+
+    def _changes(self, since=None):
+        params = {"since": since} if since is not None else {}
+        response = self.client.get("/api/v1/automations/changes", params=params)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_initial_sync_then_only_changed_rows(self):
+        initial = self._changes()
+        self.assertTrue(initial["reset"])
+        self.assertEqual([item["id"] for item in initial["items"]], [self.fretes_id, self.notas_id])
+
+        self.client.put(f"/api/v1/automations/{self.notas_id}", json={"title": "Notas fiscais"})
+        delta = self._changes(initial["version"])
+        self.assertFalse(delta["reset"])
+        self.assertEqual([item["title"] for item in delta["items"]], ["Notas fiscais"])
+        self.assertGreater(delta["version"], initial["version"])
+
+        self.assertEqual(self._changes(delta["version"])["items"], [])
+
+    def test_deleted_automation_is_a_tombstone(self):
+        version = self._changes()["version"]
+        self.client.delete(f"/api/v1/automations/{self.fretes_id}")
+        delta = self._changes(version)
+        self.assertEqual((delta["items"], delta["deleted"]), ([], [self.fretes_id]))
+
+    def test_revoked_sector_lists_automation_as_deleted(self):
+        self.current_user = _user(1, self.fin_id)
+        version = self._changes()["version"]
+        self.client.put(f"/api/v1/automations/{self.notas_id}", json={"sector_ids": [self.ops_id]})
+        delta = self._changes(version)
+        self.assertEqual((delta["items"], delta["deleted"]), ([], [self.notas_id]))
+
+    def test_access_change_forces_full_sync(self):
+        self.current_user = _user(1, self.ops_id)
+        version = self._changes()["version"]
+        db = self.session_factory()
+        record_access_change(db, 1)
+        db.commit()
+        db.close()
+        self.assertTrue(self._changes(version)["reset"])
+        # Outros usuários continuam no delta
+        self.current_user = _user(2, self.ops_id)
+        self.assertFalse(self._changes(version)["reset"])
+
+    def test_bulk_batch_shares_one_version(self):
+        response = self.client.post(
+            "/api/v1/automations/bulk",
+            json={"upserts": [
+                {"title": "Coletas", "target_url": "https://c"},
+                {"id": self.fretes_id, "title": "Fretes 2", "target_url": "https://a"},
+            ]},
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        db = self.session_factory()
+        versions = {automation.title: automation.version for automation in db.query(Automation)}
+        db.close()
+        self.assertEqual(versions["Coletas"], versions["Fretes 2"])
+        self.assertGreater(versions["Fretes 2"], versions["Notas"])
+
+    def test_purged_tombstones_force_full_sync(self):
+        version = self._changes()["version"]
+        self.client.delete(f"/api/v1/automations/{self.fretes_id}")
+        db = self.session_factory()
+        db.execute(update(CatalogTombstone).values(created_at=datetime.utcnow() - timedelta(days=60)))
+        db.commit()
+        db.close()
+
+        self.assertEqual(purge_tombstones(self.session_factory, retention_days=30), 1)
+        db = self.session_factory()
+        latest, purged_through = current_state(db)
+        db.close()
+        self.assertEqual(purged_through, latest)
+        stale = self._changes(version)
+        self.assertTrue(stale["reset"])
+        self.assertEqual([item["id"] for item in stale["items"]], [self.notas_id])
+        self.assertFalse(self._changes(latest)["reset"])
+
+
+if __name__ == "__main__":
+    unittest.main()
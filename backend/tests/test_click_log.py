@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.click_log import ClickBuffer
+from app.database import get_db
+from app.main import shutdown_step
+from app.models import Automation, AutomationClick, Sector, User
+from app.routers import automations as automations_router
+from tests.db_utils import QueryCounter, create_test_session_factory
+
+
+class ClickBufferTests(unittest.TestCase):
+    def setUp(self):
+        self.session_factory = create_test_session_factory()
+        self.engine = self.session_factory.kw["bind"]
+
+    def _count(self):
+        db = self.session_factory()
+        try:
+            return db.query(AutomationClick).count()
+        finally:
+            db.close()
+
+    def test_flush_writes_one_multi_row_insert(self):
+        buffer = ClickBuffer(self.session_factory)
+        for automation_id in range(250):
+            buffer.record(automation_id, 1, 1)
+        with QueryCounter(self.engine) as counter:
+            self.assertEqual(buffer.flush(), 250)
+        inserts = [
+            statement for statement in counter.statements if statement.startswith("INSERT INTO automation_clicks")
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual((self._count(), len(buffer)), (250, 0))
+
+    def test_failed_flush_keeps_events(self):
+        buffer = ClickBuffer(self.session_factory, max_events=3)
+        for automation_id in range(3):
+            buffer.record(automation_id, None, None)
+        with patch.object(buffer, "session_factory", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+        buffer.record(99, None, None)  # buffer cheio: descarta o mais antigo
+        self.assertEqual((len(buffer), buffer.dropped), (3, 1))
+        buffer.flush()
+        self.assertEqual(self._count(), 3)
+
+    def test_size_threshold_wakes_flusher_and_stop_drains(self):
+        buffer = ClickBuffer(self.session_factory, batch_size=10, interval=60)
+
+        async def scenario():
+            await buffer.start()
+            # cliques chegam das threads do threadpool (endpoint síncrono)
+            producer = threading.Thread(target=lambda: [buffer.record(1, 1, 1) for _ in range(10)])
+            producer.start()
+            producer.join()
+            for _ in range(100):
+                if self._count() == 10:
+                    break
+                await asyncio.sleep(0.01)
+            flushed_by_size = self._count()
+            buffer.record(2, 1, 1)  # abaixo do lote e do intervalo: só o stop grava
+            await buffer.stop()
+            return flushed_by_size
+
+        self.assertEqual(asyncio.run(scenario()), 10)
+        self.assertEqual(self._count(), 11)
+
+    def test_failed_final_flush_does_not_block_shutdown(self):
+        buffer = ClickBuffer(self.session_factory)
+        closed = []
+
+        async def failing_step():
+            raise RuntimeError("oidc down")
+
+        async def closing_step():
+            closed.append(True)
+
+        async def scenario():
+            await buffer.start()
+            buffer.record(1, 1, 1)
+            with patch.object(buffer, "session_factory", side_effect=RuntimeError("db down")):
+                await shutdown_step("click_buffer", buffer.stop)
+            await shutdown_step("oidc_client", failing_step)
+            await shutdown_step("password_pool", closing_step)
+
+        asyncio.run(scenario())
+        self.assertEqual((len(buffer), closed), (1, [True]))
+
+
+class LaunchEndpointTests(unittest.TestCase):
+    def setUp(self):
+        session_factory = self.session_factory = create_test_session_factory()
+        self.engine = session_factory.kw["bind"]
+        db = session_factory()
+        ops = Sector(name="Operações", slug="ops")
+        fin = Sector(name="Financeiro", slug="fin")
+        user = User(email="ana@logtudo.com.br", password_hash="x", full_name="Ana", sector=ops)
+        allowed = Automation(title="Fretes", target_url="https://fretes.local/app", sectors=[ops])
+        denied = Automation(title="Folha", target_url="https://folha.local/", sectors=[fin])
+        db.add_all([ops, fin, user, allowed, denied])
+        db.commit()
+        self.user = AuthenticatedUser(subject="ana", id=user.id, email=user.email, role="user", sector_id=ops.id)
+        self.allowed_id, self.denied_id = allowed.id, denied.id
+        db.close()
+
+        self.buffer = ClickBuffer(session_factory)
+        self.buffer_patch = patch.object(automations_router, "click_buffer", self.buffer)
+        self.buffer_patch.start()
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(automations_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        app.dependency_overrides[get_current_admin] = lambda: self.user
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.buffer_patch.stop()
+
+    def test_redirect_records_click_without_insert(self):
+        with QueryCounter(self.engine) as counter:
+            response = self.client.get(f"/api/v1/automations/{self.allowed_id}/launch", follow_redirects=False)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.headers["location"], "https://fretes.local/app")
+        self.assertFalse(any(statement.startswith("INSERT") for statement in counter.statements))
+
+        self.assertEqual(len(self.buffer), 1)
+        self.buffer.flush()
+        db = self.session_factory()
+        click = db.query(AutomationClick).one()
+        self.assertEqual((click.automation_id, click.user_id), (self.allowed_id, self.user.id))
+        db.close()
+
+    def test_access_rules(self):
+        response = self.client.get(f"/api/v1/automations/{self.denied_id}/launch", follow_redirects=False)
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get("/api/v1/automations/999/launch", follow_redirects=False)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(self.buffer), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
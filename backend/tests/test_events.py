@@ -0,0 +1,276 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.access_index import AutomationAccessIndex
+from app.audit import AuditLog
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.database import get_db
+from app.events import RESYNC, EventBroadcaster
+from app.models import Automation, Sector
+from app.routers import automations as automations_router
+from app.routers import events as events_router
+from app.search import AutomationSearchIndex
+from app.suggest import SuggestIndex
+from tests.db_utils import create_test_session_factory
+
+
+def _user(user_id, sector_id, role="user"):
+    return AuthenticatedUser(
+        subject=str(user_id), id=user_id, email=f"u{user_id}@logtudo.com.br",
+        role=role, is_admin=role == "admin", sector_id=sector_id,
+    )
+
+
+def _drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+class EventBroadcasterTests(unittest.TestCase):
+    def test_events_are_filtered_by_access_scope(self):
+        broadcaster = EventBroadcaster()
+
+        async def scenario():
+            ops, fin, admin = (
+                broadcaster.subscribe(_user(1, 10)),
+                broadcaster.subscribe(_user(2, 20)),
+                broadcaster.subscribe(_user(3, 20, role="admin")),
+            )
+            # Os routers publicam das threads do threadpool
+            await asyncio.to_thread(broadcaster.publish, "automation.updated", {"automation_id": 5}, [10], [])
+            await asyncio.to_thread(broadcaster.publish, "permissions.changed", {"user_id": 2}, None, [2])
+            await asyncio.to_thread(broadcaster.publish, "announcement", {"message": "oi"})
+            await asyncio.sleep(0)
+            return [[event.type for event in _drain(subscription)] for subscription in (ops, fin, admin)]
+
+        ops, fin, admin = asyncio.run(scenario())
+        self.assertEqual(ops, ["automation.updated", "announcement"])
+        self.assertEqual(fin, ["permissions.changed", "announcement"])
+        self.assertEqual(admin, ["automation.updated", "permissions.changed", "announcement"])
+
+    def test_slow_subscriber_gets_a_single_resync(self):
+        broadcaster = EventBroadcaster(queue_size=3)
+
+        async def scenario():
+            subscription = broadcaster.subscribe(_user(1, 10))
+            for automation_id in range(5):
+                broadcaster.publish("automation.created", {"automation_id": automation_id})
+            await asyncio.sleep(0)  # entrega sem o cliente consumir nada
+            return subscription, _drain(subscription)
+
+        subscription, events = asyncio.run(scenario())
+        # Os 3 primeiros são trocados por um resync; o 5º entra depois dele
+        self.assertEqual([(event.id, event.type) for event in events], [(4, RESYNC), (5, "automation.created")])
+        self.assertEqual(subscription.resyncs, 1)
+
+    def test_concurrent_publishers_deliver_every_event_in_order(self):
+        broadcaster = EventBroadcaster()
+
+        class SlowFirstSchedule:
+            """Atrasa o agendamento do 1º evento: o 2º publisher tenta passar na frente"""
+
+            def __init__(self, loop):
+                self.loop, self.calls = loop, 0
+
+            def call_soon_threadsafe(self, callback, event):
+                self.calls += 1
+                if self.calls == 1:
+                    second.start()
+                    second.join(timeout=0.05)
+                self.loop.call_soon_threadsafe(callback, event)
+
+        second = threading.Thread(target=broadcaster.publish, args=("automation.updated", {"automation_id": 2}))
+
+        async def scenario():
+            subscription = broadcaster.subscribe(_user(1, 10))
+            broadcaster._loop = SlowFirstSchedule(asyncio.get_running_loop())
+            first = threading.Thread(target=broadcaster.publish, args=("automation.updated", {"automation_id": 1}))
+            first.start()
+            while first.is_alive() or second.is_alive():
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0)
+            return _drain(subscription)
+
+        events = asyncio.run(scenario())
+        self.assertEqual([(event.id, event.data["automation_id"]) for event in events], [(1, 1), (2, 2)])
+
+    def test_event_published_while_subscribing_is_delivered(self):
+        broadcaster = EventBroadcaster()
+
+        class PublishOnAdd(set):
+            """Outro thread publica bem no momento em que a assinatura é registrada"""
+
+            def add(self, subscription):
+                publisher.start()
+                publisher.join(timeout=0.05)
+                super().add(subscription)
+
+        publisher = threading.Thread(target=broadcaster.publish, args=("announcement", {"message": "oi"}))
+        broadcaster._subscribers = PublishOnAdd()
+
+        async def scenario():
+            subscription = broadcaster.subscribe(_user(1, 10), last_event_id=0)
+            while publisher.is_alive():
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0)
+            return _drain(subscription)
+
+        events = asyncio.run(scenario())
+        self.assertEqual([(event.id, event.type) for event in events], [(1, "announcement")])
+
+    def test_reconnect_replays_from_last_event_id(self):
+        broadcaster = EventBroadcaster(history_size=3)
+        for automation_id in range(5):
+            broadcaster.publish("automation.created", {"automation_id": automation_id})
+
+        async def scenario():
+            replayed = broadcaster.subscribe(_user(1, 10, role="manager"), last_event_id=3)
+            too_old = broadcaster.subscribe(_user(1, 10, role="manager"), last_event_id=1)
+            return _drain(replayed), _drain(too_old)
+
+        replayed, too_old = asyncio.run(scenario())
+        self.assertEqual([event.id for event in replayed], [4, 5])
+        self.assertEqual([(event.id, event.type) for event in too_old], [(5, RESYNC)])
+
+    def test_stream_sends_heartbeats_and_unsubscribes_on_close(self):
+        broadcaster = EventBroadcaster()
+
+        async def scenario():
+            with patch.object(events_router, "event_broadcaster", broadcaster):
+                stream = events_router.stream_events(_user(1, 10), heartbeat=0.01)
+                chunks = [await stream.__anext__(), await stream.__anext__()]
+                broadcaster.publish("announcement", {"message": "manutenção às 18h"})
+                await asyncio.sleep(0)
+                chunks.append(await stream.__anext__())
+                await stream.aclose()
+            return chunks, broadcaster.stats()["subscribers"]
+
+        chunks, subscribers = asyncio.run(scenario())
+        self.assertEqual(chunks[:2], [": connected\n\n", ": ping\n\n"])
+        self.assertEqual(
+            chunks[2], 'id: 1\nevent: announcement\ndata: {"message":"manutenção às 18h"}\n\n'
+        )
+        self.assertEqual(subscribers, 0)
+
+    def test_subscription_starts_with_the_stream(self):
+        broadcaster = EventBroadcaster(max_subscribers=1)
+
+        async def scenario():
+            with patch.object(events_router, "event_broadcaster", broadcaster):
+                # Cliente que cai antes do primeiro chunk: o gerador nunca roda e nada fica registrado
+                response = await events_router.get_events(None, None, _user(1, 10))
+                before_stream = broadcaster.stats()["subscribers"]
+                stream = response.body_iterator
+                await stream.__anext__()
+                with self.assertRaises(HTTPException) as full:
+                    await events_router.get_events(None, None, _user(2, 10))
+                await stream.aclose()
+            return before_stream, full.exception.status_code, broadcaster.stats()["subscribers"]
+
+        self.assertEqual(asyncio.run(scenario()), (0, 503, 0))
+
+    def test_own_permission_change_ends_the_stream(self):
+        broadcaster = EventBroadcaster()
+
+        async def scenario():
+            with patch.object(events_router, "event_broadcaster", broadcaster):
+                stream = events_router.stream_events(_user(1, 10), heartbeat=60)
+                await stream.__anext__()
+                broadcaster.publish("permissions.changed", {"user_id": 2}, user_ids=[2])
+                broadcaster.publish("permissions.changed", {"user_id": 1}, user_ids=[1])
+                await asyncio.sleep(0)
+                chunks = [chunk async for chunk in stream]
+            return chunks, broadcaster.stats()["subscribers"]
+
+        chunks, subscribers = asyncio.run(scenario())
+        # Só o evento do próprio usuário chega; o stream termina para reconectar com o setor novo
+        self.assertEqual(chunks, ['id: 2\nevent: permissions.changed\ndata: {"user_id":1}\n\n'])
+        self.assertEqual(subscribers, 0)
+
+
+class RouterEventTests(unittest.TestCase):
+    def setUp(self):
+        session_factory = create_test_session_factory()
+        db = session_factory()
+        ops = Sector(name="Operações", slug="ops")
+        fin = Sector(name="Financeiro", slug="fin")
+        fretes = Automation(title="Fretes", target_url="https://a", sectors=[ops])
+        db.add_all([ops, fin, fretes])
+        db.commit()
+        self.ops_id, self.fin_id, self.automation_id = ops.id, fin.id, fretes.id
+        db.close()
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        access_index = AutomationAccessIndex(session_factory)
+        access_index.rebuild()
+        self.broadcaster = EventBroadcaster()
+        self.patches = [
+            patch.object(automations_router, "automation_access_index", access_index),
+            patch.object(automations_router, "automation_search_index", AutomationSearchIndex(session_factory)),
+            patch.object(automations_router, "automation_suggest_index", SuggestIndex(session_factory)),
+            patch.object(automations_router, "audit_log", AuditLog(session_factory)),
+            patch.object(automations_router, "event_broadcaster", self.broadcaster),
+            patch.object(events_router, "event_broadcaster", self.broadcaster),
+            patch.object(events_router, "audit_log", AuditLog(session_factory)),
+        ]
+        for module_patch in self.patches:
+            module_patch.start()
+
+        app = FastAPI()
+        app.include_router(automations_router.router, prefix="/api/v1")
+        app.include_router(events_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        admin = _user(99, self.fin_id, role="admin")
+        app.dependency_overrides[get_current_admin] = lambda: admin
+        app.dependency_overrides[get_current_user] = lambda: admin
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        for module_patch in self.patches:
+            module_patch.stop()
+
+    def test_revoked_sector_is_notified_of_the_change(self):
+        async def scenario():
+            ops = self.broadcaster.subscribe(_user(1, self.ops_id))
+            fin = self.broadcaster.subscribe(_user(2, self.fin_id))
+            # Fretes sai de Operações e vai para Financeiro: os dois setores precisam saber
+            await asyncio.to_thread(
+                self.client.put, f"/api/v1/automations/{self.automation_id}", json={"sector_ids": [self.fin_id]}
+            )
+            await asyncio.to_thread(self.client.post, "/api/v1/events/announcements", json={"message": "oi"})
+            await asyncio.sleep(0)
+            return _drain(ops), _drain(fin)
+
+        ops, fin = asyncio.run(scenario())
+        self.assertEqual([event.type for event in ops], ["automation.updated", "announcement"])
+        self.assertEqual([event.type for event in fin], ["automation.updated", "announcement"])
+        self.assertEqual(ops[0].data, {"automation_id": self.automation_id})
+
+    def test_sector_announcement_skips_other_sectors(self):
+        async def scenario():
+            ops = self.broadcaster.subscribe(_user(1, self.ops_id))
+            response = await asyncio.to_thread(
+                self.client.post, "/api/v1/events/announcements", json={"message": "oi", "sector_ids": [self.fin_id]}
+            )
+            await asyncio.sleep(0)
+            return response.status_code, _drain(ops)
+
+        status_code, events = asyncio.run(scenario())
+        self.assertEqual((status_code, events), (202, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from urllib.parse import urlparse
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app import auth
+from app.auth import AuthenticatedUser, KeycloakJWTMiddleware, refresh_access_token, validate_keycloak_jwt
+from app.database import get_db
+from app.routers import auth as auth_router
+from app.session_store import SQLSessionBackend, ServerSessionStore
+from app.testing.fake_keycloak import FakeKeycloak
+from tests.db_utils import create_test_session_factory
+
+
+class FakeKeycloakTests(unittest.TestCase):
+    def setUp(self):
+        self.keycloak = FakeKeycloak()
+        self.keycloak.add_user("ana@logtudo.com.br", name="Ana", roles=["user"])
+        session_factory = create_test_session_factory()
+
+        def _db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = FastAPI()
+        app.add_middleware(KeycloakJWTMiddleware, session_options={"secret_key": "test-secret"})
+        app.include_router(auth_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        self.client = TestClient(app)
+        # Mesmo store padrão da aplicação (SQL), no banco de teste
+        store_patch = patch.object(
+            auth, "user_session_store",
+            ServerSessionStore(SQLSessionBackend(session_factory), factory=AuthenticatedUser.model_validate),
+        )
+        store_patch.start()
+        self.addCleanup(store_patch.stop)
+
+    def test_full_login_flow_against_fake(self):
+        with self.keycloak.install():
+            login_response = self.client.get("/api/v1/auth/login", follow_redirects=False)
+            self.assertEqual(login_response.status_code, 307)
+
+            callback_url = urlparse(self.keycloak.complete_login(login_response.headers["location"], "ana@logtudo.com.br"))
+            callback_response = self.client.get(f"{callback_url.path}?{callback_url.query}", follow_redirects=False)
+            self.assertEqual(callback_response.status_code, 303)
+            self.assertNotIn("auth_error", callback_response.headers["location"])
+
+            me_response = self.client.get("/api/v1/auth/me")
+        self.assertEqual(me_response.status_code, 200)
+        self.assertEqual(me_response.json()["email"], "ana@logtudo.com.br")
+        self.assertEqual(self.keycloak.request_counts, {"token": 1, "certs": 1})
+
+    def test_wrong_pkce_verifier_fails_token_exchange(self):
+        with self.keycloak.install():
+            login_response = self.client.get("/api/v1/auth/login", follow_redirects=False)
+            callback_url = urlparse(self.keycloak.complete_login(login_response.headers["location"], "ana@logtudo.com.br"))
+            self.client.cookies.clear()  # perde o verifier da sessão; o do state continua válido
+            code = self.keycloak._codes[next(iter(self.keycloak._codes))]
+            code.code_challenge = "outro-challenge"
+            response = self.client.get(f"{callback_url.path}?{callback_url.query}", follow_redirects=False)
+        self.assertIn("auth_error=token_exchange_failed", response.headers["location"])
+
+    def test_rotated_key_is_picked_up_on_unknown_kid(self):
+        with self.keycloak.install():
+            first = asyncio.run(validate_keycloak_jwt(self.keycloak.issue_access_token("ana@logtudo.com.br")))
+            self.keycloak.rotate_keys(keep_previous=False)
+            second = asyncio.run(validate_keycloak_jwt(self.keycloak.issue_access_token("ana@logtudo.com.br")))
+        self.assertEqual(first["email"], second["email"])
+        self.assertEqual(self.keycloak.request_counts["certs"], 2)
+
+    def test_refresh_rotates_refresh_token(self):
+        tokens = self.keycloak._token_response("ana@logtudo.com.br", self.keycloak.client_id)
+        with self.keycloak.install():
+            refreshed = asyncio.run(refresh_access_token(tokens["refresh_token"]))
+            self.assertNotEqual(refreshed["refresh_token"], tokens["refresh_token"])
+            with self.assertRaises(HTTPException):
+                asyncio.run(refresh_access_token(tokens["refresh_token"]))
+
+    def test_injected_failures(self):
+        self.keycloak.fail_next(1)
+        with self.keycloak.install():
+            claims = asyncio.run(validate_keycloak_jwt(self.keycloak.issue_access_token("ana@logtudo.com.br")))
+        self.assertEqual(claims["email"], "ana@logtudo.com.br")
+        # a primeira busca de JWKS falhou (503) e o cliente OIDC repetiu o GET
+        self.assertEqual(self.keycloak.request_counts["certs"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
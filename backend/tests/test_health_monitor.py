@@ -0,0 +1,151 @@
+import asyncio
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import httpx
+
+from app.catalog_cache import catalog_cache
+from app.health_monitor import HealthMonitor, ProbeResult
+from app.models import Automation
+from app.routers import automations as automations_router
+from app.schemas import AutomationResponse
+from tests.db_utils import create_test_session_factory
+
+
+class _ScriptedTransport(httpx.AsyncBaseTransport):
+    """Responde por host com a próxima saída do roteiro e registra quando/como foi chamado"""
+
+    def __init__(self, outcomes, delay=0.0):
+        self.outcomes = {host: list(results) for host, results in outcomes.items()}
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle_async_request(self, request):
+        self.calls.append((request.url.host, request.method, time.monotonic()))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            results = self.outcomes.get(request.url.host, [200])
+            outcome = results.pop(0) if len(results) > 1 else results[0]
+            if isinstance(outcome, Exception):
+                raise outcome
+            return httpx.Response(outcome)
+        finally:
+            self.in_flight -= 1
+
+
+def _monitor(transport, **options):
+    options = {
+        "interval": 300, "min_interval": 30, "host_spacing": 0, "concurrency": 4, "session_factory": None, **options
+    }
+    return HealthMonitor(transport=transport, **options)
+
+
+async def _probe_all(monitor, targets):
+    """Sonda todos os alvos uma vez, sem o loop de agendamento"""
+    monitor._client = httpx.AsyncClient(transport=monitor.transport)
+    monitor._semaphore = asyncio.Semaphore(monitor.concurrency)
+    monitor.set_targets(targets)
+    for target in monitor._targets.values():
+        target.next_due = 0
+    await asyncio.gather(*monitor.dispatch_due())
+    await monitor._client.aclose()
+
+
+class HealthMonitorTests(unittest.TestCase):
+    def test_status_head_fallback_and_errors(self):
+        transport = _ScriptedTransport({
+            "up.test": [200],
+            "login.test": [403],
+            "nohead.test": [405, 200],
+            "broken.test": [503],
+            "offline.test": [httpx.ConnectError("refused")],
+        })
+        monitor = _monitor(transport)
+        targets = {1: "http://up.test/", 2: "http://login.test/", 3: "http://nohead.test/",
+                   4: "http://broken.test/", 5: "http://offline.test/"}
+        asyncio.run(_probe_all(monitor, targets))
+
+        statuses = {automation_id: monitor.snapshot(automation_id).status for automation_id in targets}
+        self.assertEqual(statuses, {1: "up", 2: "up", 3: "up", 4: "down", 5: "down"})
+        self.assertEqual(monitor.snapshot(99).status, "unknown")
+        self.assertIn(("nohead.test", "GET"), [(host, method) for host, method, _ in transport.calls])
+
+    def test_bounded_parallelism_and_host_spacing(self):
+        transport = _ScriptedTransport({}, delay=0.02)
+        monitor = _monitor(transport, concurrency=3)
+        asyncio.run(_probe_all(monitor, {i: f"http://host{i}.test/" for i in range(12)}))
+        self.assertEqual(transport.max_in_flight, 3)
+
+        transport = _ScriptedTransport({})
+        monitor = _monitor(transport, host_spacing=0.05)
+        asyncio.run(_probe_all(monitor, {i: f"http://shared.test/{i}" for i in range(3)}))
+        started = sorted(at for _, _, at in transport.calls)
+        self.assertGreaterEqual(started[-1] - started[0], 0.09)
+
+        # URL trocada para outro host: o horário reservado do host antigo é descartado
+        monitor.set_targets({0: "http://other.test/"})
+        self.assertEqual(set(monitor._host_next_slot), set())
+
+    def test_flapping_targets_are_probed_more_often(self):
+        monitor = _monitor(None)
+        monitor.set_targets({1: "http://a.test/", 2: "http://b.test/"})
+        now = datetime.utcnow()
+        for ok in (True, True, True):
+            monitor._record(1, monitor._targets[1], ProbeResult(ok, 200, 10.0, now))
+        for ok in (True, False, True, True):
+            monitor._record(2, monitor._targets[2], ProbeResult(ok, 200, 10.0, now))
+
+        self.assertEqual(monitor._next_interval(monitor._targets[1].history), 300)
+        self.assertEqual(monitor._next_interval(monitor._targets[2].history), 30)
+        snapshot = monitor.snapshot(2)
+        self.assertTrue(snapshot.flapping)
+        self.assertEqual(snapshot.uptime, 0.75)
+
+    def test_state_changes_invalidate_catalog_cache_once_per_tick(self):
+        monitor = _monitor(None)
+        monitor.set_targets({automation_id: f"http://{automation_id}.test/" for automation_id in range(1, 51)})
+        now = datetime.utcnow()
+        version = catalog_cache.version
+        # Primeira sondagem de 50 alvos no startup: uma única invalidação
+        for automation_id, target in monitor._targets.items():
+            monitor._record(automation_id, target, ProbeResult(True, 200, 10.0, now))
+        self.assertEqual(catalog_cache.version, version)
+        monitor.publish_changes()
+        self.assertEqual(catalog_cache.version, version + 1)
+
+        target = monitor._targets[1]
+        monitor._record(1, target, ProbeResult(True, 200, 12.0, now))
+        monitor.publish_changes()
+        self.assertEqual(catalog_cache.version, version + 1)
+        monitor._record(1, target, ProbeResult(False, None, 5000.0, now))
+        monitor.publish_changes()
+        self.assertEqual(catalog_cache.version, version + 2)
+
+    def test_automation_response_reads_health_from_memory(self):
+        session_factory = create_test_session_factory()
+        db = session_factory()
+        db.add(Automation(id=1, title="Fretes", target_url="http://a.test/"))
+        db.commit()
+        monitor = _monitor(None, session_factory=session_factory)
+        monitor.set_targets(monitor._load_targets())
+        monitor._record(1, monitor._targets[1], ProbeResult(True, 200, 42.0, datetime.utcnow()))
+
+        automation = db.get(Automation, 1)
+        with patch.object(automations_router, "health_monitor", monitor):
+            payload = automations_router._with_health([automation])[0].model_dump()
+        # O schema sozinho não consulta o monitor
+        self.assertIsNone(AutomationResponse.model_validate(automation).health)
+        db.close()
+        self.assertEqual(payload["health"]["status"], "up")
+        self.assertEqual(payload["health"]["latency_ms"], 42.0)
+        self.assertEqual(payload["status"], "active")
+
+
+if __name__ == "__main__":
+    unittest.main()
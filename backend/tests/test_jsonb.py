@@ -0,0 +1,146 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+
+from app.audit import AuditLog
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.database import get_db
+from app.jsonb import apply_patch, patch_expression
+from app.models import AuditLogEntry, Automation, Sector, User
+from app.routers import automations as automations_router
+from app.routers import users as users_router
+from app.schemas import JsonPatch
+from app.search import AutomationSearchIndex
+from tests.db_utils import QueryCounter, create_test_session_factory
+
+
+class JsonPatchTests(unittest.TestCase):
+    def test_merge_set_and_remove(self):
+        document = {"theme": "light", "layout": {"cols": 2, "dense": True}, "favorites": [3], "tmp": 1}
+        result = apply_patch(document, JsonPatch(
+            merge={"theme": "dark", "layout": {"dense": None, "cols": 4}, "lang": {"code": "pt"}},
+            set=[{"path": ["favorites", 99], "value": 7}, {"path": ["missing", "key"], "value": 1}],
+            remove=[["tmp"], ["favorites", "0"]],
+        ))
+        self.assertEqual(
+            result,
+            {"theme": "dark", "layout": {"cols": 4}, "lang": {"code": "pt"}, "favorites": [7]},
+        )
+        self.assertEqual(document["tmp"], 1)  # o documento original não é alterado
+
+    def test_array_path_requires_integer(self):
+        with self.assertRaises(ValueError):
+            apply_patch({"favorites": [1]}, JsonPatch(set=[{"path": ["favorites", "x"], "value": 2}]))
+
+    def test_postgres_patch_is_one_update_with_jsonb_functions(self):
+        patch_ = JsonPatch(merge={"layout": {"cols": 4}}, set=[{"path": ["theme"], "value": None}], remove=[["tmp"]])
+        statement = update(User).where(User.id == 1).values(
+            preferences=patch_expression(User.preferences, patch_)
+        ).returning(User.preferences)
+        sql = str(statement.compile(dialect=postgresql.psycopg2.dialect()))
+        self.assertTrue(sql.startswith("UPDATE users SET"))
+        self.assertIn("jsonb_set(", sql)
+        self.assertIn("#-", sql)
+        self.assertIn("'null'::jsonb", sql)  # None é null do JSON, nunca NULL do SQL
+
+
+class JsonPatchEndpointTests(unittest.TestCase):
+    def setUp(self):
+        session_factory = create_test_session_factory()
+        self.engine = session_factory.kw["bind"]
+        db = session_factory()
+        ops = Sector(name="Operações", slug="ops")
+        fretes = Automation(title="Fretes", target_url="https://a", config={"retries": 1, "env": {"region": "sp"}})
+        ana = User(
+            email="ana@logtudo.com.br", password_hash="x", full_name="Ana", sector=ops,
+            preferences={"theme": "light", "favorites": [1, 2]},
+        )
+        bia = User(email="bia@logtudo.com.br", password_hash="x", full_name="Bia", sector=ops, preferences={"favorites": [2]})
+        db.add_all([ops, fretes, ana, bia])
+        db.commit()
+        self.automation_id, self.ana_id = fretes.id, ana.id
+        db.close()
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(users_router.router, prefix="/api/v1")
+        app.include_router(automations_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        user = AuthenticatedUser(subject="ana", id=ana.id, email="ana@logtudo.com.br", is_admin=True, role="admin")
+        app.dependency_overrides[get_current_user] = lambda: user
+        app.dependency_overrides[get_current_admin] = lambda: user
+        self.search_index = AutomationSearchIndex(session_factory)
+        self.search_index.rebuild()
+        self.session_factory = session_factory
+        self.users_audit = AuditLog(session_factory)
+        self.patches = [
+            patch.object(users_router, "audit_log", self.users_audit),
+            patch.object(automations_router, "audit_log", AuditLog(session_factory)),
+            patch.object(automations_router, "automation_search_index", self.search_index),
+        ]
+        for module_patch in self.patches:
+            module_patch.start()
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        for module_patch in self.patches:
+            module_patch.stop()
+
+    def test_patches_from_two_tabs_keep_both_changes(self):
+        first = self.client.patch("/api/v1/users/me/preferences", json={"merge": {"theme": "dark"}})
+        with QueryCounter(self.engine) as counter:
+            second = self.client.patch(
+                "/api/v1/users/me/preferences", json={"set": [{"path": ["favorites", 99], "value": 5}]}
+            )
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.json(), {"theme": "dark", "favorites": [1, 2, 5]})
+        self.assertEqual(sum(statement.startswith("UPDATE users") for statement in counter.statements), 1)
+
+        self.users_audit.flush()
+        db = self.session_factory()
+        entries = db.query(AuditLogEntry.action, AuditLogEntry.resource_id, AuditLogEntry.details).all()
+        db.close()
+        self.assertEqual(entries, [("user.update", str(self.ana_id), {"fields": ["preferences"]})] * 2)
+
+    def test_profile_matches_token_email_in_other_casing(self):
+        self.client.app.dependency_overrides[get_current_user] = lambda: AuthenticatedUser(
+            subject="ana", id=self.ana_id, email="Ana@LogTudo.com.br", role="user"
+        )
+        self.assertEqual(self.client.get("/api/v1/users/me").json()["id"], self.ana_id)
+        response = self.client.patch("/api/v1/users/me/preferences", json={"merge": {"theme": "dark"}})
+        self.assertEqual(response.json(), {"theme": "dark", "favorites": [1, 2]})
+
+    def test_admin_patches_user_and_invalid_path_is_rejected(self):
+        response = self.client.patch(
+            f"/api/v1/users/{self.ana_id}/preferences", json={"set": [{"path": ["favorites", "x"], "value": 1}]}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.patch("/api/v1/users/999/preferences", json={"remove": [["theme"]]}).status_code, 404)
+
+    def test_config_patch_updates_search_index(self):
+        response = self.client.patch(
+            f"/api/v1/automations/{self.automation_id}/config",
+            json={"merge": {"env": {"region": None, "bucket": "notas"}}, "remove": [["retries"]]},
+        )
+        self.assertEqual(response.json(), {"env": {"bucket": "notas"}})
+        self.assertEqual(list(self.search_index.search("bucket")), [self.automation_id])
+
+    def test_filter_users_by_favorite(self):
+        users = self.client.get("/api/v1/users", params={"favorite_automation_id": 1}).json()
+        self.assertEqual([user["email"] for user in users], ["ana@logtudo.com.br"])
+        users = self.client.get("/api/v1/users", params={"favorite_automation_id": 2}).json()
+        self.assertEqual(len(users), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
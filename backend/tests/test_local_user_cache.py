@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch
+
+from app import auth
+from app.models import Sector, User
+from tests.db_utils import create_test_session_factory
+
+
+class LocalUserLookupTests(unittest.TestCase):
+    def setUp(self):
+        self.SessionLocal = create_test_session_factory()
+        with self.SessionLocal() as db:
+            sector = Sector(name="TI", slug="ti")
+            db.add(sector)
+            db.flush()
+            db.add(User(email="ana@logtudo.com.br", full_name="Ana", password_hash="x", role="manager", sector_id=sector.id))
+            db.commit()
+        cache_patch = patch.object(auth, "_local_user_cache", auth.TokenCache(maxsize=10))
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def _login(self, db, email):
+        return auth.claims_to_authenticated_user({"sub": "sub-1", "email": email}, db)
+
+    def test_login_burst_hits_database_once(self):
+        with self.SessionLocal() as db:
+            with patch.object(db, "query", wraps=db.query) as query:
+                users = [self._login(db, "ana@logtudo.com.br") for _ in range(5)]
+        self.assertEqual(query.call_count, 1)
+        self.assertEqual(users[-1].role, "manager")
+        self.assertEqual(users[-1].full_name, "Ana")
+
+    def test_missing_local_user_is_cached_too(self):
+        with self.SessionLocal() as db:
+            with patch.object(db, "query", wraps=db.query) as query:
+                self.assertIsNone(self._login(db, "ghost@logtudo.com.br").id)
+                self.assertIsNone(self._login(db, "ghost@logtudo.com.br").id)
+        self.assertEqual(query.call_count, 1)
+
+    def test_other_casing_does_not_hide_existing_user(self):
+        with self.SessionLocal() as db:
+            self.assertEqual(self._login(db, "Ana@LogTudo.com.br").role, "manager")
+            self.assertEqual(self._login(db, "ana@logtudo.com.br").role, "manager")
+
+    def test_invalidation_reloads_updated_user(self):
+        with self.SessionLocal() as db:
+            self.assertEqual(self._login(db, "ana@logtudo.com.br").role, "manager")
+            db.query(User).update({User.role: "analyst"})
+            db.commit()
+            self.assertEqual(self._login(db, "ana@logtudo.com.br").role, "manager")
+            auth.invalidate_local_user("ANA@logtudo.com.br")
+            self.assertEqual(self._login(db, "ana@logtudo.com.br").role, "analyst")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+
+import httpx
+
+from app.oidc import OIDCHttpClient
+
+
+class _FlakyTransport(httpx.AsyncBaseTransport):
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def handle_async_request(self, request):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={"ok": outcome < 400})
+
+
+def _client(transport, retries=2):
+    return OIDCHttpClient(retries=retries, backoff_base=0, backoff_max=0, transport=transport)
+
+
+class OIDCHttpClientTests(unittest.TestCase):
+    def test_get_retries_on_gateway_errors(self):
+        transport = _FlakyTransport([503, 502, 200])
+        response = asyncio.run(_client(transport).get("http://keycloak.test/certs"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(transport.calls, 3)
+
+    def test_post_is_not_retried_after_the_request_was_sent(self):
+        transport = _FlakyTransport([503, 200])
+        response = asyncio.run(_client(transport).post_form("http://keycloak.test/token", {"code": "c"}))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(transport.calls, 1)
+
+    def test_post_is_retried_when_connection_fails(self):
+        transport = _FlakyTransport([httpx.ConnectError("refused"), 200])
+        response = asyncio.run(_client(transport).post_form("http://keycloak.test/token", {"code": "c"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(transport.calls, 2)
+
+    def test_gives_up_after_configured_retries(self):
+        transport = _FlakyTransport([httpx.ConnectError("refused")] * 3)
+        with self.assertRaises(httpx.ConnectError):
+            asyncio.run(_client(transport).get("http://keycloak.test/certs"))
+        self.assertEqual(transport.calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
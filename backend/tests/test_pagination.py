@@ -0,0 +1,149 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.access_index import AutomationAccessIndex
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.catalog_cache import catalog_cache
+from app.database import get_db
+from app.models import Automation, Sector, User
+from app.pagination import ListParams, paginate
+from app.routers import automations as automations_router
+from app.routers import sectors as sectors_router
+from app.routers import users as users_router
+from tests.db_utils import create_test_session_factory
+
+
+class KeysetPaginationTests(unittest.TestCase):
+    def setUp(self):
+        catalog_cache.invalidate()
+        session_factory = create_test_session_factory()
+        db = session_factory()
+        ops = Sector(name="Operações", slug="ops")
+        fin = Sector(name="Financeiro", slug="fin")
+        base = datetime(2024, 1, 1)
+        automations = [
+            Automation(
+                title=f"{'Relatório' if i % 2 else 'Robô'} {i:02d}",
+                target_url=f"https://a/{i}",
+                is_active=i % 5 != 0,
+                sectors=[ops] if i % 3 else [fin],
+                created_at=base + timedelta(days=i % 4),  # datas repetidas exercitam o desempate por id
+            )
+            for i in range(25)
+        ]
+        users = [
+            User(
+                email=f"user{i:02d}@logtudo.com.br",
+                password_hash="x",
+                full_name=f"{'Ana' if i % 2 else 'Bruno'} {i:02d}",
+                role="manager" if i % 4 == 0 else "user",
+                is_active=i % 3 != 0,
+                sector=ops if i % 2 else fin,
+            )
+            for i in range(30)
+        ]
+        db.add_all([ops, fin] + automations + users)
+        db.commit()
+        self.ops_id = ops.id
+        db.close()
+        self.session_factory = session_factory
+
+        self.index_patch = patch.object(
+            automations_router, "automation_access_index", AutomationAccessIndex(session_factory=session_factory)
+        )
+        self.index_patch.start()
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        admin = AuthenticatedUser(subject="admin", id=999, email="admin@logtudo.com.br", is_admin=True, role="admin")
+        app = FastAPI()
+        for module in (automations_router, sectors_router, users_router):
+            app.include_router(module.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        app.dependency_overrides[get_current_user] = lambda: admin
+        app.dependency_overrides[get_current_admin] = lambda: admin
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.index_patch.stop()
+
+    def _walk(self, path, **params):
+        items, cursor, pages = [], None, 0
+        while True:
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            response = self.client.get(path, params=query)
+            self.assertEqual(response.status_code, 200, response.text)
+            page = response.json()
+            items.extend(page["items"])
+            pages += 1
+            cursor = page["next_cursor"]
+            if not cursor:
+                return items, pages
+
+    def test_unpaginated_shape_is_kept(self):
+        response = self.client.get("/api/v1/automations")
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), 25)
+
+    def test_walk_automations_by_created_at_desc(self):
+        items, pages = self._walk("/api/v1/automations", limit=7, sort="-created_at")
+        self.assertEqual(pages, 4)
+        keys = [(item["created_at"], item["id"]) for item in items]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        self.assertEqual(len({item["id"] for item in items}), 25)
+
+    def test_walk_over_null_created_at(self):
+        db = self.session_factory()
+        db.query(Automation).filter(Automation.id % 3 == 0).update({Automation.created_at: None})
+        db.commit()
+        for sort in ("created_at", "-created_at"):
+            rows, cursor = [], None
+            while True:
+                page, cursor = paginate(db.query(Automation), Automation, ListParams(limit=4, cursor=cursor, sort=sort))
+                rows.extend(page)
+                if not cursor:
+                    break
+            self.assertEqual(len({row.id for row in rows}), 25)
+            nulls = [row.created_at is None for row in rows]
+            self.assertEqual(nulls, sorted(nulls, reverse=sort.startswith("-")))
+        db.close()
+
+    def test_automation_filters(self):
+        items, _ = self._walk(
+            "/api/v1/automations", limit=3, is_active="true", sector_id=self.ops_id, search="rel"
+        )
+        titles = [item["title"] for item in items]
+        self.assertTrue(titles)
+        self.assertTrue(all(title.startswith("Relatório") for title in titles))
+        self.assertTrue(all(item["is_active"] for item in items))
+        self.assertTrue(all(any(s["id"] == self.ops_id for s in item["sectors"]) for item in items))
+
+    def test_user_filters_and_pages(self):
+        items, pages = self._walk("/api/v1/users", limit=4, role="user", is_active="true", search="ana")
+        expected = [i for i in range(30) if i % 2 and i % 4 and i % 3]
+        self.assertEqual([item["email"] for item in items], [f"user{i:02d}@logtudo.com.br" for i in expected])
+        self.assertEqual(pages, 3)
+
+    def test_search_escapes_like_wildcards(self):
+        response = self.client.get("/api/v1/sectors", params={"search": "%"})
+        self.assertEqual(response.json(), [])
+        self.assertEqual([s["slug"] for s in self.client.get("/api/v1/sectors", params={"search": "fin"}).json()], ["fin"])
+
+    def test_invalid_or_mismatched_cursor(self):
+        page = self.client.get("/api/v1/users", params={"limit": 2}).json()
+        self.assertEqual(self.client.get("/api/v1/users", params={"cursor": "garbage"}).status_code, 400)
+        response = self.client.get("/api/v1/users", params={"cursor": page["next_cursor"], "sort": "-id"})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
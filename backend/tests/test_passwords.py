@@ -0,0 +1,33 @@
+import unittest
+
+from app.passwords import PasswordHasherPool, PasswordPoolBusy
+
+
+class PasswordHasherPoolTests(unittest.TestCase):
+    def test_hash_many_runs_in_worker_processes(self):
+        pool = PasswordHasherPool(max_workers=2, max_pending=4)
+        try:
+            hashes = pool.hash_many(["first", "second", "third"])
+            self.assertEqual(len(hashes), 3)
+            self.assertTrue(pool.verify("second", hashes[1]))
+            self.assertFalse(pool.verify("wrong", hashes[1]))
+            stats = pool.stats()
+            self.assertEqual(stats["queue_depth"], 0)
+            self.assertEqual(stats["completed"], 5)
+        finally:
+            pool.shutdown()
+
+    def test_full_queue_is_rejected(self):
+        pool = PasswordHasherPool(max_workers=1, max_pending=1, queue_timeout=0.01)
+        pool._slots.acquire()
+        with self.assertRaises(PasswordPoolBusy):
+            pool.hash("secret")
+        self.assertEqual(pool.stats()["rejected"], 1)
+
+    def test_zero_workers_hashes_inline(self):
+        pool = PasswordHasherPool(max_workers=0)
+        self.assertTrue(pool.verify("secret", pool.hash("secret")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.access_index import AutomationAccessIndex
+from app.catalog_cache import catalog_cache
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.database import get_db
+from app.models import Automation, Sector, User
+from app.routers import automations as automations_router
+from app.routers import users as users_router
+from tests.db_utils import QueryCounter, create_test_session_factory
+
+# Teto de queries por endpoint, independente do número de linhas
+MAX_QUERIES = 3
+
+
+class QueryCountCeilingTests(unittest.TestCase):
+    def setUp(self):
+        session_factory = self.session_factory = create_test_session_factory()
+        self.engine = session_factory.kw["bind"]
+        db = session_factory()
+        sectors = [Sector(name=f"Setor {i}", slug=f"setor-{i}") for i in range(5)]
+        automations = [
+            Automation(title=f"Automação {i}", target_url=f"https://a/{i}", sectors=sectors[i % 5:i % 5 + 2])
+            for i in range(40)
+        ]
+        users = [
+            User(
+                email=f"user{i}@logtudo.com.br",
+                password_hash="x",
+                full_name=f"User {i}",
+                sector=sectors[i % 5],
+                extra_automations=automations[i % 40:i % 40 + 3],
+            )
+            for i in range(60)
+        ]
+        db.add_all(sectors + automations + users)
+        db.commit()
+        self.automation_id, self.user_id, self.sector_id = automations[7].id, users[3].id, users[3].sector_id
+        db.close()
+
+        self.index_patch = patch.object(
+            automations_router, "automation_access_index", AutomationAccessIndex(session_factory=session_factory)
+        )
+        self.index_patch.start()
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(automations_router.router, prefix="/api/v1")
+        app.include_router(users_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        self.app = app
+        self.client = TestClient(app)
+        self._login(is_admin=True, role="admin")
+
+    def tearDown(self):
+        self.index_patch.stop()
+
+    def _login(self, is_admin, role):
+        user = AuthenticatedUser(
+            subject="u",
+            id=self.user_id,
+            email="user3@logtudo.com.br",
+            is_admin=is_admin,
+            role=role,
+            sector_id=self.sector_id,
+        )
+        self.app.dependency_overrides[get_current_admin] = lambda: user
+        self.app.dependency_overrides[get_current_user] = lambda: user
+
+    def _assert_ceiling(self, path):
+        self.client.get(path)  # aquece caches (ex.: índice de acesso)
+        catalog_cache.invalidate()  # mede o caminho que monta a resposta a partir do ORM
+        with QueryCounter(self.engine) as counter:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertLessEqual(counter.count, MAX_QUERIES, f"{path}: {counter.statements}")
+        return response
+
+    def test_admin_endpoints(self):
+        self.assertEqual(len(self._assert_ceiling("/api/v1/automations").json()), 40)
+        self._assert_ceiling(f"/api/v1/automations/{self.automation_id}")
+        self.assertEqual(len(self._assert_ceiling("/api/v1/users").json()), 60)
+        self._assert_ceiling(f"/api/v1/users/{self.user_id}")
+        self._assert_ceiling("/api/v1/users/me")
+
+    def test_password_is_hashed_before_the_first_query(self):
+        with QueryCounter(self.engine) as counter:
+            def _hash(password):
+                counter.statements.append("HASH")
+                return "hashed"
+
+            with patch.object(users_router, "get_password_hash", side_effect=_hash):
+                response = self.client.put(f"/api/v1/users/{self.user_id}", json={"password": "nova-senha"})
+        self.assertEqual(response.status_code, 200, response.text)
+        # Nenhuma conexão do banco fica presa esperando o argon2
+        self.assertEqual(counter.statements[0], "HASH")
+
+    def test_regular_user_listing(self):
+        self._login(is_admin=False, role="user")
+        self.assertGreater(len(self._assert_ceiling("/api/v1/automations").json()), 0)
+
+    def test_regular_user_detail_checks_access_without_loading_users(self):
+        self._login(is_admin=False, role="user")
+        automation_id = self._visible_automation_id()
+        self.client.get(f"/api/v1/automations/{automation_id}")
+        with QueryCounter(self.engine) as counter:
+            response = self.client.get(f"/api/v1/automations/{automation_id}")
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertLessEqual(counter.count, MAX_QUERIES, counter.statements)
+        self.assertFalse(any("FROM users" in statement for statement in counter.statements), counter.statements)
+
+        db = self.session_factory()
+        hidden = (
+            db.query(Automation)
+            .filter(~Automation.sectors.any(Sector.id == self.sector_id))
+            .filter(~Automation.users_with_access.any(User.id == self.user_id))
+            .first()
+        )
+        db.close()
+        self.assertEqual(self.client.get(f"/api/v1/automations/{hidden.id}").status_code, 403)
+
+    def _visible_automation_id(self):
+        db = self.session_factory()
+        user = db.get(User, self.user_id)
+        automation_id = user.extra_automations[0].id
+        db.close()
+        return automation_id
+
+    def test_manager_listing(self):
+        self._login(is_admin=False, role="manager")
+        self._assert_ceiling("/api/v1/automations")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.access_index import AutomationAccessIndex
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.catalog_cache import catalog_cache
+from app.database import get_db
+from app.models import Automation, Sector, User
+from app.routers import automations as automations_router
+from app import search as app_search
+from app.search import AutomationSearchIndex
+from tests.db_utils import create_test_session_factory
+
+
+class AutomationSearchIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.session_factory = create_test_session_factory()
+        db = self.session_factory()
+        db.add_all([
+            Automation(id=1, title="Relatório de Fretes", description="Consolida fretes do mês", target_url="https://a"),
+            Automation(id=2, title="Conciliação bancária", description="Relatório diário", target_url="https://b"),
+            Automation(id=3, title="Robô de notas", target_url="https://c", config={"sefaz": {"certificado": "x"}}),
+        ])
+        db.commit()
+        db.close()
+        self.index = AutomationSearchIndex(session_factory=self.session_factory)
+
+    def _ids(self, query):
+        scores = self.index.search(query)
+        return sorted(scores, key=lambda automation_id: (-scores[automation_id], automation_id))
+
+    def test_title_outranks_description_and_accents_are_ignored(self):
+        self.assertEqual(self._ids("relatorio"), [1, 2])
+
+    def test_prefix_typo_and_config_keys(self):
+        self.assertEqual(self._ids("conci"), [2])
+        self.assertEqual(self._ids("conciliacao bancaria"), [2])
+        self.assertEqual(self._ids("concilaicao"), [2])  # erro de digitação
+        self.assertEqual(self._ids("certificado"), [3])
+        self.assertEqual(self._ids("fretes inexistente"), [])
+
+    def test_incremental_updates(self):
+        self.index.rebuild()
+        db = self.session_factory()
+        automation = db.get(Automation, 3)
+        automation.title = "Robô de faturamento"
+        self.index.index_automation(automation)
+        db.close()
+        self.assertEqual(self._ids("faturamento"), [3])
+        self.assertEqual(self._ids("notas"), [])
+        self.index.remove_automation(3)
+        self.assertEqual(self._ids("faturamento"), [])
+
+
+class SearchEndpointTests(unittest.TestCase):
+    def setUp(self):
+        catalog_cache.invalidate()
+        session_factory = create_test_session_factory()
+        db = session_factory()
+        ops = Sector(name="Operações", slug="ops")
+        fin = Sector(name="Financeiro", slug="fin")
+        user = User(email="ana@logtudo.com.br", password_hash="x", full_name="Ana", sector=ops)
+        db.add_all([
+            ops, fin, user,
+            Automation(title="Relatório de Fretes", target_url="https://a", sectors=[ops]),
+            Automation(title="Relatório Financeiro", target_url="https://b", sectors=[fin]),
+            Automation(title="Relatório Antigo", target_url="https://c", sectors=[ops], is_active=False),
+        ])
+        db.commit()
+        self.user = AuthenticatedUser(subject="ana", id=user.id, email=user.email, role="user", sector_id=ops.id)
+        db.close()
+
+        # o router (escritas) e app.search (consultas) precisam enxergar o mesmo índice
+        search_index = AutomationSearchIndex(session_factory)
+        for index_patch in (
+            patch.object(automations_router, "automation_access_index", AutomationAccessIndex(session_factory)),
+            patch.object(automations_router, "automation_search_index", search_index),
+            patch.object(app_search, "automation_search_index", search_index),
+        ):
+            index_patch.start()
+            self.addCleanup(index_patch.stop)
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(automations_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        app.dependency_overrides[get_current_admin] = lambda: AuthenticatedUser(
+            subject="admin", id=999, email="admin@logtudo.com.br", is_admin=True, role="admin"
+        )
+        self.client = TestClient(app)
+
+    def test_results_respect_access_rules(self):
+        response = self.client.get("/api/v1/automations/search", params={"q": "relatorio"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["title"] for item in response.json()], ["Relatório de Fretes"])
+
+    def test_new_automation_is_searchable(self):
+        self.client.get("/api/v1/automations/search", params={"q": "relatorio"})  # carrega o índice
+        self.client.post(
+            "/api/v1/automations",
+            json={"title": "Relatório de Estoque", "target_url": "https://d", "sector_ids": [self.user.sector_id]},
+        )
+        response = self.client.get("/api/v1/automations/search", params={"q": "estoque"})
+        self.assertEqual([item["title"] for item in response.json()], ["Relatório de Estoque"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.access_index import AutomationAccessIndex
+from app.auth import AuthenticatedUser, get_current_admin, get_current_user
+from app.catalog_cache import catalog_cache
+from app.database import get_db
+from app.models import Automation, Sector, User
+from app.routers import automations as automations_router
+from app.routers import sectors as sectors_router
+from app.suggest import SuggestIndex
+from tests.db_utils import QueryCounter, create_test_session_factory
+
+
+class SuggestIndexTests(unittest.TestCase):
+    def setUp(self):
+        session_factory = create_test_session_factory()
+        db = session_factory()
+        fin = Sector(id=1, name="Financeiro", slug="fin")
+        db.add_all([
+            fin,
+            Automation(id=1, title="Relatório de Fretes", target_url="https://a"),
+            Automation(id=2, title="Conciliação Bancária", target_url="https://b", sectors=[fin]),
+            Automation(id=3, title="Fechamento Fiscal", target_url="https://c", is_active=False, sectors=[fin]),
+        ])
+        db.commit()
+        db.close()
+        self.index = SuggestIndex(session_factory)
+
+    def _suggest(self, prefix, **kwargs):
+        return [(s.automation_id, s.matched) for s in self.index.suggest(prefix, **kwargs)]
+
+    def test_matches_any_word_of_title_and_sector_names(self):
+        self.assertEqual(self._suggest("fret"), [(1, "title")])
+        self.assertEqual(self._suggest("relatorio de"), [(1, "title")])
+        self.assertEqual(self._suggest("FIN"), [(2, "sector"), (3, "sector")])
+        self.assertEqual(self._suggest("f"), [(3, "title"), (1, "title"), (2, "sector")])
+
+    def test_access_filters(self):
+        self.assertEqual(self._suggest("fi", active_only=True), [(2, "sector")])
+        self.assertEqual(self._suggest("f", within={1, 3}), [(3, "title"), (1, "title")])
+        self.assertEqual(self._suggest("f", within={2}), [(2, "sector")])
+
+    def test_incremental_updates(self):
+        self.index.rebuild()
+        self.index.set_automation(1, "Romaneio de Cargas", True, [1])
+        self.assertEqual(self._suggest("fret"), [])
+        self.assertEqual(self._suggest("carg"), [(1, "title")])
+        self.index.set_sector(1, "Tesouraria")
+        self.assertEqual(self._suggest("fin"), [])
+        self.assertEqual(self._suggest("tes"), [(1, "sector"), (2, "sector"), (3, "sector")])
+        self.index.remove_sector(1)
+        self.index.remove_automation(2)
+        self.assertEqual(self._suggest("tes"), [])
+        self.assertEqual(self._suggest("conc"), [])
+
+    def test_lookup_is_fast(self):
+        self.index.rebuild()
+        for i in range(5000):
+            self.index.set_automation(100 + i, f"Automação {i} de teste", True, [])
+        started = time.perf_counter()
+        for _ in range(1000):
+            self.index.suggest("automacao 42")
+        self.assertLess((time.perf_counter() - started) / 1000, 0.001)
+
+
+class SuggestEndpointTests(unittest.TestCase):
+    def setUp(self):
+        catalog_cache.invalidate()
+        session_factory = create_test_session_factory()
+        self.engine = session_factory.kw["bind"]
+        db = session_factory()
+        ops = Sector(name="Operações", slug="ops")
+        fin = Sector(name="Financeiro", slug="fin")
+        user = User(email="ana@logtudo.com.br", password_hash="x", full_name="Ana", sector=ops)
+        db.add_all([
+            ops, fin, user,
+            Automation(title="Relatório de Fretes", target_url="https://a", sectors=[ops]),
+            Automation(title="Relatório Financeiro", target_url="https://b", sectors=[fin]),
+        ])
+        db.commit()
+        self.user = AuthenticatedUser(subject="ana", id=user.id, email=user.email, role="user", sector_id=ops.id)
+        db.close()
+
+        suggest_index = SuggestIndex(session_factory)
+        for index_patch in (
+            patch.object(automations_router, "automation_access_index", AutomationAccessIndex(session_factory)),
+            patch.object(automations_router, "automation_suggest_index", suggest_index),
+            patch.object(sectors_router, "automation_suggest_index", suggest_index),
+        ):
+            index_patch.start()
+            self.addCleanup(index_patch.stop)
+        automations_router.automation_access_index.rebuild()
+        suggest_index.rebuild()
+
+        def _db():
+            session = session_factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(automations_router.router, prefix="/api/v1")
+        app.include_router(sectors_router.router, prefix="/api/v1")
+        app.dependency_overrides[get_db] = _db
+        app.dependency_overrides[get_current_user] = lambda: self.user
+        app.dependency_overrides[get_current_admin] = lambda: AuthenticatedUser(
+            subject="admin", id=999, email="admin@logtudo.com.br", is_admin=True, role="admin"
+        )
+        self.client = TestClient(app)
+
+    def test_suggestions_respect_access_and_skip_database(self):
+        with QueryCounter(self.engine) as counter:
+            response = self.client.get("/api/v1/automations/suggest", params={"q": "rel"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["title"] for item in response.json()], ["Relatório de Fretes"])
+        self.assertIsInstance(response.json()[0]["automation_id"], int)
+        self.assertEqual(counter.count, 0)
+
+    def test_write_handlers_update_the_index(self):
+        created = self.client.post(
+            "/api/v1/automations",
+            json={"title": "Romaneio", "target_url": "https://r", "sector_ids": [self.user.sector_id]},
+        ).json()
+        response = self.client.get("/api/v1/automations/suggest", params={"q": "roma"})
+        self.assertEqual([item["automation_id"] for item in response.json()], [created["id"]])
+
+        self.client.put(f"/api/v1/sectors/{self.user.sector_id}", json={"name": "Logística"})
+        response = self.client.get("/api/v1/automations/suggest", params={"q": "logis"})
+        self.assertEqual({item["sector"] for item in response.json()}, {"Logística"})
+
+
+if __name__ == "__main__":
+    unittest.main()
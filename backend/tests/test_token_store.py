@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import RefreshToken
+from app.token_store import MemoryRefreshTokenStore, SQLRefreshTokenStore
+
+
+class _StoreContract:
+    def make_store(self, default_ttl=60):
+        raise NotImplementedError
+
+    def test_set_get_delete(self):
+        store = self.make_store()
+        store.set("sid-1", "refresh-1")
+        self.assertEqual(store.get("sid-1"), "refresh-1")
+        store.delete("sid-1")
+        self.assertIsNone(store.get("sid-1"))
+
+    def test_expired_entries_are_not_returned_and_get_purged(self):
+        store = self.make_store()
+        with patch("app.token_store.time.time", return_value=1_000_000.0):
+            store.set("sid-old", "refresh-old", ttl=10)
+        store.set("sid-new", "refresh-new")
+        self.assertIsNone(store.get("sid-old"))
+        store.purge_expired()
+        self.assertEqual(store.stats()["entries"], 1)
+        self.assertEqual(store.get("sid-new"), "refresh-new")
+
+    def test_stats_report_lookup_latency(self):
+        store = self.make_store()
+        store.set("sid-1", "refresh-1")
+        store.get("sid-1")
+        store.get("missing")
+        stats = store.stats()
+        self.assertEqual(stats["lookups"], 2)
+        self.assertEqual(stats["hits"], 1)
+        self.assertIsNotNone(stats["lookup_latency_ms"])
+
+
+class MemoryRefreshTokenStoreTests(_StoreContract, unittest.TestCase):
+    def make_store(self, default_ttl=60):
+        return MemoryRefreshTokenStore(default_ttl=default_ttl, stripes=4)
+
+    def test_memory_usage_is_reported(self):
+        store = self.make_store()
+        store.set("sid-1", "refresh-1")
+        self.assertGreater(store.stats()["approx_memory_bytes"], 0)
+
+
+class SQLRefreshTokenStoreTests(_StoreContract, unittest.TestCase):
+    def make_store(self, default_ttl=60):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        RefreshToken.__table__.create(engine)
+        return SQLRefreshTokenStore(default_ttl=default_ttl, session_factory=sessionmaker(bind=engine))
+
+    def test_tokens_are_encrypted_at_rest(self):
+        store = self.make_store()
+        store.set("sid-1", "refresh-1")
+        with store.session_factory() as db:
+            stored = db.query(RefreshToken.token).scalar()
+        self.assertNotIn("refresh-1", stored)
+
+        other_key = SQLRefreshTokenStore(session_factory=store.session_factory, encryption_key="outra-chave")
+        self.assertIsNone(other_key.get("sid-1"))
+
+
+if __name__ == "__main__":
+    unittest.main()